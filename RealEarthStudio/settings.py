@@ -219,3 +219,45 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # 外部Python环境
 FIFTYONE_ENV = r"D:\ProgramData\anaconda3\envs\fiftyone_env\python.exe"
+
+# 并行渲染进程数（每个进程运行独立的 Blender 实例，CPU 核心在进程间平均分配）
+RENDER_WORKER_NUM = max(1, (os.cpu_count() or 1) // 8)
+
+# 常驻渲染进程的内存预算（MB），超出时释放最久未使用的场景，0 表示不限制
+RENDER_WORKER_MEMORY_MB = 32 * 1024
+
+# 图像写出方式：sync 由 Blender 同步写出；async 由后台线程编码 PNG 并写盘（固定使用 Standard 视图变换）
+RENDER_IMAGE_WRITE_MODE = "sync"
+
+# 渲染阶段计时记录端：jsonl（渲染结果目录 trace/ 下）、prometheus（textfile collector）、database（RenderSpan 表）
+RENDER_TRACE_SINKS = ["jsonl", "database"]
+
+# Prometheus textfile collector 目录，None 表示写入渲染结果目录 trace/ 下
+RENDER_TRACE_PROMETHEUS_DIR = None
+
+# FiftyOne 导入方式：incremental 由常驻导入进程在渲染过程中分批导入；script 在渲染结束后运行导入脚本
+FIFTYONE_INGEST_MODE = "incremental"
+
+# 增量导入间隔（秒）
+FIFTYONE_INGEST_INTERVAL = 10
+
+# 全局渲染缓存目录（不同渲染任务间按内容复用图像），None 表示不使用缓存
+RENDER_CACHE_DIR = os.path.join(MEDIA_ROOT, "RenderCache")
+
+# 全局渲染缓存独占的磁盘容量上限（GB，仍被数据集图像硬链接共用的条目不计入、不淘汰），超出时淘汰最久未使用的图像，0 表示不限制
+RENDER_CACHE_MAX_GB = 100
+
+# 目标模型预处理库各级 LOD 的面数比例（上传目标模型后自动生成，LOD0 为原始网格）
+TARGET_LOD_RATIOS = [1.0, 0.5, 0.25, 0.1]
+
+# 场景模型 LOD 库各级 LOD 的面数比例（上传场景模型后为面数较多的场景瓦片自动生成）
+SCENE_LOD_RATIOS = [1.0, 0.5, 0.25, 0.1]
+
+# 场景模型贴图降采样版本的最大边长（像素，上传场景模型后自动生成，渲染时按输出分辨率与相机距离选择）
+SCENE_TEXTURE_SIZES = [1024, 2048, 4096]
+
+# 模型批量导入时并行检查的 Blender 进程数
+INGEST_MAX_WORKERS = 4
+
+# 模型批量导入目录：上传的压缩包保存在此，按路径导入时只允许导入该目录下的目录或压缩包
+INGEST_ROOT = os.path.join(MEDIA_ROOT, "Ingest")
@@ -1,6 +1,8 @@
 from django.contrib import admin
+import os
 from .models import *
 from django.utils.safestring import mark_safe
+from utils.rearth import target_library, scene_library, scene_textures
 
 admin.site.site_header = '🌏 REAL EARTH STUDIO'
 admin.site.site_title = 'RealEarthStudio'
@@ -104,15 +106,19 @@ class BaseCategoryAdmin(admin.ModelAdmin):
     # 共有字段展示
     list_display = ['model_id', 'get_categories', 'uploaded_at', 'file_link']
     list_display_links = ['model_id']
-    search_fields = ['category', 'model_id']
-    readonly_fields = ['model_id', 'uploaded_at', 'file_preview']
+    search_fields = ['category', 'model_id', 'content_hash']
+    readonly_fields = ['model_id', 'uploaded_at', 'file_preview', 'content_hash', 'thumbnail_preview', 'statistics_display']
+    actions = ['inspect_models']
 
     fieldsets = (
         ('基本信息', {
             'fields': ('model_id', 'uploaded_at', 'category')
         }),
         ('文件信息', {
-            'fields': ('file', 'file_preview')
+            'fields': ('file', 'file_preview', 'content_hash')
+        }),
+        ('模型统计', {
+            'fields': ('thumbnail_preview', 'statistics_display')
         }),
     )
 
@@ -173,14 +179,69 @@ class BaseCategoryAdmin(admin.ModelAdmin):
             return mark_safe(f"文件名: {obj.file.name.split('/')[-1]}<br>大小: {size_mb:.2f} MB")
         return "无文件"
 
+    @admin.display(description="缩略图")
+    def thumbnail_preview(self, obj):
+        if obj.thumbnail:
+            return mark_safe(f'<img src="{obj.thumbnail.url}" style="max-width: 128px; max-height: 128px;">')
+        return "-"
+
+    @admin.display(description="三角面数", ordering="triangle_count")
+    def triangle_count_display(self, obj):
+        return obj.triangle_count if obj.has_statistics else "未检查"
+
+    @admin.display(description="统计信息")
+    def statistics_display(self, obj):
+        if not obj.has_statistics:
+            return "未检查"
+        texture_mb = obj.texture_memory / (1024 * 1024)
+        return mark_safe(f"三角面数: {obj.triangle_count}<br>尺寸: {obj.bounds} 米<br>"
+                         f"贴图内存: {texture_mb:.1f} MB<br>材质数: {obj.material_count}")
+
+    @admin.action(description="重新检查模型")
+    def inspect_models(self, request, queryset):
+        from .tasks import inspect_model_file
+        model_type = self.category_model_types[-1]
+        for instance in queryset:
+            inspect_model_file.delay(model_type, str(instance.model_id))
+        self.message_user(request, f"已提交 {queryset.count()} 个模型的检查任务")
+
     class Meta:
         abstract = True  # 标记为抽象类，防止被注册成实际管理界面
 
 
 @admin.register(SceneModelFile)
 class SceneModelFileAdmin(BaseCategoryAdmin):
-    list_display = ['model_id', 'get_categories', 'uploaded_at', 'point_count', 'file_link']
+    list_display = ['model_id', 'thumbnail_preview', 'get_categories', 'uploaded_at', 'point_count',
+                    'triangle_count_display', 'library_status', 'texture_status', 'file_link']
     category_model_types = ['general', 'scene']
+    actions = ['inspect_models', 'preprocess_models']
+
+    @admin.display(description="LOD 库")
+    def library_status(self, obj):
+        if not obj.file or not os.path.isfile(obj.file.path):
+            return "-"
+        manifest = scene_library.load_manifest(obj.file.path)
+        if manifest is None:
+            return "未生成"
+        return f"{len(manifest['objects'])} 个对象"
+
+    @admin.display(description="贴图版本")
+    def texture_status(self, obj):
+        if not obj.file or not os.path.isfile(obj.file.path):
+            return "-"
+        manifest = scene_textures.load_manifest(obj.file.path)
+        if manifest is None:
+            return "未生成"
+        if not manifest["variants"]:
+            return f"原始 {manifest['source_size']}px（无需降采样）"
+        return f"原始 {manifest['source_size']}px | 版本: " + " / ".join(f"{size}px" for size in manifest["variants"])
+
+    @admin.action(description="重新生成 LOD 库与贴图版本")
+    def preprocess_models(self, request, queryset):
+        from .tasks import preprocess_scene_model
+        for scene_model_file in queryset:
+            preprocess_scene_model.delay(str(scene_model_file.model_id), force=True)
+        self.message_user(request, f"已提交 {queryset.count()} 个场景模型的预处理任务")
 
     @admin.display(description="渲染点数量")
     def point_count(self, obj):
@@ -190,4 +251,23 @@ class SceneModelFileAdmin(BaseCategoryAdmin):
 
 @admin.register(TargetModel)
 class TargetModelAdmin(BaseCategoryAdmin):
+    list_display = ['model_id', 'thumbnail_preview', 'get_categories', 'uploaded_at', 'triangle_count_display',
+                    'library_status', 'file_link']
     category_model_types = ['general', 'target']
+    actions = ['inspect_models', 'preprocess_models']
+
+    @admin.display(description="预处理库")
+    def library_status(self, obj):
+        if not obj.file or not os.path.isfile(obj.file.path):
+            return "-"
+        manifest = target_library.load_manifest(obj.file.path)
+        if manifest is None:
+            return "未生成"
+        return "LOD 面数: " + " / ".join(str(lod["faces"]) for lod in manifest["lods"])
+
+    @admin.action(description="重新生成预处理库")
+    def preprocess_models(self, request, queryset):
+        from .tasks import preprocess_target_model
+        for target_model in queryset:
+            preprocess_target_model.delay(str(target_model.model_id), force=True)
+        self.message_user(request, f"已提交 {queryset.count()} 个目标模型的预处理任务")
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午2:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : ingest.py
+# @Project : RealEarthStudio
+# @Details : 模型批量导入：收集目录或压缩包中的模型文件，并行检查后为通过检查的模型建立记录
+
+
+import os
+import re
+import tarfile
+import zipfile
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+from .models import Category, TargetModel, SceneModelFile
+from utils.rearth import model_inspector
+
+MODEL_CLASSES = {
+    "target": TargetModel,
+    "scene": SceneModelFile,
+}
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def extract_archive(archive_path, work_dir):
+    """
+    解压压缩包（zip/tar），忽略包外路径与链接
+    """
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as archive:
+            archive.extractall(work_dir)
+    else:
+        with tarfile.open(archive_path) as archive:
+            archive.extractall(work_dir, filter="data")
+
+
+def collect_model_files(source, model_type, work_dir):
+    """
+    收集待导入的模型文件
+    :param source: 目录或压缩包路径
+    :param model_type: target / scene
+    :param work_dir: 压缩包解压目录
+    :return: (模型文件路径列表, 根目录)，按相对路径排序
+    """
+    if os.path.isfile(source) and is_archive(source):
+        extract_archive(source, work_dir)
+        root = work_dir
+    elif os.path.isdir(source):
+        root = source
+    else:
+        raise FileNotFoundError(f"导入源不存在或不是目录/压缩包: {source}")
+
+    extensions = tuple(f".{ext}" for ext in model_inspector.MODEL_EXTENSIONS[model_type])
+    model_paths = []
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            # 跳过渲染时生成的 .blend 缓存（如 xxx.glb.blend）与预处理生成的 LOD 库、贴图版本
+            if file_name.lower().endswith(extensions) and not file_name.lower().endswith((".glb.blend", ".fbx.blend")) \
+                    and not re.search(r"\.(lod\.\w+|tex\d+)\.blend$", file_name.lower()):
+                model_paths.append(os.path.join(dir_path, file_name))
+    return sorted(model_paths, key=lambda path: os.path.relpath(path, root)), root
+
+
+def ingest_models(source, model_type="target", category_ids=None, max_workers=None, thumbnails=True):
+    """
+    批量导入模型：并行检查模型文件，通过检查的模型写入统计信息与缩略图并建立记录，未通过的模型不导入
+    :param source: 目录或压缩包路径
+    :param model_type: target / scene
+    :param category_ids: 模型类别ID列表
+    :param max_workers: 并行检查进程数，默认为 settings.INGEST_MAX_WORKERS
+    :param thumbnails: 是否渲染缩略图
+    :return: {"accepted": [...], "rejected": [...]}
+    """
+    if model_type not in MODEL_CLASSES:
+        raise ValueError(f"不支持的模型类型: {model_type}")
+    model_class = MODEL_CLASSES[model_type]
+    categories = list(Category.objects.filter(id__in=category_ids or [], model_type__in=['general', model_type]))
+    max_workers = max_workers or settings.INGEST_MAX_WORKERS
+
+    report = {"accepted": [], "rejected": []}
+    with tempfile.TemporaryDirectory(prefix="ingest_") as work_dir:
+        model_paths, root = collect_model_files(source, model_type, os.path.join(work_dir, "models"))
+        print(f"📋 待导入模型 {len(model_paths)} 个 | 并行检查进程数：{max_workers}")
+        thumbnail_dir = os.path.join(work_dir, "thumbnails") if thumbnails else None
+        results = model_inspector.inspect_models(model_paths, model_type, thumbnail_dir, max_workers)
+
+        for model_path, stats, error in results:
+            relative_path = os.path.relpath(model_path, root)
+            if error is not None:
+                report["rejected"].append({"file": relative_path, "error": error})
+                continue
+
+            instance = model_class()
+            instance.set_statistics(stats)
+            if stats["thumbnail"] and os.path.isfile(stats["thumbnail"]):
+                with open(stats["thumbnail"], 'rb') as f:
+                    instance.thumbnail.save("thumbnail.png", File(f), save=False)
+            # 保存时按内容哈希命名，与已有模型内容相同时复用已有文件
+            with open(model_path, 'rb') as f:
+                instance.file = File(f, name=os.path.basename(model_path))
+                instance.save()
+            instance.category.set(categories)
+            report["accepted"].append({"file": relative_path, "model_id": str(instance.model_id),
+                                       "content_hash": instance.content_hash,
+                                       **{k: v for k, v in stats.items() if k != "thumbnail"}})
+
+    print(f"✅ 批量导入完成 | 导入 {len(report['accepted'])} 个，拒绝 {len(report['rejected'])} 个")
+    return report
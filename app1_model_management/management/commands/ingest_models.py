@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午2:20
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : ingest_models.py
+# @Project : RealEarthStudio
+# @Details : 批量导入模型命令：python manage.py ingest_models <目录或压缩包> --type target --category 1 --workers 4
+
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1_model_management import ingest
+
+
+class Command(BaseCommand):
+    help = "批量导入目录或压缩包（zip/tar）中的 GLB/FBX 模型：并行检查、统计并渲染缩略图，未通过检查的模型不导入"
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="模型目录或压缩包路径")
+        parser.add_argument("--type", dest="model_type", choices=list(ingest.MODEL_CLASSES), default="target",
+                            help="模型类型")
+        parser.add_argument("--category", dest="category_ids", type=int, action="append", default=[],
+                            help="模型类别ID（可重复指定）")
+        parser.add_argument("--workers", type=int, default=None, help="并行检查进程数")
+        parser.add_argument("--no-thumbnails", action="store_true", help="不渲染缩略图")
+
+    def handle(self, *args, **options):
+        try:
+            report = ingest.ingest_models(options["source"], options["model_type"], options["category_ids"],
+                                          options["workers"], not options["no_thumbnails"])
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for item in report["rejected"]:
+            self.stderr.write(f"❌ {item['file']}: {item['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"导入 {len(report['accepted'])} 个模型，拒绝 {len(report['rejected'])} 个模型"))
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:30
+
+import app1_model_management.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app1_model_management", "0013_alter_scenemodelfile_file_alter_targetmodel_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="triangle_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="三角面数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="bounds",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="包围盒尺寸 [X, Y, Z]（米）",
+                null=True,
+                verbose_name="模型尺寸",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="texture_memory",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="贴图解码后占用的内存（字节）",
+                null=True,
+                verbose_name="贴图内存",
+            ),
+        ),
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="material_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="材质数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="thumbnail",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                null=True,
+                upload_to=app1_model_management.models.thumbnail_upload_path,
+                verbose_name="缩略图",
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="triangle_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="三角面数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="bounds",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="包围盒尺寸 [X, Y, Z]（米）",
+                null=True,
+                verbose_name="模型尺寸",
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="texture_memory",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="贴图解码后占用的内存（字节）",
+                null=True,
+                verbose_name="贴图内存",
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="material_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="材质数"
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="thumbnail",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                null=True,
+                upload_to=app1_model_management.models.thumbnail_upload_path,
+                verbose_name="缩略图",
+            ),
+        ),
+    ]
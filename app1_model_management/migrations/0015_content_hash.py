@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:50
+
+from django.db import migrations, models
+
+from utils.rearth import render_keys
+
+
+def fill_content_hash(apps, schema_editor):
+    """为已有模型文件计算内容哈希（文件名保持不变，文件缺失时跳过）"""
+    for model_name in ("SceneModelFile", "TargetModel"):
+        model_class = apps.get_model("app1_model_management", model_name)
+        for instance in model_class.objects.filter(content_hash="").exclude(file=""):
+            try:
+                content_hash = render_keys.file_digest(instance.file.path)
+            except OSError:
+                continue
+            model_class.objects.filter(pk=instance.pk).update(content_hash=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app1_model_management", "0014_model_statistics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scenemodelfile",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="模型文件的 SHA-256，相同内容的上传共用同一文件",
+                max_length=64,
+                verbose_name="内容哈希",
+            ),
+        ),
+        migrations.AddField(
+            model_name="targetmodel",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="模型文件的 SHA-256，相同内容的上传共用同一文件",
+                max_length=64,
+                verbose_name="内容哈希",
+            ),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
@@ -2,35 +2,74 @@
 # python manage.py migrate app1_model_management
 # python manage.py squashmigrations app1_model_management 0009 0012
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.db.models.signals import post_delete, m2m_changed
 from django.dispatch import receiver
 from django.core.validators import FileExtensionValidator
+from django.core.files.base import ContentFile
 import uuid
 import os
 
+from utils.rearth import target_library, scene_library, scene_textures, render_keys
 
-def get_model_upload_path(prefix, instance, filename):
+
+def get_model_upload_path(prefix, instance, filename, name=None):
     """
     模型文件上传路径生成函数
     :param prefix: 路径前缀，如 "TargetModels" 或 "SceneModels"
     :param instance: 模型实例
     :param filename: 原始文件名
+    :param name: 文件名（不含扩展名），默认为模型ID
     :return: 上传路径
     """
     ext = filename.split('.')[-1].lower()
-    return os.path.join("Models", prefix, f"{instance.model_id}.{ext}")
+    return os.path.join("Models", prefix, f"{name or instance.model_id}.{ext}")
 
 
 def scene_model_upload_path(instance, filename):
-    """场景模型上传路径"""
-    return get_model_upload_path("SceneModels", instance, filename)
+    """场景模型上传路径（按内容哈希命名，相同内容的上传共用同一文件及其缓存）"""
+    return get_model_upload_path("SceneModels", instance, filename, instance.content_hash)
 
 
 def target_model_upload_path(instance, filename):
-    """目标模型上传路径"""
-    return get_model_upload_path("TargetModels", instance, filename)
+    """目标模型上传路径（按内容哈希命名，相同内容的上传共用同一文件及其缓存）"""
+    return get_model_upload_path("TargetModels", instance, filename, instance.content_hash)
+
+
+def store_upload(instance):
+    """
+    计算新上传模型文件的内容哈希（分块读取），相同内容的文件已存在时直接指向已有文件，不再重复保存；
+    已有相同内容的记录时沿用其统计信息
+    :param instance: 模型实例（保存前调用）
+    :return: 是否复用了已有文件
+    """
+    if not instance.file or instance.file._committed:
+        return False
+    instance.content_hash = render_keys.stream_digest(instance.file.chunks())
+
+    duplicate = type(instance).objects.filter(content_hash=instance.content_hash).exclude(pk=instance.pk).first()
+    if duplicate is not None and duplicate.has_statistics and not instance.has_statistics:
+        instance.copy_statistics(duplicate)
+
+    name = instance.file.field.generate_filename(instance, instance.file.name)
+    if not instance.file.storage.exists(name):
+        return False
+    instance.file = name
+    print(f"♻️ 检测到重复上传的模型文件，复用已有文件 {name}")
+    return True
+
+
+def file_in_use(model_class, file_name, exclude_pk=None):
+    """
+    是否还有其他记录引用该模型文件（相同内容的上传共用同一文件）
+    """
+    return model_class.objects.filter(file=file_name).exclude(pk=exclude_pk).exists()
+
+
+def thumbnail_upload_path(instance, filename):
+    """模型缩略图上传路径"""
+    return get_model_upload_path("Thumbnails", instance, filename)
 
 
 class Category(models.Model):
@@ -83,7 +122,54 @@ class Category(models.Model):
         return not self.children.exists()
 
 
-class SceneModelFile(models.Model):
+class ModelStatistics(models.Model):
+    """ 模型统计信息（批量导入或上传后由 Blender 进程检查得到，可用于调度与 LOD 决策） """
+    triangle_count = models.PositiveIntegerField("三角面数", null=True, blank=True, editable=False)
+    bounds = models.JSONField("模型尺寸", null=True, blank=True, editable=False, help_text="包围盒尺寸 [X, Y, Z]（米）")
+    texture_memory = models.PositiveBigIntegerField("贴图内存", null=True, blank=True, editable=False,
+                                                    help_text="贴图解码后占用的内存（字节）")
+    material_count = models.PositiveIntegerField("材质数", null=True, blank=True, editable=False)
+    thumbnail = models.FileField("缩略图", upload_to=thumbnail_upload_path, null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def has_statistics(self):
+        return self.triangle_count is not None
+
+    def set_statistics(self, stats):
+        """
+        写入模型检查结果
+        :param stats: model_inspector.inspect_model 的返回值（缩略图另行保存）
+        """
+        self.triangle_count = stats["triangle_count"]
+        self.bounds = stats["bounds"]
+        self.texture_memory = stats["texture_memory"]
+        self.material_count = stats["material_count"]
+
+    def copy_statistics(self, other):
+        """沿用相同内容模型的统计信息与缩略图"""
+        self.triangle_count = other.triangle_count
+        self.bounds = other.bounds
+        self.texture_memory = other.texture_memory
+        self.material_count = other.material_count
+        if other.thumbnail and os.path.isfile(other.thumbnail.path):
+            with other.thumbnail.open('rb') as f:
+                self.thumbnail.save("thumbnail.png", ContentFile(f.read()), save=False)
+
+    def clear_statistics(self):
+        """模型文件更换后清空统计信息并删除缩略图"""
+        self.delete_thumbnail()
+        self.thumbnail = None
+        self.triangle_count = self.bounds = self.texture_memory = self.material_count = None
+
+    def delete_thumbnail(self):
+        if self.thumbnail and os.path.isfile(self.thumbnail.path):
+            os.remove(self.thumbnail.path)
+
+
+class SceneModelFile(ModelStatistics):
     model_id = models.UUIDField(verbose_name="模型ID", default=uuid.uuid4, editable=False, unique=True,
                                 help_text="场景模型的唯一标识")
     uploaded_at = models.DateTimeField(verbose_name="上传时间", default=timezone.now)
@@ -94,6 +180,8 @@ class SceneModelFile(models.Model):
         help_text="请上传 *.blend/*.glb/*.fbx 格式的3D模型文件",
         validators=[FileExtensionValidator(allowed_extensions=['blend', 'glb', 'fbx'])]
     )
+    content_hash = models.CharField("内容哈希", max_length=64, blank=True, default="", editable=False, db_index=True,
+                                    help_text="模型文件的 SHA-256，相同内容的上传共用同一文件")
 
     class Meta:
         verbose_name = "02-场景模型文件"
@@ -104,18 +192,38 @@ class SceneModelFile(models.Model):
         return f"{'、'.join([obj.name for obj in self.category.all()])} ({self.model_id})"
 
     def save(self, *args, **kwargs):
-        # 如果这是现有对象且文件字段被修改，则删除旧文件
+        # 新上传的文件按内容哈希保存，重复上传时复用已有文件
+        store_upload(self)
+
+        # 如果这是现有对象且文件字段被修改，则删除旧文件（其他记录仍在使用时保留）
+        file_changed = True
         if self.pk:  # 检查是否为现有对象
             try:
                 old_instance = SceneModelFile.objects.get(pk=self.pk)
-                # 如果文件字段发生变化，删除旧文件
+                file_changed = old_instance.file != self.file
+                # 如果文件字段发生变化，删除旧文件及其 LOD 库
                 if old_instance.file and old_instance.file != self.file:
-                    if os.path.isfile(old_instance.file.path):
-                        os.remove(old_instance.file.path)
+                    if not file_in_use(SceneModelFile, old_instance.file.name, self.pk):
+                        scene_library.remove_library(old_instance.file.path)
+                        scene_textures.remove_variants(old_instance.file.path)
+                        if os.path.isfile(old_instance.file.path):
+                            os.remove(old_instance.file.path)
+                    if not self.content_hash or self.content_hash != old_instance.content_hash:
+                        self.clear_statistics()
             except SceneModelFile.DoesNotExist:
                 pass  # 新对象，无需处理
         super().save(*args, **kwargs)
 
+        # 上传新文件后异步检查模型并生成场景 LOD 库与贴图降采样版本（提交事务后执行，确保任务能读取到记录；批量导入时已检查）
+        if file_changed and self.file:
+            from .tasks import preprocess_scene_model, inspect_model_file
+            # 上传时已计算内容哈希，写入哈希缓存供渲染缓存键直接使用
+            if self.content_hash and os.path.isfile(self.file.path):
+                render_keys.cache_file_digest(self.file.path, self.content_hash)
+            if not self.has_statistics:
+                transaction.on_commit(lambda: inspect_model_file.delay("scene", str(self.model_id)))
+            transaction.on_commit(lambda: preprocess_scene_model.delay(str(self.model_id)))
+
 
 def default_points():
     return [[0, 0, 0], [0, 1, 0]]
@@ -138,7 +246,7 @@ class SceneModel(models.Model):
         return f"{'、'.join([obj.name for obj in self.scene_model.category.all()])} ({self.scene_id})"
 
 
-class TargetModel(models.Model):
+class TargetModel(ModelStatistics):
     model_id = models.UUIDField(verbose_name="模型ID", default=uuid.uuid4, editable=False, unique=True,
                                 help_text="目标模型的唯一标识")
     uploaded_at = models.DateTimeField(verbose_name="上传时间", default=timezone.now)
@@ -149,6 +257,8 @@ class TargetModel(models.Model):
         help_text="请上传 *.glb/*.fbx 格式的3D模型文件",
         validators=[FileExtensionValidator(allowed_extensions=['glb', 'fbx'])]
     )
+    content_hash = models.CharField("内容哈希", max_length=64, blank=True, default="", editable=False, db_index=True,
+                                    help_text="模型文件的 SHA-256，相同内容的上传共用同一文件")
 
     class Meta:
         verbose_name = "04-目标模型"
@@ -159,26 +269,47 @@ class TargetModel(models.Model):
         return f"{'、'.join([obj.name for obj in self.category.all()])} ({self.model_id})"
 
     def save(self, *args, **kwargs):
-        # 如果这是现有对象且文件字段被修改，则删除旧文件
+        # 新上传的文件按内容哈希保存，重复上传时复用已有文件
+        store_upload(self)
+
+        # 如果这是现有对象且文件字段被修改，则删除旧文件（其他记录仍在使用时保留）
+        file_changed = True
         if self.pk:  # 检查是否为现有对象
             try:
                 old_instance = TargetModel.objects.get(pk=self.pk)
-                # 如果文件字段发生变化，删除旧文件
+                file_changed = old_instance.file != self.file
+                # 如果文件字段发生变化，删除旧文件及其预处理库
                 if old_instance.file and old_instance.file != self.file:
-                    if os.path.isfile(old_instance.file.path):
-                        os.remove(old_instance.file.path)
+                    if not file_in_use(TargetModel, old_instance.file.name, self.pk):
+                        target_library.remove_library(old_instance.file.path)
+                        if os.path.isfile(old_instance.file.path):
+                            os.remove(old_instance.file.path)
+                    if not self.content_hash or self.content_hash != old_instance.content_hash:
+                        self.clear_statistics()
             except TargetModel.DoesNotExist:
                 pass  # 新对象，无需处理
         super().save(*args, **kwargs)
 
+        # 上传新文件后异步检查模型并生成预处理库（提交事务后执行，确保任务能读取到记录；批量导入时已检查）
+        if file_changed and self.file:
+            from .tasks import preprocess_target_model, inspect_model_file
+            # 上传时已计算内容哈希，写入哈希缓存供渲染缓存键直接使用
+            if self.content_hash and os.path.isfile(self.file.path):
+                render_keys.cache_file_digest(self.file.path, self.content_hash)
+            if not self.has_statistics:
+                transaction.on_commit(lambda: inspect_model_file.delay("target", str(self.model_id)))
+            transaction.on_commit(lambda: preprocess_target_model.delay(str(self.model_id)))
+
     def delete(self, *args, **kwargs):
         # 删除文件系统中的文件
-        if self.file:
+        if self.file and not file_in_use(TargetModel, self.file.name, self.pk):
             # 获取文件的绝对路径
             file_path = self.file.path
-            # 如果文件存在则删除
+            # 如果文件存在则删除（同时删除预处理库与缩略图）
+            target_library.remove_library(file_path)
             if os.path.isfile(file_path):
                 os.remove(file_path)
+        self.delete_thumbnail()
         # 调用父类的delete方法删除数据库记录
         super().delete(*args, **kwargs)
 
@@ -186,20 +317,25 @@ class TargetModel(models.Model):
 @receiver(post_delete, sender=SceneModelFile)
 def delete_scene_model_file(sender, instance, **kwargs):
     """
-    场景模型删除后，同时删除其对应的物理文件
+    场景模型删除后，同时删除其对应的物理文件及 LOD 库
     """
-    if instance.file:
+    if instance.file and not file_in_use(sender, instance.file.name):
         file_path = instance.file.path
+        scene_library.remove_library(file_path)
+        scene_textures.remove_variants(file_path)
         if os.path.isfile(file_path):
             os.remove(file_path)
+    instance.delete_thumbnail()
 
 
 @receiver(post_delete, sender=TargetModel)
 def delete_target_model_file(sender, instance, **kwargs):
     """
-    目标模型删除后，同时删除其对应的物理文件
+    目标模型删除后，同时删除其对应的物理文件及预处理库
     """
-    if instance.file:
+    if instance.file and not file_in_use(sender, instance.file.name):
         file_path = instance.file.path
+        target_library.remove_library(file_path)
         if os.path.isfile(file_path):
             os.remove(file_path)
+    instance.delete_thumbnail()
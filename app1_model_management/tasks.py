@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午12:40
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : tasks.py
+# @Project : RealEarthStudio
+# @Details : 定义异步任务（目标模型、场景模型预处理，模型检查与批量导入）
+
+
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from celery import shared_task
+from .models import TargetModel, SceneModelFile
+from . import ingest
+
+from utils.rearth import target_library, scene_library, scene_textures, model_inspector
+
+
+@shared_task
+def preprocess_target_model(model_id, force=False):
+    """
+    异步生成目标模型的预处理库（合并网格、归一化原点、多级 LOD 的 .blend 库）
+    :param model_id: 目标模型ID
+    :param force: 库已是最新时是否重新生成
+    """
+    try:
+        target_model = TargetModel.objects.get(model_id=model_id)
+    except TargetModel.DoesNotExist:
+        print(f"⚠️ 目标模型 {model_id} 不存在，跳过预处理")
+        return None
+    if not target_model.file:
+        return None
+
+    try:
+        manifest = target_library.preprocess(target_model.file.path, settings.TARGET_LOD_RATIOS, force)
+    except Exception as e:
+        # 预处理失败时渲染回退为直接导入模型文件
+        print(f"❌ 目标模型 {model_id} 预处理失败: {e}")
+        return None
+    return [lod["faces"] for lod in manifest["lods"]]
+
+
+@shared_task
+def preprocess_scene_model(model_id, force=False):
+    """
+    异步生成场景模型的 LOD 库（面数较多的场景瓦片的多级简化网格）与贴图降采样版本
+    （两者依次生成，避免同时导入 fbx/glb 写入 .blend 缓存）
+    :param model_id: 场景模型ID
+    :param force: 库已是最新时是否重新生成
+    :return: (生成 LOD 的对象数, 贴图版本最大边长列表)，失败的一项为 None
+    """
+    try:
+        scene_model_file = SceneModelFile.objects.get(model_id=model_id)
+    except SceneModelFile.DoesNotExist:
+        print(f"⚠️ 场景模型 {model_id} 不存在，跳过预处理")
+        return None
+    if not scene_model_file.file:
+        return None
+
+    lod_objects, texture_sizes = None, None
+    try:
+        manifest = scene_library.preprocess(scene_model_file.file.path, settings.SCENE_LOD_RATIOS, force)
+        lod_objects = len(manifest["objects"])
+    except Exception as e:
+        # 预处理失败时场景始终使用原始网格
+        print(f"❌ 场景模型 {model_id} 预处理失败: {e}")
+    try:
+        manifest = scene_textures.preprocess(scene_model_file.file.path, settings.SCENE_TEXTURE_SIZES, force)
+        texture_sizes = [int(size) for size in manifest["variants"]]
+    except Exception as e:
+        # 生成失败时场景始终使用原始贴图
+        print(f"❌ 场景模型 {model_id} 贴图降采样失败: {e}")
+    return lod_objects, texture_sizes
+
+
+@shared_task
+def inspect_model_file(model_type, model_id):
+    """
+    异步检查单个上传的模型，写入统计信息与缩略图
+    :param model_type: target / scene
+    :param model_id: 模型ID
+    """
+    try:
+        instance = ingest.MODEL_CLASSES[model_type].objects.get(model_id=model_id)
+    except (KeyError, TargetModel.DoesNotExist, SceneModelFile.DoesNotExist):
+        print(f"⚠️ 模型 {model_id} 不存在，跳过检查")
+        return None
+    if not instance.file:
+        return None
+
+    with tempfile.TemporaryDirectory(prefix="inspect_") as work_dir:
+        [(_, stats, error)] = model_inspector.inspect_models([instance.file.path], model_type, work_dir, 1)
+        if error is not None:
+            print(f"❌ 模型 {model_id} 检查未通过，渲染时将无法导入: {error}")
+            return None
+        instance.set_statistics(stats)
+        if stats["thumbnail"] and os.path.isfile(stats["thumbnail"]):
+            with open(stats["thumbnail"], 'rb') as f:
+                instance.thumbnail.save("thumbnail.png", File(f), save=False)
+    # 只更新统计字段，不触发文件变更处理
+    instance.save(update_fields=["triangle_count", "bounds", "texture_memory", "material_count", "thumbnail"])
+    return stats["triangle_count"]
+
+
+@shared_task
+def ingest_models(source, model_type="target", category_ids=None, max_workers=None, remove_source=False):
+    """
+    异步批量导入模型
+    :param source: 目录或压缩包路径
+    :param model_type: target / scene
+    :param category_ids: 模型类别ID列表
+    :param max_workers: 并行检查进程数
+    :param remove_source: 导入后删除压缩包（通过接口上传的压缩包）
+    :return: ingest.ingest_models 的返回值
+    """
+    try:
+        return ingest.ingest_models(source, model_type, category_ids, max_workers)
+    finally:
+        if remove_source and os.path.isfile(source):
+            os.remove(source)
@@ -13,5 +13,7 @@ from . import views
 app_name = 'app1_model_management'
 
 urlpatterns = [
-    # 子路由
+    # 模型批量导入
+    path('ingest/', views.IngestModels.as_view(), name='ingest_models_view'),
+    path('ingest/<uuid:task_id>/', views.IngestStatus.as_view(), name='ingest_status_view'),
 ]
@@ -1,3 +1,81 @@
-from django.shortcuts import render
+import os
+import uuid
 
-# Create your views here.
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from celery.result import AsyncResult
+
+from .ingest import MODEL_CLASSES, ARCHIVE_EXTENSIONS, is_archive
+from .tasks import ingest_models
+
+
+def resolve_ingest_path(path):
+    """
+    校验按路径导入的源：必须是 settings.INGEST_ROOT 下（解析符号链接后）存在的目录或压缩包
+    :param path: 绝对路径或相对 INGEST_ROOT 的路径
+    :return: 解析后的绝对路径，不合法时返回 None
+    """
+    if not path:
+        return None
+    root = os.path.realpath(settings.INGEST_ROOT)
+    source = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, source]) != root:
+        return None
+    if os.path.isdir(source) or (os.path.isfile(source) and is_archive(source)):
+        return source
+    return None
+
+
+class IngestModels(APIView):
+    @staticmethod
+    def post(request):
+        # 批量导入模型：上传压缩包（archive）或指定服务器上的目录/压缩包路径（path）
+        model_type = request.data.get("model_type", "target")
+        if model_type not in MODEL_CLASSES:
+            return Response({"message": f"不支持的模型类型: {model_type}"}, status=status.HTTP_400_BAD_REQUEST)
+        if hasattr(request.data, "getlist"):
+            category_ids = request.data.getlist("category")
+        else:
+            category_ids = request.data.get("category", [])
+        try:
+            category_ids = [int(category_id) for category_id in category_ids]
+            max_workers = int(request.data.get("workers") or 0) or None
+        except (TypeError, ValueError):
+            return Response({"message": "category 与 workers 必须是整数"}, status=status.HTTP_400_BAD_REQUEST)
+
+        archive = request.FILES.get("archive")
+        if archive is not None:
+            name = archive.name.lower()
+            ext = next((ext for ext in ARCHIVE_EXTENSIONS if name.endswith(ext)), None)
+            if ext is None:
+                return Response({"message": "仅支持 zip/tar 压缩包"}, status=status.HTTP_400_BAD_REQUEST)
+            os.makedirs(settings.INGEST_ROOT, exist_ok=True)
+            source = os.path.join(settings.INGEST_ROOT, f"{uuid.uuid4()}{ext}")
+            with open(source, 'wb') as f:
+                for chunk in archive.chunks():
+                    f.write(chunk)
+            remove_source = True
+        else:
+            source = resolve_ingest_path(request.data.get("path"))
+            if source is None:
+                return Response({"message": "请上传压缩包或指定导入目录下存在的目录/压缩包路径"},
+                                status=status.HTTP_400_BAD_REQUEST)
+            remove_source = False
+
+        result = ingest_models.delay(source, model_type, category_ids, max_workers, remove_source)
+        return Response({"task_id": result.id, "message": "正在导入"}, status=status.HTTP_202_ACCEPTED)
+
+
+class IngestStatus(APIView):
+    @staticmethod
+    def get(request, task_id):
+        # 查看批量导入进度与结果
+        result = AsyncResult(str(task_id))
+        data = {"task_id": str(task_id), "state": result.state}
+        if result.successful():
+            data["report"] = result.result
+        elif result.failed():
+            data["message"] = str(result.result)
+        return Response(data)
@@ -22,16 +22,18 @@ class RenderingTaskAdmin(admin.ModelAdmin):
             'fields': ('render_id', 'render_name', 'render_time', 'render_type', 'renderer_type', 'render_progress')
         }),
         ('模型配置', {
-            'fields': ('scene_models', 'target_models')
+            'fields': ('scene_models', 'target_models', 'targets_per_frame', 'annotation_mode', 'prepass_width',
+                       'lod_pixel_error', 'texture_downscale')
         }),
         ('光照参数', {
-            'fields': ('sun_azimuth', 'sun_elevation')
+            'fields': ('sun_azimuth', 'sun_elevation', 'lighting_randomization')
         }),
         ('相机参数', {
-            'fields': ('camera_distances', 'camera_elevations', 'camera_rotation_step')
+            'fields': ('camera_distances', 'camera_elevations', 'camera_rotation_step', 'pose_strategy', 'pose_budget',
+                       'pose_seed', 'look_at_jitter')
         }),
         ('图像设置', {
-            'fields': ('image_width', 'image_height')
+            'fields': ('image_width', 'image_height', 'image_format', 'image_compression', 'image_quality')
         }),
         ('渲染结果', {
             'fields': ('rendered_result_dir',)
@@ -52,6 +54,15 @@ class RenderingTaskAdmin(admin.ModelAdmin):
             return mark_safe(f'{obj.render_progress * 100:.2f}% | <a href="{url_render}">重新渲染</a>')
 
 
+@admin.register(RenderSpan)
+class RenderSpanAdmin(admin.ModelAdmin):
+    list_display = ['rendering_task', 'run_id', 'name', 'scene', 'target', 'started_at', 'duration', 'status']
+    search_fields = ['rendering_task__render_id', 'run_id', 'scene', 'target']
+    list_filter = ['name', 'status']
+    readonly_fields = ['rendering_task', 'run_id', 'name', 'scene', 'target', 'started_at', 'duration', 'status',
+                       'pid', 'attrs']
+
+
 class CustomGroupResultAdmin(GroupResultAdmin):
     date_hierarchy = None  # 禁用日期层级导航
 
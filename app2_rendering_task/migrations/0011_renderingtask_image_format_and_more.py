@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:40
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0010_renderingtask_render_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="image_format",
+            field=models.CharField(
+                choices=[
+                    ("PNG", "PNG"),
+                    ("JPEG", "JPEG"),
+                    ("WEBP", "WebP"),
+                    ("OPEN_EXR", "OpenEXR"),
+                ],
+                default="PNG",
+                max_length=10,
+                verbose_name="图像格式",
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderingtask",
+            name="image_compression",
+            field=models.PositiveSmallIntegerField(
+                default=15,
+                help_text="PNG 无损压缩率（0-100%），越高文件越小、编码越慢",
+                validators=[app2_rendering_task.models.validate_percentage],
+                verbose_name="PNG压缩率",
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderingtask",
+            name="image_quality",
+            field=models.PositiveSmallIntegerField(
+                default=90,
+                help_text="JPEG/WebP 质量（0-100），WebP 取 100 时为无损压缩",
+                validators=[app2_rendering_task.models.validate_percentage],
+                verbose_name="图像质量",
+            ),
+        ),
+    ]
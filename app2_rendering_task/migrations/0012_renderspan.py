@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0011_renderingtask_image_format_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderSpan",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "run_id",
+                    models.CharField(
+                        db_index=True,
+                        help_text="同一次渲染运行的标识",
+                        max_length=32,
+                        verbose_name="运行ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(db_index=True, max_length=50, verbose_name="阶段"),
+                ),
+                (
+                    "scene",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="场景"
+                    ),
+                ),
+                (
+                    "target",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="目标"
+                    ),
+                ),
+                ("started_at", models.DateTimeField(verbose_name="开始时间")),
+                ("duration", models.FloatField(verbose_name="耗时（秒）")),
+                (
+                    "status",
+                    models.CharField(default="ok", max_length=10, verbose_name="状态"),
+                ),
+                ("pid", models.IntegerField(default=0, verbose_name="进程号")),
+                (
+                    "attrs",
+                    models.JSONField(blank=True, default=dict, verbose_name="附加信息"),
+                ),
+                (
+                    "rendering_task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="spans",
+                        to="app2_rendering_task.renderingtask",
+                        verbose_name="渲染任务",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "02-渲染耗时",
+                "verbose_name_plural": "02-渲染耗时",
+                "ordering": ["started_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 22:30
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0012_renderspan"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="targets_per_frame",
+            field=models.PositiveSmallIntegerField(
+                default=1,
+                help_text="大于 1 时目标按顺序分组，同组目标同时摆放在场景中渲染，每张图像包含多个目标标注",
+                validators=[app2_rendering_task.models.validate_targets_per_frame],
+                verbose_name="每帧目标数量",
+            ),
+        ),
+    ]
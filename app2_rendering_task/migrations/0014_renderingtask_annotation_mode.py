@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0013_renderingtask_targets_per_frame"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="annotation_mode",
+            field=models.CharField(
+                choices=[("raycast", "射线检测"), ("mask", "实例掩膜")],
+                default="raycast",
+                help_text="射线检测：渲染前由采样点估计标注框与遮挡比例；实例掩膜：由渲染的实例 ID 通道计算像素级精确的标注框与遮挡比例",
+                max_length=10,
+                verbose_name="标注方式",
+            ),
+        ),
+    ]
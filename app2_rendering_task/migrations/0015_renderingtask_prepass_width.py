@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:30
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0014_renderingtask_annotation_mode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="prepass_width",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="实例掩膜标注方式下，每个位姿先以该宽度（高度按画面比例，如 128×72）渲染实例掩膜筛选可见性与遮挡，通过后再渲染全分辨率图像；0 表示不预渲染",
+                validators=[app2_rendering_task.models.validate_prepass_width],
+                verbose_name="预渲染宽度",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:50
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0015_renderingtask_prepass_width"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="pose_strategy",
+            field=models.CharField(
+                choices=[
+                    ("grid", "网格"),
+                    ("random", "均匀随机"),
+                    ("stratified", "分层随机"),
+                    ("sobol", "Sobol 低差异序列"),
+                    ("halton", "Halton 低差异序列"),
+                ],
+                default="grid",
+                help_text="网格：相机距离 × 高低角 × 方位角间隔；其他策略在相机距离与高低角列表的最小值至最大值范围内、方位角 0°-360° 内采样",
+                max_length=10,
+                verbose_name="位姿采样策略",
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderingtask",
+            name="pose_budget",
+            field=models.PositiveIntegerField(
+                default=100,
+                help_text="非网格采样时每个目标（或目标组）渲染的图像数量上限",
+                verbose_name="每个目标图像数量",
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderingtask",
+            name="pose_seed",
+            field=models.PositiveIntegerField(
+                default=0, help_text="相同种子采样相同的位姿", verbose_name="位姿随机种子"
+            ),
+        ),
+        migrations.AddField(
+            model_name="renderingtask",
+            name="look_at_jitter",
+            field=models.FloatField(
+                default=0,
+                help_text="相机观察点在目标中心附近随机偏移的半径（米），0 表示始终对准目标中心",
+                validators=[app2_rendering_task.models.validate_non_negative],
+                verbose_name="观察点抖动半径",
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:10
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0016_renderingtask_pose_sampler"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="lighting_randomization",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text='每个位姿按分布抽取光照参数：参数名 → [最小值, 最大值]、{"normal": [均值, 标准差]} 或 {"choice": [...]}；可选 sun_energy、sun_azimuth_deg、sun_elevation_deg、sun_color_temperature、world_strength 及 seed，空字典表示不随机化',
+                validators=[app2_rendering_task.models.validate_lighting_spec],
+                verbose_name="光照随机化",
+            ),
+        ),
+    ]
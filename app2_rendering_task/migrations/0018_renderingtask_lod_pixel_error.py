@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:30
+
+import app2_rendering_task.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0017_renderingtask_lighting_randomization"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="lod_pixel_error",
+            field=models.FloatField(
+                default=0,
+                help_text="每个位姿按相机距离为目标与场景瓦片选择投影误差不超过该像素数的最简 LOD（模型上传后自动生成 LOD 库，如 1.0）；0 表示始终使用原始网格",
+                validators=[app2_rendering_task.models.validate_non_negative],
+                verbose_name="LOD 误差阈值",
+            ),
+        ),
+    ]
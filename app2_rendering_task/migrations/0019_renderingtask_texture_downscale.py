@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app2_rendering_task", "0018_renderingtask_lod_pixel_error"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="renderingtask",
+            name="texture_downscale",
+            field=models.BooleanField(
+                default=False,
+                help_text="按输出分辨率与最近相机距离为场景选择贴图降采样版本（场景模型上传后自动生成 1K/2K/4K 版本），渲染进程的贴图内存与场景加载时间随输出分辨率缩放；关闭时始终使用原始贴图",
+                verbose_name="贴图降采样",
+            ),
+        ),
+    ]
@@ -3,13 +3,16 @@
 # python manage.py squashmigrations app2_rendering_task 0001 0002
 
 import os
+import json
 import uuid
+import datetime
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db.models.signals import post_delete, m2m_changed
 from django.dispatch import receiver
 from utils.other import execute_external_python_script
+from utils.rearth import lighting
 
 import shutil
 
@@ -47,6 +50,34 @@ def validate_elevation_list(value):
             raise ValidationError("所有高低角必须在 0° 到 90° 之间。")
 
 
+def validate_percentage(value):
+    if not (0 <= value <= 100):
+        raise ValidationError("取值必须在 0 到 100 之间。")
+
+
+def validate_lighting_spec(value):
+    """验证光照分布配置"""
+    try:
+        lighting.validate_spec(value)
+    except ValueError as e:
+        raise ValidationError(str(e))
+
+
+def validate_non_negative(value):
+    if value < 0:
+        raise ValidationError("取值不能为负数。")
+
+
+def validate_targets_per_frame(value):
+    if not (1 <= value <= 10):
+        raise ValidationError("每帧目标数量必须在 1 到 10 之间。")
+
+
+def validate_prepass_width(value):
+    if value and not (32 <= value <= 1024):
+        raise ValidationError("预渲染宽度必须为 0 或在 32 到 1024 之间。")
+
+
 # ====== 模型 ======
 def rendered_result_path(instance, filename):
     """场景模型上传路径"""
@@ -85,6 +116,12 @@ class RenderingTask(models.Model, DirtyFieldsMixin):
                                     help_text="阳光照射的方位角（0°-360°）")
     sun_elevation = models.FloatField("日光高低角", default=90.0, validators=[validate_elevation],
                                       help_text="阳光照射的高低角（0°-90°）")
+    lighting_randomization = models.JSONField("光照随机化", default=dict, blank=True,
+                                              validators=[validate_lighting_spec],
+                                              help_text="每个位姿按分布抽取光照参数：参数名 → [最小值, 最大值]、"
+                                                        "{\"normal\": [均值, 标准差]} 或 {\"choice\": [...]}；可选 sun_energy、"
+                                                        "sun_azimuth_deg、sun_elevation_deg、sun_color_temperature、"
+                                                        "world_strength 及 seed，空字典表示不随机化")
 
     # 相机参数
     camera_distances = models.JSONField("相机距离", default=default_camera_distances, blank=True,
@@ -96,10 +133,65 @@ class RenderingTask(models.Model, DirtyFieldsMixin):
     camera_rotation_step = models.FloatField("相机方位角间隔", default=90, validators=[validate_azimuth],
                                              help_text="相机方位角采样间隔（0°-360°）")
 
+    # 位姿采样
+    POSE_STRATEGY_CHOICES = [
+        ('grid', '网格'),
+        ('random', '均匀随机'),
+        ('stratified', '分层随机'),
+        ('sobol', 'Sobol 低差异序列'),
+        ('halton', 'Halton 低差异序列'),
+    ]
+    pose_strategy = models.CharField("位姿采样策略", max_length=10, choices=POSE_STRATEGY_CHOICES, default='grid',
+                                     help_text="网格：相机距离 × 高低角 × 方位角间隔；其他策略在相机距离与高低角列表的"
+                                               "最小值至最大值范围内、方位角 0°-360° 内采样")
+    pose_budget = models.PositiveIntegerField("每个目标图像数量", default=100,
+                                              help_text="非网格采样时每个目标（或目标组）渲染的图像数量上限")
+    pose_seed = models.PositiveIntegerField("位姿随机种子", default=0, help_text="相同种子采样相同的位姿")
+    look_at_jitter = models.FloatField("观察点抖动半径", default=0, validators=[validate_non_negative],
+                                       help_text="相机观察点在目标中心附近随机偏移的半径（米），0 表示始终对准目标中心")
+
+    # 多目标同帧
+    targets_per_frame = models.PositiveSmallIntegerField("每帧目标数量", default=1,
+                                                         validators=[validate_targets_per_frame],
+                                                         help_text="大于 1 时目标按顺序分组，同组目标同时摆放在场景中渲染，"
+                                                                   "每张图像包含多个目标标注")
+
+    # 标注方式
+    ANNOTATION_MODE_CHOICES = [
+        ('raycast', '射线检测'),
+        ('mask', '实例掩膜'),
+    ]
+    annotation_mode = models.CharField("标注方式", max_length=10, choices=ANNOTATION_MODE_CHOICES, default='raycast',
+                                       help_text="射线检测：渲染前由采样点估计标注框与遮挡比例；"
+                                                 "实例掩膜：由渲染的实例 ID 通道计算像素级精确的标注框与遮挡比例")
+    prepass_width = models.PositiveSmallIntegerField("预渲染宽度", default=0, validators=[validate_prepass_width],
+                                                     help_text="实例掩膜标注方式下，每个位姿先以该宽度（高度按画面比例，如 128×72）"
+                                                               "渲染实例掩膜筛选可见性与遮挡，通过后再渲染全分辨率图像；0 表示不预渲染")
+    lod_pixel_error = models.FloatField("LOD 误差阈值", default=0, validators=[validate_non_negative],
+                                        help_text="每个位姿按相机距离为目标与场景瓦片选择投影误差不超过该像素数的最简 LOD"
+                                                  "（模型上传后自动生成 LOD 库，如 1.0）；0 表示始终使用原始网格")
+    texture_downscale = models.BooleanField("贴图降采样", default=False,
+                                            help_text="按输出分辨率与最近相机距离为场景选择贴图降采样版本（场景模型上传后自动生成 "
+                                                      "1K/2K/4K 版本），渲染进程的贴图内存与场景加载时间随输出分辨率缩放；"
+                                                      "关闭时始终使用原始贴图")
+
     # 渲染分辨率
     image_width = models.PositiveIntegerField("渲染图像分辨率（宽）", default=1920)
     image_height = models.PositiveIntegerField("渲染图像分辨率（高）", default=1080)
 
+    # 图像编码
+    IMAGE_FORMAT_CHOICES = [
+        ('PNG', 'PNG'),
+        ('JPEG', 'JPEG'),
+        ('WEBP', 'WebP'),
+        ('OPEN_EXR', 'OpenEXR'),
+    ]
+    image_format = models.CharField("图像格式", max_length=10, choices=IMAGE_FORMAT_CHOICES, default='PNG')
+    image_compression = models.PositiveSmallIntegerField("PNG压缩率", default=15, validators=[validate_percentage],
+                                                         help_text="PNG 无损压缩率（0-100%），越高文件越小、编码越慢")
+    image_quality = models.PositiveSmallIntegerField("图像质量", default=90, validators=[validate_percentage],
+                                                     help_text="JPEG/WebP 质量（0-100），WebP 取 100 时为无损压缩")
+
     # 渲染器类别
     RENDERER_CHOICES = [
         ('EEVEE', 'EEVEE'),
@@ -137,18 +229,105 @@ class RenderingTask(models.Model, DirtyFieldsMixin):
         # 计算属性：总像素数
         return f"{self.image_width * self.image_height / 1e4 :.2f} 万像素"
 
+    @property
+    def dataset_dir(self):
+        # 数据集目录（图像与标注）
+        return os.path.join(self.rendered_result_dir.path, "Dataset")
+
+    def clean(self):
+        super().clean()
+        errors = {}
+        if not self.camera_distances:
+            errors['camera_distances'] = "相机距离列表不能为空。"
+        if not self.camera_elevations:
+            errors['camera_elevations'] = "相机高低角列表不能为空。"
+        if self.pose_strategy != 'grid' and self.pose_budget < 1:
+            errors['pose_budget'] = "非网格采样时每个目标图像数量至少为 1。"
+        if errors:
+            raise ValidationError(errors)
+
+    def render_model_lists(self):
+        """
+        渲染用的场景模型与目标模型列表
+        （相同内容的上传共用同一文件，内容键与工作单元按文件名区分模型，因此共用文件的记录合并为一项，类别取并集）
+        :return: (scene_model_list, target_model_list)
+        """
+        scene_models = {}
+        for scene_model in self.scene_models.all():
+            all_categories = get_parent_categories(set(scene_model.scene_model.category.all()))
+            key = (scene_model.scene_model.file.name, json.dumps(scene_model.points))
+            if key in scene_models:
+                merge_classes(scene_models[key], all_categories)
+                continue
+            scene_models[key] = {
+                "model_id": str(scene_model.scene_model.model_id),
+                "path": scene_model.scene_model.file.path,
+                "class": [str(cat.name) for cat in all_categories],
+                "points": scene_model.points,
+            }
+
+        target_models = {}
+        for target_model in self.target_models.all():
+            all_categories = get_parent_categories(set(target_model.category.all()))
+            if target_model.file.name in target_models:
+                merge_classes(target_models[target_model.file.name], all_categories)
+                continue
+            target_models[target_model.file.name] = {
+                "model_id": str(target_model.model_id),
+                "path": target_model.file.path,
+                "class": [str(cat.name) for cat in all_categories],
+            }
+        return list(scene_models.values()), list(target_models.values())
+
+    def render_config(self):
+        """
+        公共渲染配置（与 SceneRenderer.main 的配置一致，场景与目标由工作单元填充）
+        """
+        return {
+            "render_id": "Dataset",
+            "scene_model": None,
+            "target_model_list": None,
+            "output_dir": self.rendered_result_dir.path,
+            "renderer": self.renderer_type,
+            "resolution": [self.image_width, self.image_height],
+            "image_format": self.image_format,
+            "image_compression": self.image_compression,
+            "image_quality": self.image_quality,
+            "sun_azimuth_deg": self.sun_azimuth,
+            "sun_elevation_deg": self.sun_elevation,
+            "lighting_spec": self.lighting_randomization,
+            "camera_distances": self.camera_distances,
+            "camera_elevations": self.camera_elevations,
+            "camera_rotation_step_deg": self.camera_rotation_step,
+            "pose_sampler": {
+                "strategy": self.pose_strategy,
+                "budget": self.pose_budget,
+                "seed": self.pose_seed,
+                "look_at_jitter": self.look_at_jitter,
+            },
+            "targets_per_frame": self.targets_per_frame,
+            "annotation_mode": self.annotation_mode,
+            "prepass_width": self.prepass_width,
+            "lod_pixel_error": self.lod_pixel_error,
+            "texture_downscale": self.texture_downscale,
+            "index": None,
+        }
+
     def save(self, *args, **kwargs):
         self.full_clean()
 
         dirty_fields = self.get_dirty_fields()
         if dirty_fields:
             # 检查特定字段是否发生变化
-            monitor_fields = ['sun_azimuth', 'sun_elevation', 'camera_distances', 'camera_elevations',
-                              'camera_rotation_step', 'image_width', 'image_height', 'renderer_type']
+            monitor_fields = ['sun_azimuth', 'sun_elevation', 'lighting_randomization', 'camera_distances', 'camera_elevations',
+                              'camera_rotation_step', 'pose_strategy', 'pose_budget', 'pose_seed', 'look_at_jitter',
+                              'image_width', 'image_height', 'renderer_type',
+                              'image_format', 'image_compression', 'image_quality', 'targets_per_frame',
+                              'annotation_mode', 'lod_pixel_error', 'texture_downscale']
 
             changed_monitored_fields = [field for field in monitor_fields if field in dirty_fields]
             if changed_monitored_fields:
-                delete_dataset(self)
+                # 只标记任务需要重新渲染；不再需要的图像在渲染开始前由 execute_render_task 增量删除
                 delete_dataset_in_fifty_one(self)
                 if self.render_progress == 1:
                     self.render_progress = 0
@@ -164,6 +343,47 @@ class RenderingTask(models.Model, DirtyFieldsMixin):
         super().save(*args, **kwargs)
 
 
+class RenderSpan(models.Model):
+    rendering_task = models.ForeignKey(RenderingTask, verbose_name="渲染任务", on_delete=models.CASCADE,
+                                       related_name="spans")
+    run_id = models.CharField("运行ID", max_length=32, db_index=True, help_text="同一次渲染运行的标识")
+    name = models.CharField("阶段", max_length=50, db_index=True)
+    scene = models.CharField("场景", max_length=100, blank=True, default="")
+    target = models.CharField("目标", max_length=100, blank=True, default="")
+    started_at = models.DateTimeField("开始时间")
+    duration = models.FloatField("耗时（秒）")
+    status = models.CharField("状态", max_length=10, default="ok")
+    pid = models.IntegerField("进程号", default=0)
+    attrs = models.JSONField("附加信息", default=dict, blank=True)
+
+    class Meta:
+        verbose_name = "02-渲染耗时"
+        verbose_name_plural = "02-渲染耗时"
+        ordering = ['started_at']
+
+    def __str__(self):
+        return f"{self.name} ({self.duration:.3f}秒)"
+
+    @staticmethod
+    def from_span(span):
+        """
+        将计时记录（utils.other.tracing 的 span）转换为模型字段
+        """
+        span = dict(span)
+        span.pop("task_id", None)
+        return {
+            "run_id": span.pop("run_id", "") or "",
+            "name": span.pop("name"),
+            "scene": span.pop("scene", None) or "",
+            "target": span.pop("target", None) or "",
+            "started_at": datetime.datetime.fromtimestamp(span.pop("start"), tz=datetime.timezone.utc),
+            "duration": span.pop("duration"),
+            "status": span.pop("status", "ok"),
+            "pid": span.pop("pid", 0),
+            "attrs": span,
+        }
+
+
 @receiver(post_delete, sender=RenderingTask)
 def delete_rendering_task_files(sender, instance, **kwargs):
     """
@@ -177,7 +397,9 @@ def handle_m2m_change(sender, instance, action, **kwargs):
     """
     统一处理多对多关系变化
     """
-    delete_dataset(instance)
+    if not action.startswith("post_"):
+        return
+    # 不再需要的图像在渲染开始前由 execute_render_task 增量删除
     delete_dataset_in_fifty_one(instance)
     instance.render_progress = 0
     instance.save()
@@ -220,3 +442,17 @@ def delete_dataset_in_fifty_one(instance):
             dataset_path = os.path.join(folder_dir, "Dataset")
             dataset_name = str(instance.render_id)
             execute_external_python_script.main(settings.FIFTYONE_ENV, script_path, dataset_path, dataset_name)
+
+
+def get_parent_categories(all_categories):
+    for cat in list(all_categories):
+        parent = cat.parent
+        while parent:
+            all_categories.add(parent)
+            parent = parent.parent
+    return all_categories
+
+
+def merge_classes(model, all_categories):
+    """将类别并入已有模型项（保持已有类别的顺序）"""
+    model["class"].extend(name for name in (str(cat.name) for cat in all_categories) if name not in model["class"])
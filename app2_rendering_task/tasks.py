@@ -11,10 +11,12 @@ from django.conf import settings
 from celery import shared_task
 import os
 from django.utils import timezone
-from .models import RenderingTask
+from .models import RenderingTask, RenderSpan, get_parent_categories
 
-from utils.rearth import SceneRenderer
-from utils.other import execute_external_python_script
+from utils.rearth import render_farm
+from utils.rearth.render_cache import RenderCache
+from utils.other import execute_external_python_script, tracing
+from utils.fifty_one import ingest_client
 
 
 @shared_task
@@ -22,12 +24,27 @@ def execute_render_task(render_id):
     """
     异步执行渲染任务
     """
+    trace_config, database_sink, ingestor = None, None, None
     try:
         print(f"⭕ 渲染任务：{render_id} 开始渲染")
         render_task = RenderingTask.objects.get(render_id=render_id)
         render_task.render_progress = 0
         render_task.save()
 
+        # 阶段计时（每次运行单独记录；渲染进程未加载 Django，其数据库记录经 JSON Lines 文件中转）
+        run_id = timezone.now().strftime("%Y%m%d_%H%M%S")
+        trace_sinks = settings.RENDER_TRACE_SINKS
+        trace_config = {
+            "task_id": str(render_id),
+            "run_id": run_id,
+            "trace_dir": os.path.join(render_task.rendered_result_dir.path, "trace", run_id),
+            "prometheus_dir": settings.RENDER_TRACE_PROMETHEUS_DIR,
+            "sinks": [sink for sink in trace_sinks if sink != "database"],
+        }
+        if "database" in trace_sinks:
+            database_sink = tracing.DatabaseSink(RenderSpan, rendering_task=render_task)
+        tracing.configure(trace_config, [database_sink] if database_sink else [])
+
         # 写入信息文件
         os.makedirs(render_task.rendered_result_dir.path, exist_ok=True)
         full_filepath = os.path.join(render_task.rendered_result_dir.path, "info.txt")
@@ -37,10 +54,11 @@ def execute_render_task(render_id):
             f.write(f"渲染时间: {render_task.render_time.astimezone(timezone.get_default_timezone())}\n")
             f.write(f"渲染器类型: {render_task.renderer_type}\n")
             f.write(f"图像分辨率: {render_task.image_width} × {render_task.image_height}\n")
-            f.write(f"总像素数: {render_task.image_pixels}\n\n")
+            f.write(f"总像素数: {render_task.image_pixels}\n")
+            f.write(f"图像格式: {render_task.image_format}（PNG压缩率 {render_task.image_compression}%，"
+                    f"质量 {render_task.image_quality}）\n\n")
 
             f.write(f"=== 模型信息 ===\n")
-            scene_model_list = []
             scene_models_num = render_task.scene_models.count()
             f.write(f"场景模型数量: {scene_models_num}\n")
             if render_task.scene_models.exists():
@@ -50,13 +68,6 @@ def execute_render_task(render_id):
                     category_names = ", ".join(all_categories)
                     f.write(f"  场景模型{i}: {scene_model.scene_model.model_id} ({category_names})\n")
 
-                    scene_model_list.append({
-                        "path": scene_model.scene_model.file.path,
-                        "class": all_categories,
-                        "points": scene_model.points,
-                    })
-
-            target_model_list = []
             target_models_num = render_task.target_models.count()
             f.write(f"目标模型数量: {target_models_num}\n")
             if render_task.target_models.exists():
@@ -66,63 +77,90 @@ def execute_render_task(render_id):
                     category_names = ", ".join(all_categories)
                     f.write(f"  目标模型{i}: {target_model.model_id} ({category_names})\n")
 
-                    target_model_list.append({
-                        "path": target_model.file.path,
-                        "class": all_categories,
-                    })
-
             f.write(f"\n=== 光照参数 ===\n")
             f.write(f"日光方位角: {render_task.sun_azimuth}°\n")
-            f.write(f"日光高低角: {render_task.sun_elevation}°\n\n")
+            f.write(f"日光高低角: {render_task.sun_elevation}°\n")
+            f.write(f"光照随机化: {render_task.lighting_randomization or '不随机化'}\n\n")
 
             f.write(f"=== 相机参数 ===\n")
             f.write(f"相机距离列表: {render_task.camera_distances}\n")
             f.write(f"相机高低角列表: {render_task.camera_elevations}\n")
-            f.write(f"相机方位角间隔: {render_task.camera_rotation_step}°\n\n")
+            f.write(f"相机方位角间隔: {render_task.camera_rotation_step}°\n")
+            f.write(f"位姿采样策略: {render_task.get_pose_strategy_display()}\n")
+            if render_task.pose_strategy != 'grid':
+                f.write(f"每个目标图像数量: {render_task.pose_budget}\n")
+                f.write(f"位姿随机种子: {render_task.pose_seed}\n")
+            f.write(f"观察点抖动半径: {render_task.look_at_jitter}米\n\n")
+
+            f.write(f"=== 目标摆放 ===\n")
+            f.write(f"每帧目标数量: {render_task.targets_per_frame}\n")
+            f.write(f"标注方式: {render_task.get_annotation_mode_display()}\n")
+            f.write(f"预渲染宽度: {render_task.prepass_width or '不预渲染'}\n")
+            f.write(f"LOD 误差阈值（像素）: {render_task.lod_pixel_error or '不切换 LOD'}\n")
+            f.write(f"贴图降采样: {'按分辨率与相机距离选择' if render_task.texture_downscale else '使用原始贴图'}\n\n")
         render_task.render_progress = 0.1
         render_task.save()
 
         # 开始渲染
-        config = {
-            "render_id": "Dataset",
-            "scene_model": None,
-            "target_model_list": None,
-            "output_dir": render_task.rendered_result_dir.path,
-            "renderer": render_task.renderer_type,
-            "resolution": [render_task.image_width, render_task.image_height],
-            "sun_azimuth_deg": render_task.sun_azimuth,
-            "sun_elevation_deg": render_task.sun_elevation,
-            "camera_distances": render_task.camera_distances,
-            "camera_elevations": render_task.camera_elevations,
-            "camera_rotation_step_deg": render_task.camera_rotation_step,
-            "index": None,
-        }
-
-        index = 0
-        render_task_index = 0
-        render_task_num = scene_models_num
-        delta_progress = 1 / render_task_num * 0.8
-
-        for scene_model in scene_model_list:
-            render_task_index += 1
-            print(f"➡️ ========== 渲染场景 {render_task_index} / {render_task_num} 开始 ==========")
-            config.update({
-                "scene_model": scene_model,
-                "target_model_list": target_model_list,
-                "index": index,
-            })
-            index, _ = SceneRenderer.main(config)
-            render_task.render_progress += delta_progress
+        scene_model_list, target_model_list = render_task.render_model_lists()
+        config = render_task.render_config()
+        config.update({
+            "image_write_mode": settings.RENDER_IMAGE_WRITE_MODE,
+            "render_cache_dir": settings.RENDER_CACHE_DIR,
+            "trace": dict(trace_config, sinks=sorted(set(trace_config["sinks"]) |
+                                                     ({"jsonl"} if database_sink else set()))),
+        })
+
+        # 按 (场景, 目标) 拆分工作单元并分发到常驻 Blender 进程（同一场景复用已导入的进程）
+        worker_num = max(1, settings.RENDER_WORKER_NUM)
+        config["render_threads"] = max(1, (os.cpu_count() or 1) // worker_num) if worker_num > 1 else None
+        units = render_farm.build_work_units(config, scene_model_list, target_model_list)
+
+        # 增量失效：删除内容键不再需要的图像，已有图像在渲染时跳过
+        dataset_path = os.path.join(render_task.rendered_result_dir.path, config["render_id"])
+        with tracing.span("prune_dataset"):
+            render_farm.prune_dataset(dataset_path, units)
+        print(f"➡️ ========== 渲染开始：{len(units)} 个工作单元，{worker_num} 个渲染进程 ==========")
+
+        def on_unit_done(done, total, unit_name, image_count):
+            # 汇总各工作单元进度（0.1 - 0.9）
+            render_task.render_progress = 0.1 + 0.8 * done / total
             render_task.save()
-            print(f"🔆 ========== 渲染场景 {render_task_index} / {render_task_num} 完成 ==========")
+
+        # 渲染过程中增量导入FiftyOne（常驻导入进程，失败时渲染结束后改用导入脚本）
+        dataset_name = str(render_id)
+        if settings.FIFTYONE_INGEST_MODE == "incremental":
+            try:
+                ingestor = ingest_client.IncrementalIngestor(ingest_client.get_worker(settings.FIFTYONE_ENV),
+                                                             dataset_name, dataset_path)
+                ingestor.start(interval=settings.FIFTYONE_INGEST_INTERVAL)
+            except Exception as e:
+                print(f"⚠️ FiftyOne 导入进程启动失败，渲染结束后使用导入脚本: {e}")
+                ingestor = None
+
+        with tracing.span("render_units", units=len(units), workers=worker_num):
+            index = render_farm.run_work_units(units, worker_num, on_unit_done, settings.RENDER_WORKER_MEMORY_MB)
+        with tracing.span("merge_annotations"):
+            render_farm.merge_annotation_fragments(dataset_path)
+        if settings.RENDER_CACHE_DIR:
+            with tracing.span("cache_evict"):
+                RenderCache(settings.RENDER_CACHE_DIR, int(settings.RENDER_CACHE_MAX_GB * 1024 ** 3)).evict()
+        print(f"🔆 ========== 渲染完成：共 {index} 张图像 ==========")
 
         # 导入FiftyOne
         print(f"➡️ 导入数据集 {render_id} 到FiftyOne")
-        script_path = os.path.join(settings.BASE_DIR, "utils", "fifty_one", "show_in_fiftyone.py")
-        dataset_path = os.path.join(render_task.rendered_result_dir.path, "Dataset")
-        dataset_name = str(render_id)
-        execute_external_python_script.main(settings.FIFTYONE_ENV, script_path, dataset_path, dataset_name)
-        print("🔆 数据集导入FiftyOne完成")
+        with tracing.span("fiftyone_import", images=index, mode="incremental" if ingestor else "script"):
+            if ingestor is not None:
+                try:
+                    sample_count = ingestor.finish()
+                    print(f"🔆 数据集增量导入FiftyOne完成 | 共 {sample_count} 个样本")
+                except Exception as e:
+                    print(f"⚠️ FiftyOne 增量导入失败，改用导入脚本: {e}")
+                    ingestor = None
+            if ingestor is None:
+                script_path = os.path.join(settings.BASE_DIR, "utils", "fifty_one", "show_in_fiftyone.py")
+                execute_external_python_script.main(settings.FIFTYONE_ENV, script_path, dataset_path, dataset_name)
+                print("🔆 数据集导入FiftyOne完成")
 
         render_task.render_progress = 1
         render_task.save()
@@ -132,12 +170,22 @@ def execute_render_task(render_id):
         import logging
         logging.error(f"渲染失败: {str(e)}")
         return f"\n❌ 渲染任务：{render_id} 渲染失败"
+    finally:
+        if ingestor is not None:
+            ingestor.stop()
+        finish_tracing(trace_config, database_sink)
 
 
-def get_parent_categories(all_categories):
-    for cat in list(all_categories):
-        parent = cat.parent
-        while parent:
-            all_categories.add(parent)
-            parent = parent.parent
-    return all_categories
+def finish_tracing(trace_config, database_sink):
+    """
+    结束阶段计时：将渲染进程的计时记录导入数据库，并关闭各记录端
+    """
+    try:
+        if trace_config and database_sink:
+            own_file = os.path.join(trace_config["trace_dir"], f"spans_{os.getpid()}.jsonl")
+            for span in tracing.read_spans(trace_config["trace_dir"], exclude=[own_file]):
+                database_sink.emit(span)
+    except Exception as e:
+        print(f"⚠️ 计时记录导入数据库失败: {e}")
+    finally:
+        tracing.get_tracer().close()
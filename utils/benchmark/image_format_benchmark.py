@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午5:55
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : image_format_benchmark.py
+# @Project : RealEarthStudio
+# @Details : 图像格式基准测试：统计各输出格式 / 压缩参数的单张编码耗时与文件大小
+#
+# 用法：python utils/benchmark/image_format_benchmark.py [样例图像路径] [--repeat 5] [--output result.json]
+# 未指定样例图像时使用合成图像（建议使用一张真实渲染结果，压缩率与实际数据集更接近）
+
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import bpy
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from utils.rearth import image_writer
+
+# (名称, 文件格式, 参数)
+FORMAT_CASES = [
+    ("PNG 压缩率 0%", "PNG", {"compression": 0}),
+    ("PNG 压缩率 15%", "PNG", {"compression": 15}),
+    ("PNG 压缩率 50%", "PNG", {"compression": 50}),
+    ("PNG 压缩率 100%", "PNG", {"compression": 100}),
+    ("JPEG 质量 80", "JPEG", {"quality": 80}),
+    ("JPEG 质量 95", "JPEG", {"quality": 95}),
+    ("WebP 质量 80", "WEBP", {"quality": 80}),
+    ("WebP 无损", "WEBP", {"quality": 100}),
+    ("OpenEXR 半精度 ZIP", "OPEN_EXR", {"exr_codec": "ZIP"}),
+]
+
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp", "OPEN_EXR": ".exr"}
+
+
+def synthetic_pixels(width=1920, height=1080, seed=0):
+    """
+    合成测试图像：天空渐变 + 随机色块 + 纹理噪声（线性 RGBA，自下而上）
+    """
+    rng = np.random.default_rng(seed)
+    y = np.arange(height, dtype=np.float32)[:, None]
+    rgba = np.ones((height, width, 4), dtype=np.float32)
+    rgba[..., 0] = 0.3 + 0.2 * y / height
+    rgba[..., 1] = 0.4 + 0.2 * y / height
+    rgba[..., 2] = 0.6 + 0.3 * y / height
+    for _ in range(200):
+        x0, y0 = rng.integers(0, width), rng.integers(0, height // 2)
+        w, h = rng.integers(20, 200), rng.integers(20, 300)
+        rgba[y0:y0 + h, x0:x0 + w, :3] = rng.random(3)
+    rgba[..., :3] += rng.normal(0, 0.02, (height, width, 3)).astype(np.float32)
+    return np.clip(rgba, 0, 1), width, height
+
+
+def load_source(path=None):
+    """
+    读取样例图像（或生成合成图像）为 Blender 图像
+    """
+    if path:
+        image = bpy.data.images.load(path)
+        width, height = image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        # 8 位图像的像素值为 sRGB 编码，转回线性颜色供异步编码器使用
+        rgba = pixels.reshape(-1, 4)
+        rgba[:, :3] = np.where(rgba[:, :3] <= 0.04045, rgba[:, :3] / 12.92, ((rgba[:, :3] + 0.055) / 1.055) ** 2.4)
+        return image, pixels, width, height
+
+    rgba, width, height = synthetic_pixels()
+    image = bpy.data.images.new("benchmark", width, height, alpha=True, float_buffer=True)
+    pixels = rgba.ravel()
+    image.pixels.foreach_set(pixels)
+    return image, pixels, width, height
+
+
+def configure(scene, file_format, options):
+    """
+    按测试用例设置场景输出参数（与 SceneRenderer.set_image_format 一致）
+    """
+    scene.view_settings.view_transform = 'Standard'
+    image_settings = scene.render.image_settings
+    image_settings.file_format = file_format
+    image_settings.color_mode = 'RGB' if file_format == "JPEG" else 'RGBA'
+    if file_format == "PNG":
+        image_settings.color_depth = '8'
+        image_settings.compression = options["compression"]
+    elif file_format in ("JPEG", "WEBP"):
+        image_settings.quality = options["quality"]
+    else:
+        image_settings.color_depth = '16'
+        image_settings.exr_codec = options["exr_codec"]
+
+
+def benchmark(source=None, repeat=5):
+    """
+    执行基准测试
+    :param source: 样例图像路径，None 表示使用合成图像
+    :param repeat: 每种格式的重复次数（取中位数）
+    :return: 结果列表
+    """
+    scene = bpy.context.scene
+    image, pixels, width, height = load_source(source)
+    print(f"📋 样例图像: {source or '合成图像'} ({width} × {height})，每种格式重复 {repeat} 次")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Blender 编码（同步写出模式）
+        for name, file_format, options in FORMAT_CASES:
+            configure(scene, file_format, options)
+            path = os.path.join(tmp_dir, f"sample{EXTENSIONS[file_format]}")
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                image.save_render(path, scene=scene)
+                durations.append(time.perf_counter() - start)
+            results.append({"name": name, "format": file_format, "options": options,
+                            "encode_ms": float(np.median(durations)) * 1000, "bytes": os.path.getsize(path)})
+
+        # NumPy + zlib 编码（异步写出模式）
+        for level in (1, 6, 9):
+            path = os.path.join(tmp_dir, "sample_async.png")
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                image_writer.write_file_durable(
+                    path, image_writer.encode_png(image_writer.float_to_rgba8(pixels, width, height), level))
+                durations.append(time.perf_counter() - start)
+            results.append({"name": f"PNG 异步编码 zlib {level}", "format": "PNG", "options": {"zlib_level": level},
+                            "encode_ms": float(np.median(durations)) * 1000, "bytes": os.path.getsize(path)})
+
+    raw_bytes = width * height * 4
+    print(f"{'格式':<22}{'编码耗时(ms)':>14}{'文件大小(KB)':>14}{'压缩比':>10}")
+    for result in results:
+        print(f"{result['name']:<22}{result['encode_ms']:>14.1f}{result['bytes'] / 1024:>14.1f}"
+              f"{raw_bytes / result['bytes']:>10.2f}")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="图像格式基准测试")
+    parser.add_argument("source", nargs="?", default=None, help="样例图像路径")
+    parser.add_argument("--repeat", type=int, default=5, help="每种格式的重复次数")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径")
+    args = parser.parse_args()
+
+    RESULTS = benchmark(args.source, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(RESULTS, f, indent=4, ensure_ascii=False)
+        print(f"📄 结果已保存: {args.output}")
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午6:30
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_benchmark.py
+# @Project : RealEarthStudio
+# @Details : SceneRenderer 渲染基准测试：程序化生成场景与目标，按阶段统计耗时并与基线对比
+#
+# 用法：python utils/benchmark/render_benchmark.py [--renderers EEVEE CYCLES] [--output result.json]
+#                                               [--baseline render_baseline.json] [--save-baseline]
+# 存在回退（吞吐量或阶段耗时超出容差）时返回码为 1
+
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import platform
+import argparse
+import tempfile
+import functools
+from collections import defaultdict
+
+import bpy
+import bmesh
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from utils.rearth.SceneRenderer import SceneRenderer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_baseline.json")
+
+# 统计的阶段：(方法名, 阶段名)，阶段耗时不含嵌套阶段
+PHASES = [
+    ("load_scene_model", "scene_load"),
+    ("load_occluder", "occluder_load"),
+    ("load_target_model", "target_import"),
+    ("plan_poses", "visibility"),
+    ("render_image", "render"),
+    ("write_image", "write"),
+    ("save_annotation", "annotation"),
+]
+
+
+class PhaseRecorder:
+    """ 阶段计时（替换 SceneRenderer 方法，统计各阶段的独占耗时） """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.stack = []
+        self.patched = []
+
+    def wrap(self, owner, attr, phase):
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            self.stack.append(0.0)
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.totals[phase] += elapsed - self.stack.pop()
+                self.counts[phase] += 1
+                if self.stack:
+                    self.stack[-1] += elapsed
+
+        setattr(owner, attr, wrapper)
+        self.patched.append((owner, attr, original))
+
+    def install(self, owner=SceneRenderer):
+        for attr, phase in PHASES:
+            self.wrap(owner, attr, phase)
+
+    def restore(self):
+        for owner, attr, original in reversed(self.patched):
+            setattr(owner, attr, original)
+        self.patched = []
+
+    def summary(self):
+        return {phase: {"total_s": self.totals[phase], "count": self.counts[phase],
+                        "mean_ms": self.totals[phase] / self.counts[phase] * 1000 if self.counts[phase] else 0.0}
+                for _, phase in PHASES}
+
+
+def subdivided_box(name, size, triangles):
+    """
+    生成细分立方体网格（底面位于 z=0），三角面数接近指定值
+    :param name: 网格名称
+    :param size: (长, 宽, 高)
+    :param triangles: 期望三角面数
+    """
+    cuts = max(0, round(math.sqrt(triangles / 12)) - 1)
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=1.0)
+    if cuts:
+        bmesh.ops.subdivide_edges(bm, edges=bm.edges[:], cuts=cuts, use_grid_fill=True)
+    bmesh.ops.triangulate(bm, faces=bm.faces[:])
+    bmesh.ops.scale(bm, vec=size, verts=bm.verts)
+    bmesh.ops.translate(bm, vec=(0, 0, size[2] / 2), verts=bm.verts)
+    mesh = bpy.data.meshes.new(name)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def build_scene(path, grid=6, spacing=30.0, building_triangles=20000, seed=0):
+    """
+    生成街区场景：地面 + grid × grid 栋建筑（原点位于路口，目标放置处无建筑）
+    :param path: 输出 .blend 路径
+    :param grid: 每行建筑数量
+    :param spacing: 建筑间距（米）
+    :param building_triangles: 每栋建筑的三角面数
+    :param seed: 随机种子
+    :return: 场景三角面数
+    """
+    rng = random.Random(seed)
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+
+    ground = bpy.data.objects.new("ground", subdivided_box("ground", (grid * spacing * 1.5,) * 2 + (0.1,), 12))
+    ground.location.z = -0.1
+    scene.collection.objects.link(ground)
+
+    triangle_count = 12
+    for i in range(grid):
+        for j in range(grid):
+            if grid % 2 and i == j == grid // 2:
+                continue
+            footprint = rng.uniform(0.4, 0.6) * spacing
+            height = rng.uniform(10, 60)
+            mesh = subdivided_box(f"building_{i}_{j}", (footprint, footprint, height), building_triangles)
+            building = bpy.data.objects.new(f"building_{i}_{j}", mesh)
+            building.location = ((i - (grid - 1) / 2) * spacing, (j - (grid - 1) / 2) * spacing, 0)
+            scene.collection.objects.link(building)
+            triangle_count += len(mesh.polygons)
+
+    bpy.ops.wm.save_as_mainfile(filepath=path)
+    return triangle_count
+
+
+def build_target(path, triangles=50000):
+    """
+    生成轿车尺寸的目标模型（车身 + 车顶）并导出为 .glb
+    :param path: 输出 .glb 路径
+    :param triangles: 目标三角面数
+    :return: 目标三角面数
+    """
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    scene = bpy.context.scene
+    body = bpy.data.objects.new("body", subdivided_box("body", (1.8, 4.5, 0.9), triangles * 2 // 3))
+    body.location.z = 0.3
+    cabin = bpy.data.objects.new("cabin", subdivided_box("cabin", (1.6, 2.4, 0.6), triangles // 3))
+    cabin.location.z = 1.2
+    for obj in (body, cabin):
+        scene.collection.objects.link(obj)
+    bpy.ops.export_scene.gltf(filepath=path, export_format='GLB')
+    return len(body.data.polygons) + len(cabin.data.polygons)
+
+
+def run_benchmark(scene_path, target_path, renderer, args):
+    """
+    以指定渲染器运行一次固定位姿网格的渲染
+    :return: 结果字典
+    """
+    recorder = PhaseRecorder()
+    recorder.install()
+    start = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            scene_renderer = SceneRenderer({"path": scene_path, "class": ["基准场景"], "points": None},
+                                           [{"path": target_path, "class": ["基准目标"]}],
+                                           render_id=f"benchmark_{renderer.lower()}", output_dir=output_dir)
+            scene_renderer.configure_sun(azimuth_deg=45, elevation_deg=60)
+            scene_renderer.set_resolution(*args.resolution)
+            scene_renderer.set_image_format(args.image_format)
+            scene_renderer.set_renderer(renderer)
+            if scene_renderer.renderer == "CYCLES":
+                scene_renderer.scene.cycles.device = 'CPU'
+            scene_renderer.set_image_write_mode(args.write_mode)
+            scene_renderer.batch_render_with_annotations(args.distances, args.elevations, args.step)
+            scene_renderer.set_image_write_mode("sync")
+            image_count = scene_renderer.index
+            planned_count = scene_renderer.planned_count
+    finally:
+        recorder.restore()
+    wall_s = time.perf_counter() - start
+
+    result = {
+        "renderer": renderer,
+        "images": image_count,
+        "planned": planned_count,
+        "wall_s": wall_s,
+        "images_per_minute": image_count / wall_s * 60 if wall_s else 0.0,
+        "phases": recorder.summary(),
+    }
+    print(f"🔆 {renderer} 完成 | {image_count} 张图像，{wall_s:.1f} 秒，{result['images_per_minute']:.1f} 张/分钟")
+    return result
+
+
+def compare(results, baseline, tolerance=0.1, min_delta_ms=1.0):
+    """
+    与基线对比，返回回退项列表
+    :param results: 本次结果
+    :param baseline: 基线结果
+    :param tolerance: 容差（相对值）
+    :param min_delta_ms: 阶段耗时的最小绝对差值（毫秒），低于该值不视为回退
+    """
+    regressions = []
+    baseline_runs = {run["renderer"]: run for run in baseline.get("runs", [])}
+    for run in results["runs"]:
+        base = baseline_runs.get(run["renderer"])
+        if base is None:
+            print(f"⚠️ 基线中没有 {run['renderer']} 的结果")
+            continue
+
+        change = run["images_per_minute"] / base["images_per_minute"] - 1 if base["images_per_minute"] else 0.0
+        print(f"📋 {run['renderer']} 吞吐量: {base['images_per_minute']:.1f} → {run['images_per_minute']:.1f} 张/分钟 "
+              f"({change:+.1%})")
+        if change < -tolerance:
+            regressions.append(f"{run['renderer']} 吞吐量下降 {-change:.1%}")
+
+        for phase, stats in run["phases"].items():
+            base_stats = base["phases"].get(phase)
+            if not base_stats or not base_stats["count"]:
+                continue
+            delta_ms = stats["mean_ms"] - base_stats["mean_ms"]
+            print(f"    {phase:<14}{base_stats['mean_ms']:>10.1f} → {stats['mean_ms']:>10.1f} ms")
+            if delta_ms > min_delta_ms and stats["mean_ms"] > base_stats["mean_ms"] * (1 + tolerance):
+                regressions.append(f"{run['renderer']} {phase} 平均耗时 {base_stats['mean_ms']:.1f} → "
+                                   f"{stats['mean_ms']:.1f} ms")
+    return regressions
+
+
+def main(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="render_benchmark_")
+    os.makedirs(work_dir, exist_ok=True)
+    scene_path = os.path.join(work_dir, "benchmark_scene.blend")
+    target_path = os.path.join(work_dir, "benchmark_target.glb")
+
+    scene_triangles = build_scene(scene_path, args.grid, args.spacing, args.building_triangles, args.seed)
+    target_triangles = build_target(target_path, args.target_triangles)
+    print(f"✅ 基准场景生成完成 | 场景三角面数：{scene_triangles}，目标三角面数：{target_triangles}")
+
+    results = {
+        "meta": {
+            "blender": bpy.app.version_string,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "scene_triangles": scene_triangles,
+            "target_triangles": target_triangles,
+            "config": {key: value for key, value in vars(args).items()
+                       if key not in ("output", "baseline", "save_baseline", "work_dir", "tolerance")},
+        },
+        "runs": [run_benchmark(scene_path, target_path, renderer.upper(), args) for renderer in args.renderers],
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"📄 结果已保存: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        print(f"📄 基线已保存: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️ 基线文件不存在，跳过对比: {args.baseline}")
+        return 0
+    with open(args.baseline, 'r', encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["meta"]["config"] != results["meta"]["config"]:
+        print("⚠️ 基线的测试配置与本次不同，对比结果仅供参考")
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"❌ 性能回退: {regression}")
+    if not regressions:
+        print("✅ 未发现性能回退")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="SceneRenderer 渲染基准测试")
+    parser.add_argument("--renderers", nargs="+", default=["EEVEE", "CYCLES"], help="渲染器（Cycles 固定使用 CPU）")
+    parser.add_argument("--grid", type=int, default=6, help="每行建筑数量")
+    parser.add_argument("--spacing", type=float, default=30.0, help="建筑间距（米）")
+    parser.add_argument("--building-triangles", type=int, default=20000, help="每栋建筑的三角面数")
+    parser.add_argument("--target-triangles", type=int, default=50000, help="目标三角面数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--resolution", type=int, nargs=2, default=[960, 540], help="渲染分辨率")
+    parser.add_argument("--distances", type=float, nargs="+", default=[30, 60], help="相机距离列表")
+    parser.add_argument("--elevations", type=float, nargs="+", default=[30, 60], help="相机高低角列表")
+    parser.add_argument("--step", type=float, default=90, help="相机方位角间隔")
+    parser.add_argument("--image-format", default="PNG", help="图像格式")
+    parser.add_argument("--write-mode", default="sync", help="图像写出方式（sync / async）")
+    parser.add_argument("--work-dir", default=None, help="基准场景生成目录（默认临时目录）")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线 JSON 文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="回退判定容差（相对值）")
+    sys.exit(main(parser.parse_args()))
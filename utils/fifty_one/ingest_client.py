@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午8:20
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : ingest_client.py
+# @Project : RealEarthStudio
+# @Details : 常驻 FiftyOne 导入进程的客户端：渲染过程中增量读取标注记录并分批导入（不依赖 fiftyone）
+
+
+import os
+import glob
+import json
+import atexit
+import threading
+import subprocess
+
+INGEST_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest_worker.py")
+
+
+class IngestWorker:
+    """ 常驻 FiftyOne 导入进程（在 FiftyOne 的 Python 环境中运行 ingest_worker.py） """
+
+    def __init__(self, python_path, script_path=INGEST_SCRIPT):
+        self.process = subprocess.Popen([python_path, script_path], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding="utf-8", bufsize=1)
+        self.lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, cmd, **kwargs):
+        """
+        发送请求并等待响应
+        :param cmd: create / add / finalize / delete / ping
+        :return: 响应字典
+        """
+        with self.lock:
+            if not self.alive:
+                raise RuntimeError("FiftyOne 导入进程已退出")
+            self.process.stdin.write(json.dumps({"cmd": cmd, **kwargs}, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("FiftyOne 导入进程已退出")
+        response = json.loads(line)
+        if not response.pop("ok"):
+            raise RuntimeError(f"FiftyOne 导入失败: {response['error']}")
+        return response
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+_worker = None
+
+
+def get_worker(python_path):
+    """
+    获取当前进程内的常驻导入进程（进程退出后自动重启）
+    """
+    global _worker
+    if _worker is None or not _worker.alive:
+        _worker = IngestWorker(python_path)
+        atexit.register(_worker.close)
+        _worker.request("ping")
+    return _worker
+
+
+class IncrementalIngestor:
+    """ 增量导入：跟踪各标注分片（JSON Lines）的读取位置，只发送新增的完整记录 """
+
+    def __init__(self, worker, dataset_name, dataset_dir, pattern="metadata_*.jsonl", batch_size=200):
+        """
+        初始化对象
+        :param worker: IngestWorker
+        :param dataset_name: FiftyOne 数据集名称
+        :param dataset_dir: 数据集目录（图像与标注分片所在目录）
+        :param pattern: 标注分片匹配模式
+        :param batch_size: 每批导入的记录数
+        """
+        self.worker = worker
+        self.dataset_name = dataset_name
+        self.dataset_dir = dataset_dir
+        self.pattern = pattern
+        self.batch_size = batch_size
+        self.offsets = {}
+        self.ingested = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def start(self, interval=None):
+        """
+        新建数据集，可选地启动后台线程定期导入
+        :param interval: 后台导入间隔（秒），None 表示不启动后台线程
+        """
+        self.worker.request("create", dataset=self.dataset_name, overwrite=True)
+        if interval:
+            self.thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self.thread.start()
+
+    def _run(self, interval):
+        while not self.stop_event.wait(interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # 后台导入失败时停止，由 finish 抛出
+                self.error = e
+                break
+
+    def _read_new_records(self, path):
+        """读取分片中新增的完整行（分片被重写时从头读取，重复的图像由导入进程替换）"""
+        stat = os.stat(path)
+        inode, offset = self.offsets.get(path, (stat.st_ino, 0))
+        if inode != stat.st_ino or stat.st_size < offset:
+            offset = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        self.offsets[path] = (stat.st_ino, offset + end)
+
+        records = []
+        for line in data[:end].splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+    def poll(self):
+        """
+        导入所有分片中新增的记录
+        :return: 本次导入的记录数
+        """
+        records = []
+        for path in sorted(glob.glob(os.path.join(self.dataset_dir, self.pattern))):
+            # 跳过断点中的剔除位姿记录（没有图像）
+            records += [record for record in self._read_new_records(path) if not record.get("rejected")]
+        for start in range(0, len(records), self.batch_size):
+            batch = [{"filename": record["filename"], "annotations": record["annotations"]}
+                     for record in records[start:start + self.batch_size]]
+            self.worker.request("add", dataset=self.dataset_name, image_dir=self.dataset_dir, records=batch)
+        self.ingested += len(records)
+        return len(records)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def finish(self):
+        """
+        停止后台导入，导入剩余记录并完成数据集
+        :return: 数据集样本数
+        """
+        self.stop()
+        if self.error is not None:
+            raise self.error
+        self.poll()
+        return self.worker.request("finalize", dataset=self.dataset_name)["samples"]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午8:00
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : ingest_worker.py
+# @Project : RealEarthStudio
+# @Details : 常驻 FiftyOne 导入进程：从 stdin 逐行读取 JSON 请求，增量添加样本，结果逐行写回 stdout
+#
+# 请求：{"cmd": "create" | "add" | "finalize" | "delete" | "ping", "dataset": 数据集名称, ...}
+# 响应：{"ok": true, ...} 或 {"ok": false, "error": 错误信息}
+
+
+import os
+import sys
+import json
+import traceback
+
+import fiftyone as fo
+
+from show_in_fiftyone import build_sample
+
+
+class IngestState:
+    """ 导入状态（每个数据集：已导入图像路径 -> 样本ID） """
+
+    def __init__(self):
+        self.datasets = {}
+        self.sample_ids = {}
+
+    def get_dataset(self, name):
+        if name not in self.datasets:
+            self.datasets[name] = fo.load_dataset(name)
+            self.sample_ids[name] = dict(zip(*self.datasets[name].values(["filepath", "id"])))
+        return self.datasets[name]
+
+    def create(self, dataset, overwrite=True, **_):
+        if dataset in fo.list_datasets():
+            if not overwrite:
+                self.get_dataset(dataset)
+                return {"samples": len(self.sample_ids[dataset])}
+            fo.delete_dataset(dataset)
+        self.datasets[dataset] = fo.Dataset(dataset)
+        self.sample_ids[dataset] = {}
+        return {"samples": 0}
+
+    def add(self, dataset, image_dir, records, **_):
+        """
+        添加一批标注记录（同一图像重复导入时替换原样本）
+        :param records: [{"filename": 图像文件名, "annotations": [...]}, ...]
+        """
+        ds = self.get_dataset(dataset)
+        sample_ids = self.sample_ids[dataset]
+
+        samples = []
+        for record in records:
+            img_path = os.path.join(image_dir, record["filename"])
+            if not os.path.exists(img_path) or not record["annotations"]:
+                continue
+            samples.append(build_sample(img_path, record["annotations"]))
+
+        replaced = [sample_ids[sample.filepath] for sample in samples if sample.filepath in sample_ids]
+        if replaced:
+            ds.delete_samples(replaced)
+        if samples:
+            sample_ids.update(zip([sample.filepath for sample in samples], ds.add_samples(samples, progress=False)))
+        return {"added": len(samples), "replaced": len(replaced), "samples": len(sample_ids)}
+
+    def finalize(self, dataset, **_):
+        """
+        完成导入：补全缺少图像元数据的样本（正常情况下由渲染器提供，不会重新读取图像）
+        """
+        ds = self.get_dataset(dataset)
+        ds.compute_metadata(progress=False)
+        count = len(ds)
+        self.datasets.pop(dataset, None)
+        self.sample_ids.pop(dataset, None)
+        return {"samples": count}
+
+    def delete(self, dataset, **_):
+        self.datasets.pop(dataset, None)
+        self.sample_ids.pop(dataset, None)
+        if dataset in fo.list_datasets():
+            fo.delete_dataset(dataset)
+        return {}
+
+
+def main():
+    # stdout 仅用于响应，其余输出（包括 FiftyOne 的日志）转到 stderr
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    state = IngestState()
+    handlers = {"create": state.create, "add": state.add, "finalize": state.finalize, "delete": state.delete,
+                "ping": lambda **_: {}}
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            response = {"ok": True, **handlers[request.pop("cmd")](**request)}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+        protocol_out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == '__main__':
+    main()
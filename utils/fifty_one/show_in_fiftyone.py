@@ -13,6 +13,66 @@ import json
 import fiftyone as fo
 
 
+def build_sample(img_path, anns):
+    """
+    由一张图像的标注创建样本（标注含 image_size 时直接写入图像元数据，无需 compute_metadata 重新读取图像）
+    :param img_path: 图像路径
+    :param anns: 该图像的标注列表
+    """
+    detections = []
+    for ann in anns:
+        x, y, w, h = ann["bbox"]
+        rel_bbox = [x - w / 2, y - h / 2, w, h]
+
+        label_tags = list(ann["target_class"])
+        occlusion = ann["occlusion"]
+        if occlusion <= 0.05:
+            label_tags.append("未遮挡")
+        elif occlusion <= 0.3:
+            label_tags.append("轻度遮挡")
+        elif occlusion <= 0.5:
+            label_tags.append("中度遮挡")
+        else:
+            label_tags.append("重度遮挡")
+
+        detection = fo.Detection(
+            label=ann["target_class"][0],
+            bounding_box=rel_bbox,
+            confidence=1,
+            occlusion=occlusion,
+            tags=label_tags,
+        )
+        detections.append(detection)
+
+    # 创建样本
+    sample = fo.Sample(filepath=img_path)
+    sample["RealEarthStudio标注"] = fo.Detections(detections=detections)
+    sample["背景类别"] = anns[0]["scene_class"]
+    sample["光照强度"] = anns[0]["sun_energy"]
+    sample["光照方位角"] = anns[0]["sun_azimuth_deg"]
+    sample["光照俯仰角"] = anns[0]["sun_elevation_deg"]
+    sample["相机距离"] = anns[0]["distance"]
+    sample["相机方位角"] = anns[0]["azimuth_deg"]
+    elevation_deg = anns[0]["elevation_deg"]
+    sample["相机高低角"] = elevation_deg
+    sample["渲染器类型"] = anns[0]["renderer"]
+
+    # 图像元数据（由渲染器提供的分辨率）
+    if anns[0].get("image_size"):
+        width, height = anns[0]["image_size"]
+        sample.metadata = fo.ImageMetadata(width=width, height=height, size_bytes=os.path.getsize(img_path))
+
+    # 写入标签
+    if elevation_deg > 80:
+        sample.tags.append("顶视角")
+    elif elevation_deg > 30:
+        sample.tags.append("斜视角")
+    else:
+        sample.tags.append("大斜视角")
+
+    return sample
+
+
 def show_in_fiftyone(image_dir, dataset_name="dataset"):
     # 配置路径
     annotation_file = os.path.join(image_dir, "metadata.json")
@@ -26,59 +86,9 @@ def show_in_fiftyone(image_dir, dataset_name="dataset"):
         fo.delete_dataset(dataset_name)
     dataset = fo.Dataset(dataset_name)
 
-    samples = []
-    for img_name, anns in annotations.items():
-        img_path = os.path.join(image_dir, img_name)
-
-        detections = []
-        for ann in anns:
-            x, y, w, h = ann["bbox"]
-            rel_bbox = [x - w / 2, y - h / 2, w, h]
-
-            label_tags = ann["target_class"]
-            occlusion = ann["occlusion"]
-            if occlusion <= 0.05:
-                label_tags.append("未遮挡")
-            elif occlusion <= 0.3:
-                label_tags.append("轻度遮挡")
-            elif occlusion <= 0.5:
-                label_tags.append("中度遮挡")
-            else:
-                label_tags.append("重度遮挡")
-
-            detection = fo.Detection(
-                label=ann["target_class"][0],
-                bounding_box=rel_bbox,
-                confidence=1,
-                occlusion=occlusion,
-                tags=label_tags,
-            )
-            detections.append(detection)
-
-        # 创建样本
-        sample = fo.Sample(filepath=img_path)
-        sample["RealEarthStudio标注"] = fo.Detections(detections=detections)
-        sample["背景类别"] = anns[0]["scene_class"]
-        sample["光照强度"] = anns[0]["sun_energy"]
-        sample["光照方位角"] = anns[0]["sun_azimuth_deg"]
-        sample["光照俯仰角"] = anns[0]["sun_elevation_deg"]
-        sample["相机距离"] = anns[0]["distance"]
-        sample["相机方位角"] = anns[0]["azimuth_deg"]
-        elevation_deg = anns[0]["elevation_deg"]
-        sample["相机高低角"] = elevation_deg
-        sample["渲染器类型"] = anns[0]["renderer"]
-
-        # 写入标签
-        if elevation_deg > 80:
-            sample.tags.append("顶视角")
-        elif elevation_deg > 30:
-            sample.tags.append("斜视角")
-        else:
-            sample.tags.append("大斜视角")
-
-        samples.append(sample)
+    samples = [build_sample(os.path.join(image_dir, img_name), anns) for img_name, anns in annotations.items()]
 
-    # 批量添加
+    # 批量添加（已有图像元数据的样本不会重新读取图像）
     dataset.add_samples(samples)
     dataset.compute_metadata()
     dataset.sort_by("拍摄角度", reverse=True)
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午7:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : tracing.py
+# @Project : RealEarthStudio
+# @Details : 结构化阶段计时：各阶段以 span 记录耗时及任务/场景/目标信息，输出到可插拔的记录端
+
+
+import os
+import glob
+import json
+import time
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+class JsonlSink:
+    """ JSON Lines 文件（每个 span 一行） """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.file = open(path, 'a', encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def emit(self, span):
+        line = json.dumps(span, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class PrometheusTextfileSink:
+    """ Prometheus 文本文件（供 node_exporter textfile collector 采集，按阶段累计耗时与次数） """
+
+    def __init__(self, path, labels=None, interval=5.0):
+        """
+        初始化对象
+        :param path: .prom 文件路径
+        :param labels: 附加标签
+        :param interval: 最短重写间隔（秒）
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.labels = labels or {}
+        self.interval = interval
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.last_write = 0.0
+        self.lock = threading.Lock()
+
+    def emit(self, span):
+        with self.lock:
+            self.seconds[span["name"]] += span["duration"]
+            self.counts[span["name"]] += 1
+            if time.monotonic() - self.last_write >= self.interval:
+                self._write()
+
+    def _write(self):
+        def labels(phase):
+            items = {**self.labels, "phase": phase}
+            return ",".join(f'{key}="{value}"' for key, value in items.items())
+
+        lines = ["# HELP realearth_render_phase_seconds_total Total time spent in each render phase.",
+                 "# TYPE realearth_render_phase_seconds_total counter"]
+        lines += [f"realearth_render_phase_seconds_total{{{labels(phase)}}} {seconds:.6f}"
+                  for phase, seconds in sorted(self.seconds.items())]
+        lines += ["# HELP realearth_render_phase_count_total Number of completed render phase spans.",
+                  "# TYPE realearth_render_phase_count_total counter"]
+        lines += [f"realearth_render_phase_count_total{{{labels(phase)}}} {count}"
+                  for phase, count in sorted(self.counts.items())]
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+        self.last_write = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if self.counts:
+                self._write()
+
+
+class DatabaseSink:
+    """ 数据库（Django 模型，批量写入；模型需提供 from_span 将 span 转换为字段） """
+
+    def __init__(self, model, batch_size=200, **fields):
+        """
+        初始化对象
+        :param model: Django 模型类
+        :param batch_size: 批量写入条数
+        :param fields: 每条记录的固定字段（如所属渲染任务）
+        """
+        self.model = model
+        self.batch_size = batch_size
+        self.fields = fields
+        self.buffer = []
+        self.lock = threading.Lock()
+
+    def emit(self, span):
+        with self.lock:
+            self.buffer.append(span)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.model.objects.bulk_create([self.model(**self.fields, **self.model.from_span(span))
+                                            for span in self.buffer])
+            self.buffer = []
+
+    def close(self):
+        with self.lock:
+            self._flush()
+
+
+class Tracer:
+    """ 阶段计时器 """
+
+    def __init__(self, sinks=None, **context):
+        """
+        初始化对象
+        :param sinks: 记录端列表，为空时不记录
+        :param context: 公共字段（如 task_id、run_id）
+        """
+        self.sinks = list(sinks or [])
+        self.context = context
+
+    def set_context(self, **context):
+        """
+        更新公共字段（如当前场景、目标）
+        """
+        self.context.update(context)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        记录一个阶段
+        :param name: 阶段名称
+        :param attrs: 附加字段
+        """
+        if not self.sinks:
+            yield
+            return
+
+        start, begin = time.time(), time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.emit({"name": name, "start": start, "duration": time.perf_counter() - begin, "status": status,
+                       "pid": os.getpid(), **self.context, **attrs})
+
+    def emit(self, span):
+        for sink in self.sinks:
+            try:
+                sink.emit(span)
+            except Exception as e:
+                print(f"⚠️ 计时记录写入失败 ({type(sink).__name__}): {e}")
+
+    def close(self):
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                print(f"⚠️ 计时记录关闭失败 ({type(sink).__name__}): {e}")
+        self.sinks = []
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def span(name, **attrs):
+    """
+    在当前进程的计时器中记录一个阶段
+    """
+    return _tracer.span(name, **attrs)
+
+
+def set_context(**context):
+    _tracer.set_context(**context)
+
+
+def configure(trace_config=None, extra_sinks=()):
+    """
+    按配置重建当前进程的计时器
+    :param trace_config: dict(task_id, run_id, trace_dir, sinks)，sinks 可包含 jsonl / prometheus
+    :param extra_sinks: 额外的记录端（如 DatabaseSink）
+    :return: 计时器
+    """
+    global _tracer
+    _tracer.close()
+    trace_config = trace_config or {}
+    trace_dir = trace_config.get("trace_dir")
+    sink_names = trace_config.get("sinks", [])
+    context = {key: trace_config[key] for key in ("task_id", "run_id") if key in trace_config}
+
+    sinks = list(extra_sinks)
+    if trace_dir and "jsonl" in sink_names:
+        sinks.append(JsonlSink(os.path.join(trace_dir, f"spans_{os.getpid()}.jsonl")))
+    if "prometheus" in sink_names:
+        prometheus_dir = trace_config.get("prometheus_dir") or trace_dir
+        if prometheus_dir:
+            sinks.append(PrometheusTextfileSink(
+                os.path.join(prometheus_dir, f"realearth_render_{context.get('task_id', 'local')}_{os.getpid()}.prom"),
+                labels={**context, "pid": os.getpid()}))
+    _tracer = Tracer(sinks, **context)
+    return _tracer
+
+
+def read_spans(trace_dir, exclude=()):
+    """
+    读取目录下各进程的 JSON Lines 计时记录
+    :param trace_dir: 计时记录目录
+    :param exclude: 跳过的文件路径
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    for path in sorted(glob.glob(os.path.join(trace_dir, "spans_*.jsonl"))):
+        if os.path.abspath(path) in exclude:
+            continue
+        with open(path, 'r', encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
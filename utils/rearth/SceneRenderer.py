@@ -13,49 +13,82 @@ import random
 import string
 import bpy
 import math
-import json
 from mathutils import Vector, Matrix
 from pathlib import Path
 import numpy as np
 
 from utils.other.decorator_timer import timer
-from bpy_extras.object_utils import world_to_camera_view
+from utils.other import tracing
+from utils.rearth import visibility, pose_planner, pose_sampler, annotation_writer, render_checkpoint, render_keys, \
+    target_layout, instance_mask, lighting, target_library, scene_library, lod, scene_textures
+from utils.rearth.image_writer import AsyncImageWriter
+from utils.rearth.render_cache import RenderCache
+from utils.rearth.occluder_bvh import OccluderBVH, OccluderGroup
+
+# 图像格式对应的文件扩展名
+IMAGE_EXTENSIONS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "WEBP": ".webp",
+    "OPEN_EXR": ".exr",
+}
+
+# 低分辨率预渲染筛选时遮挡比例阈值的放宽量（低分辨率下细小部件的像素占比误差较大）
+PREPASS_OCCLUSION_MARGIN = 0.1
 
 
 class SceneRenderer:
     """ 场景渲染 """
 
     def __init__(self, scene_model, target_model_list, render_id=None,
-                 output_dir=r"D:\Projects\RealEarthStudio\Blender照片", index=0):
+                 output_dir=r"D:\Projects\RealEarthStudio\Blender照片", index=0,
+                 image_prefix="image", annotations_name="metadata.jsonl", texture_size=None):
         """
         初始化对象
         :param scene_model: 场景模型
         :param target_model_list: 目标模型
         :param output_dir: 渲染图像导出目录
         :param index: 已经渲染图像数量
+        :param image_prefix: 图像文件名前缀（文件名为 前缀_内容键）
+        :param annotations_name: 标注记录文件名（JSON Lines，多进程渲染时为各工作单元的标注分片）
+        :param texture_size: 场景贴图降采样版本的最大边长（scene_textures.task_texture_size），None 表示使用原始贴图
         """
-        # 生成渲染ID
-        self.render_id = render_id if render_id else self.generate_render_id()
-
-        # 获取输出文件夹
-        self.output_dir = os.path.join(output_dir, self.render_id)
-        self.annotations_file = os.path.join(self.output_dir, "metadata.json")
-
         # 导入场景模型
+        self.scene_model_path = scene_model["path"]
         self.scene_model_name = Path(scene_model["path"]).stem
+        tracing.set_context(scene=self.scene_model_name, target=None)
         self.scene_model_class = scene_model["class"]
         self.scene_model_point = scene_model["points"]
         if self.scene_model_point is None:
             self.scene_model_point = [[0, 0, 0], [0, 1, 0]]
-        self.bpy = self.load_scene_model(scene_model["path"])
+        self.scene_model_digest = None
+        self.occluder = None
+        self.texture_size = None
+        self.bpy = self.load_scene_model(scene_model["path"], texture_size)
         self.scene = self.bpy.context.scene
 
         # 导入目标模型
-        self.target_model_list = target_model_list
+        self.target_model_list = None
+        self.target_model_path = None
+        self.target_model_digest = None
         self.target_model_name = None
         self.target_model_class = None
         self.target_obj = None
 
+        # 目标几何缓存（目标在各相机位姿间不移动，仅在导入时提取一次）
+        self.target_vertices = None
+        self.target_samples = None
+        self.target_sample_rate = None
+        self.target_triangles = None
+
+        # 多目标同帧渲染：当前帧中的各目标（对象、几何缓存、自身遮挡体）
+        self.frame_targets = []
+
+        # 距离自适应 LOD（屏幕空间误差阈值，0 表示始终使用原始网格）及目标、场景瓦片的 LOD 状态
+        self.lod_pixel_error = 0
+        self.target_lod = None
+        self.scene_lod_slots = None
+
         # 添加初始光照
         sun_height = 100
         self.bpy.ops.object.light_add(type='SUN', location=(0, 0, sun_height))
@@ -65,6 +98,11 @@ class SceneRenderer:
         self.sun_energy = None
         self.sun_azimuth_deg = None
         self.sun_elevation_deg = None
+
+        # 光照域随机化（每个位姿按分布配置抽取日光与环境光参数）
+        self.lighting_spec = None
+        self.world_background = None
+        self.world_strength = None
         # self.configure_sun()
 
         # 创建相机
@@ -74,17 +112,86 @@ class SceneRenderer:
 
         # 初始化分辨率及图片格式
         self.set_resolution()
-        self.scene.render.image_settings.file_format = "PNG"
+        self.image_format = None
+        self.image_extension = None
+        self.image_compression = None
+        self.image_quality = None
+        self.set_image_format()
 
         # 初始化渲染器
         self.renderer = None
         self.set_renderer("EEVEE")
 
-        # 初始化标注信息
-        self.annotation_lines = {}
+        # 图像写出方式（sync：Blender 同步写出；async：后台线程编码写出）
+        self.image_write_mode = "sync"
+        self.image_writer = None
+        # 异步写出替换视图变换前的场景默认设置（恢复同步写出时还原）
+        self.scene_view_settings = None
+
+        # 全局渲染缓存（跨渲染任务复用相同内容的图像）
+        self.render_cache = None
+
+        # 标注方式（raycast：渲染前射线检测；mask：渲染后由实例掩膜计算）及可用位姿阈值
+        self.annotation_mode = "raycast"
+        self.occlusion_threshold = 0.6
+        self.min_bbox_pixels = 8
+
+        # 位姿采样配置（None 表示 距离 × 高低角 × 方位角 网格）
+        self.pose_sampler = None
+
+        # 低分辨率预渲染筛选（mask 标注方式下可用，0 表示不预渲染）
+        self.prepass_width = 0
+        self.prepass_rejected = 0
+
+        # 初始化任务状态
+        self.render_id = None
+        self.output_dir = None
+        self.annotations_file = None
+        self.annotation_writer = None
+        self.completed_poses = {}
+        self.rejected_poses = {}
+        self.image_prefix = None
+        self.index = 0
+        self.planned_count = 0
+        self.prepare_task(target_model_list, render_id, output_dir, index, image_prefix, annotations_name)
+
+    def prepare_task(self, target_model_list, render_id=None,
+                     output_dir=r"D:\Projects\RealEarthStudio\Blender照片", index=0,
+                     image_prefix="image", annotations_name="metadata.jsonl"):
+        """
+        重置任务状态（场景、遮挡体、日光与相机对象保留，可在常驻渲染进程中复用）
+        :param target_model_list: 目标模型
+        :param render_id: 渲染ID
+        :param output_dir: 渲染图像导出目录
+        :param index: 已经渲染图像数量
+        :param image_prefix: 图像文件名前缀
+        :param annotations_name: 标注记录文件名
+        """
+        # 生成渲染ID
+        self.render_id = render_id if render_id else self.generate_render_id()
 
-        # 初始化索引
-        self.index = index
+        # 获取输出文件夹
+        self.output_dir = os.path.join(output_dir, self.render_id)
+        self.annotations_file = os.path.join(self.output_dir, annotations_name)
+        if self.annotation_writer is not None:
+            self.annotation_writer.close()
+        self.annotation_writer = annotation_writer.AnnotationWriter(self.annotations_file, durable=True)
+        self.image_prefix = image_prefix
+
+        # 清除上一任务的目标模型
+        self.target_model_list = target_model_list
+        self.remove_target_model()
+
+        # 读取断点：内容键已完成的图像直接跳过（参数变化后内容键随之变化，图像重新渲染）
+        # 预渲染或实例掩膜剔除的位姿在筛选阈值不变时同样跳过
+        self.completed_poses, self.rejected_poses = render_checkpoint.load_checkpoint(self.annotations_file)
+        self.index = max(index or 0, len(self.completed_poses))
+        if self.completed_poses or self.rejected_poses:
+            print(f"♻️ 读取渲染断点 | 已完成 {len(self.completed_poses)} 张图像，"
+                  f"已剔除 {len(self.rejected_poses)} 个位姿")
+
+        # 预筛选后计划渲染的图像数量
+        self.planned_count = 0
 
     @staticmethod
     def generate_render_id():
@@ -98,35 +205,52 @@ class SceneRenderer:
 
         return f"{time_str}_{random_suffix}"
 
-    def load_scene_model(self, scene_model_path):
+    def load_scene_model(self, scene_model_path, texture_size=None):
         """
         导入场景模型
+        :param scene_model_path: 场景模型路径
+        :param texture_size: 贴图降采样版本的最大边长，版本不存在时使用原始贴图
         """
         # 确保模型文件存在
         if not os.path.exists(scene_model_path):
             raise FileNotFoundError(f"场景模型文件不存在: {scene_model_path}")
 
         ext = scene_model_path.split('.')[-1].lower()
-        if ext in ["fbx", "glb"]:
+        variant_path = scene_textures.variant_path(scene_model_path, texture_size) if texture_size else None
+        self.texture_size = None
+        if variant_path is not None and os.path.exists(variant_path):
+            # 贴图降采样版本（对象名称与原场景一致，LOD 库、遮挡体缓存通用）
+            with tracing.span("open_mainfile", texture_size=texture_size):
+                bpy.ops.wm.open_mainfile(filepath=variant_path)
+            self.texture_size = texture_size
+            print(f"✅ 使用场景贴图降采样版本 | 贴图最大边长：{texture_size}px")
+        elif ext in ["fbx", "glb"]:
             if os.path.exists(scene_model_path + ".blend"):
-                bpy.ops.wm.open_mainfile(filepath=scene_model_path + ".blend")
+                with tracing.span("open_mainfile"):
+                    bpy.ops.wm.open_mainfile(filepath=scene_model_path + ".blend")
             else:
                 # 清空当前场景
                 bpy.ops.object.select_all(action='SELECT')
                 bpy.ops.object.delete(use_global=False, confirm=False)
 
                 # 导入场景模型
-                if ext == "fbx":
-                    bpy.ops.import_scene.fbx(filepath=scene_model_path)
-                elif ext == "glb":
-                    bpy.ops.import_scene.gltf(filepath=scene_model_path)
-                bpy.ops.wm.save_as_mainfile(filepath=scene_model_path + ".blend")
+                with tracing.span("import_scene", format=ext):
+                    if ext == "fbx":
+                        bpy.ops.import_scene.fbx(filepath=scene_model_path)
+                    elif ext == "glb":
+                        bpy.ops.import_scene.gltf(filepath=scene_model_path)
+                with tracing.span("save_mainfile"):
+                    bpy.ops.wm.save_as_mainfile(filepath=scene_model_path + ".blend")
         elif ext == "blend":
             # 导入场景模型
-            bpy.ops.wm.open_mainfile(filepath=scene_model_path)
+            with tracing.span("open_mainfile"):
+                bpy.ops.wm.open_mainfile(filepath=scene_model_path)
         else:
             raise FileNotFoundError(f"不支持的场景模型格式: {scene_model_path}")
 
+        # 导入场景遮挡体（模型原始坐标系，与 .blend 缓存同目录）
+        self.occluder = self.load_occluder(scene_model_path)
+
         if self.scene_model_point != [[0, 0, 0], [0, 1, 0]]:
             p1 = Vector(self.scene_model_point[0])
             p2 = Vector(self.scene_model_point[1])
@@ -160,9 +284,50 @@ class SceneRenderer:
                 # 恢复位置和缩放（防止浮点误差）
                 parent_empty.scale = scale
                 parent_empty.location = (0, 0, 0)
+
+                # 同步遮挡体变换：world = R @ T(-p1) @ original
+                scene_matrix = rot_matrix @ Matrix.Translation(-p1)
+                self.occluder.set_matrix_world(visibility.matrix_to_numpy(scene_matrix))
         print(f"✅ 场景模型 {self.scene_model_name} 导入成功")
         return bpy
 
+    def load_occluder(self, scene_model_path):
+        """
+        导入场景遮挡体缓存，缓存不存在或源文件已修改时重新构建
+        :param scene_model_path: 场景模型路径
+        """
+        cache_path = scene_model_path + ".bvh.npz"
+        source_stat = os.stat(scene_model_path)
+        signature = (source_stat.st_size, source_stat.st_mtime_ns)
+
+        if os.path.exists(cache_path):
+            try:
+                with tracing.span("occluder_load"):
+                    occluder = OccluderBVH.load(cache_path, signature)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ 场景遮挡体缓存读取失败，重新构建: {e}")
+                occluder = None
+            if occluder is not None:
+                print(f"✅ 场景遮挡体缓存导入成功 | 三角面数：{occluder.triangle_count}")
+                return occluder
+
+        with tracing.span("occluder_build"):
+            occluder = self.build_occluder()
+            occluder.save(cache_path, signature)
+        return occluder
+
+    @staticmethod
+    def build_occluder():
+        """
+        构建场景遮挡体 BVH（须在导入目标模型前调用，遮挡体仅包含场景网格）
+        """
+        deps_graph = bpy.context.evaluated_depsgraph_get()
+        scene_objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH' and not obj.hide_render]
+        triangles = visibility.objects_world_triangles(scene_objects, deps_graph)
+        occluder = OccluderBVH.from_triangles(triangles)
+        print(f"✅ 场景遮挡体构建完成 | 三角面数：{len(triangles)}")
+        return occluder
+
     def load_target_model(self, target_model):
         """
         导入目标模型
@@ -172,67 +337,111 @@ class SceneRenderer:
         # 导入目标模型
         if not os.path.exists(target_model_path):
             raise FileNotFoundError(f"目标模型文件不存在: {target_model_path}")
+        self.target_model_path = target_model_path
+        self.target_model_digest = None
         self.target_model_name = Path(target_model_path).stem
+        tracing.set_context(target=self.target_model_name)
 
         target_model_class = target_model["class"]
         self.target_model_class = target_model_class
 
-        # 在导入新模型前先删除可能存在的旧模型对象
+        # 在导入新模型前先删除可能存在的旧模型对象（同时清空几何缓存）
+        self.remove_target_model()
+
+        # 导入模型
+        self.target_obj = self.import_target(target_model_path)
+        self.target_lod = self.lod_slot(self.target_obj, target_library.load_manifest(target_model_path))
+
+        # 填充目标几何缓存
+        with tracing.span("target_geometry"):
+            self.cache_target_geometry()
+
+        # self.export_blender_file(self.output_dir)
+        print(f"✅ 目标模型 {self.target_model_name} 导入成功")
+
+    def import_target(self, target_model_path, object_name="targetModel", lod=0):
+        """
+        导入目标模型，并整合为一个名为 object_name 的对象
+        （已预处理的模型直接链接 .blend 库中的网格，否则导入模型文件并合并网格）
+        :param target_model_path: 目标模型路径
+        :param object_name: 整合后的对象名称
+        :param lod: 预处理库中的 LOD 级别
+        :return: 整合后的对象
+        """
+        manifest = target_library.load_manifest(target_model_path)
+        if manifest is None:
+            return target_library.import_model(self.bpy, target_model_path, object_name)
+
+        lod = min(lod, len(manifest["lods"]) - 1)
+        with tracing.span("link_target", lod=lod):
+            mesh = self.link_library_mesh(manifest["library"], manifest["lods"][lod]["mesh"])
+            target_obj = self.bpy.data.objects.new(object_name, mesh)
+            self.scene.collection.objects.link(target_obj)
+        return target_obj
+
+    def link_library_mesh(self, library_path, mesh_name):
+        """
+        链接预处理库中的网格（同一网格只加载一次，各对象共用）
+        :param library_path: .blend 库路径
+        :param mesh_name: 网格名称
+        """
+        with self.bpy.data.libraries.load(library_path, link=True) as (data_from, data_to):
+            data_to.meshes = [mesh_name]
+        mesh = data_to.meshes[0]
+        if mesh is None:
+            raise ValueError(f"预处理库中未找到网格 {mesh_name}")
+        return mesh
+
+    def remove_target_model(self):
+        """
+        删除场景中的目标模型
+        """
+        lod_slots = [slot for slot in self.target_lod_slots() if slot is not None]
         existing_target = self.bpy.data.objects.get("targetModel")
         if existing_target:
             self.bpy.data.objects.remove(existing_target, do_unlink=True)
+        for frame_target in self.frame_targets:
+            self.bpy.data.objects.remove(frame_target["obj"], do_unlink=True)
+        self.frame_targets = []
+        self.target_obj = None
+        self.target_lod = None
+        self.invalidate_target_cache()
 
-        # 导入模型
-        ext = target_model_path.split('.')[-1].lower()
-        if ext =="fbx":
-            self.bpy.ops.import_scene.fbx(filepath=target_model_path)
-        elif ext == "glb":
-            self.bpy.ops.import_scene.gltf(filepath=target_model_path)
-
-        # 获取所有新导入的对象
-        imported_objects = list(self.bpy.context.selected_objects)
-
-        # 创建一个空的集合来存储所有网格对象
-        mesh_objects = [obj for obj in imported_objects if obj.type == 'MESH']
-
-        if not mesh_objects:
-            # 如果没有网格对象，查找其他类型的有效对象
-            valid_objects = [obj for obj in imported_objects if
-                             obj.type in ['MESH', 'CURVE', 'SURFACE', 'META', 'FONT']]
-            if valid_objects:
-                # 创建一个父级空对象来整合所有对象
-                self.bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0))
-                target_empty = self.bpy.context.active_object
-                target_empty.name = "targetModel"
-
-                # 将所有导入的对象作为子对象
-                for obj in valid_objects:
-                    obj.parent = target_empty
-            else:
-                raise ValueError("导入的模型中没有有效的可渲染对象！")
-        elif len(mesh_objects) == 1:
-            # 如果只有一个网格对象，直接重命名为 targetModel
-            mesh_objects[0].name = "targetModel"
-        else:
-            # 如果有多个网格对象，合并为一个对象
-            self.bpy.context.view_layer.objects.active = mesh_objects[0]
-            mesh_objects[0].select_set(True)
-
-            # 选择所有其他网格对象
-            for obj in mesh_objects[1:]:
-                obj.select_set(True)
+        # 释放不再使用的 LOD 网格
+        for slot in lod_slots:
+            for mesh in slot["meshes"].values():
+                if mesh.users == 0:
+                    self.bpy.data.meshes.remove(mesh)
 
-            # 合并选中的对象
-            self.bpy.ops.object.join()
-            mesh_objects[0].name = "targetModel"
+    def invalidate_target_cache(self):
+        """
+        清空目标几何缓存
+        """
+        self.target_vertices = None
+        self.target_samples = None
+        self.target_sample_rate = None
+        self.target_triangles = None
 
-        # 设置 target_obj 为整合后的对象
-        self.target_obj = self.bpy.data.objects.get("targetModel")
-        if not self.target_obj:
-            raise ValueError("场景中未找到目标对象！")
+    def cache_target_geometry(self, sample_rate=0.1):
+        """
+        提取目标世界坐标顶点并预先采样
+        :param sample_rate: 顶点采样比例
+        """
+        deps_graph = self.bpy.context.evaluated_depsgraph_get()
+        self.target_vertices = visibility.object_world_vertices(self.target_obj, deps_graph)
+        self.resample_target(sample_rate)
+        print(f"✅ 目标几何缓存完成 | 顶点数：{len(self.target_vertices)}，采样点数：{len(self.target_samples)}")
 
-        # self.export_blender_file(self.output_dir)
-        print(f"✅ 目标模型 {self.target_model_name} 导入成功")
+    def resample_target(self, sample_rate):
+        """
+        从缓存顶点中随机采样
+        :param sample_rate: 顶点采样比例
+        """
+        num_vertices = len(self.target_vertices)
+        sample_count = min(max(50, int(num_vertices * sample_rate)), num_vertices)
+        indices = np.random.choice(num_vertices, size=sample_count, replace=False)
+        self.target_samples = np.ascontiguousarray(self.target_vertices[indices])
+        self.target_sample_rate = sample_rate
 
     def export_blender_file(self, file_dir, file_name="导出模型.blend"):
         """
@@ -255,7 +464,15 @@ class SceneRenderer:
         self.sun_azimuth_deg = azimuth_deg
         self.sun_elevation_deg = elevation_deg
         self.sun_obj.data.energy = energy
+        self.orient_sun(azimuth_deg, elevation_deg)
+        print(f"✅ 日光参数调整完毕 | 光照强度：{energy}，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
 
+    def orient_sun(self, azimuth_deg, elevation_deg):
+        """
+        调整日光方向
+        :param azimuth_deg: 水平方向角度
+        :param elevation_deg: 仰角
+        """
         # 将角度转换为弧度
         az_rad = math.radians(azimuth_deg)
         el_rad = math.radians(-elevation_deg)
@@ -270,20 +487,76 @@ class SceneRenderer:
         rot_quat = look_at.to_track_quat('-Z', 'Y')  # -Z是光的前向，Y是上向
         self.sun_obj.rotation_mode = 'QUATERNION'
         self.sun_obj.rotation_quaternion = rot_quat
-        print(f"✅ 日光参数调整完毕 | 光照强度：{energy}，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
 
-    def configure_camara(self, x, y, z):
+    def set_lighting_randomization(self, spec=None):
+        """
+        修改光照域随机化配置（在 configure_sun 之后调用，未随机化的参数使用任务光照）
+        :param spec: 光照分布配置（见 lighting.validate_spec），None 或空字典表示不随机化
+        """
+        if spec:
+            lighting.validate_spec(spec)
+        self.lighting_spec = spec or None
+
+        # 场景环境光（World 的 Background 节点），同一场景只记录一次原始强度
+        world = self.scene.world
+        background = None
+        if world is not None and world.use_nodes:
+            background = next((node for node in world.node_tree.nodes if node.type == 'BACKGROUND'), None)
+        if background is not self.world_background:
+            self.world_background = background
+            self.world_strength = background.inputs["Strength"].default_value if background is not None else None
+        if self.lighting_spec and "world_strength" in self.lighting_spec and background is None:
+            print("⚠️ 场景没有环境光节点，world_strength 随机化无效")
+        self.apply_lighting()
+
+    def pose_lighting(self, distance, elevation_deg, azimuth_deg, look_at=None):
+        """
+        位姿的光照参数（由位姿内容键确定性抽取，渲染与写入标注时结果一致）
+        :return: {参数名: 取值}，不随机化时返回 None
+        """
+        if not self.lighting_spec:
+            return None
+        return render_keys.lit_render_key(self.render_params(), self.lighting_spec, distance, elevation_deg,
+                                          azimuth_deg, look_at)[1]
+
+    def apply_lighting(self, draw=None):
+        """
+        按位姿光照参数调整日光与环境光（未抽取的参数恢复为任务光照）
+        :param draw: pose_lighting 的返回值，None 表示恢复任务光照
+        """
+        draw = draw or {}
+        self.sun_obj.data.energy = draw.get("sun_energy", self.sun_energy)
+        self.orient_sun(draw.get("sun_azimuth_deg", self.sun_azimuth_deg),
+                        draw.get("sun_elevation_deg", self.sun_elevation_deg))
+        temperature = draw.get("sun_color_temperature")
+        self.sun_obj.data.color = lighting.kelvin_to_rgb(temperature) if temperature else (1.0, 1.0, 1.0)
+        if self.world_background is not None:
+            self.world_background.inputs["Strength"].default_value = draw.get("world_strength", self.world_strength)
+        if draw:
+            print("🔆 光照随机化 | " + "，".join(f"{k}: {v}" for k, v in draw.items()))
+
+    @staticmethod
+    def camera_position(distance, elevation_deg, azimuth_deg, look_at=None):
+        """
+        由位姿计算相机位置（相机绕观察点环绕）
+        :return: (x, y, z)
+        """
+        pose = [distance, elevation_deg, azimuth_deg, *(look_at or (0, 0, 0))]
+        return pose_planner.camera_positions(np.array([pose], dtype=np.float64))[0].tolist()
+
+    def configure_camara(self, x, y, z, look_at=None):
         """
         修改相机参数
         :param x: X轴坐标
         :param y: Y轴坐标
         :param z: Z轴坐标
+        :param look_at: 观察点，None 表示原点
         """
         # 调整相机位置
         self.camera_obj.location = (x, y, z)
 
-        # 对准原点
-        direction = Vector((0, 0, 0)) - self.camera_obj.location
+        # 对准观察点
+        direction = Vector(look_at or (0, 0, 0)) - self.camera_obj.location
         rot_quat = direction.to_track_quat('-Z', 'Y')
         self.camera_obj.rotation_euler = rot_quat.to_euler()
 
@@ -361,74 +634,546 @@ class SceneRenderer:
         self.scene.render.resolution_x = width
         self.scene.render.resolution_y = height
 
-    def get_visible_info(self, occlusion_threshold=0.8, sample_rate=0.1):
+    @property
+    def image_size(self):
+        """输出图像像素尺寸 [宽, 高]"""
+        scale = self.scene.render.resolution_percentage / 100
+        return [int(self.scene.render.resolution_x * scale), int(self.scene.render.resolution_y * scale)]
+
+    def set_image_format(self, file_format="PNG", compression=15, quality=90):
         """
-        使用射线投射快速判断目标是否可见（遮挡比例 <= threshold）
-        返回: (is_visible: bool, occlusion_ratio: float, bbox: (cx,cy,w,h) or None)
+        修改图像格式及编码参数
+        :param file_format: PNG / JPEG / WEBP / OPEN_EXR
+        :param compression: PNG 压缩率（0-100%）
+        :param quality: JPEG/WebP 质量（0-100，WebP 取 100 时为无损）
         """
-        camera_loc = self.camera_obj.matrix_world.translation
-        deps_graph = bpy.context.evaluated_depsgraph_get()
+        self.image_format = file_format.upper()
+        if self.image_format not in IMAGE_EXTENSIONS:
+            raise ValueError(f"不支持的图像格式: {file_format}")
+        self.image_extension = IMAGE_EXTENSIONS[self.image_format]
+        self.image_compression = compression
+        self.image_quality = quality
+
+        image_settings = self.scene.render.image_settings
+        image_settings.file_format = self.image_format
+        if self.image_format == "PNG":
+            image_settings.color_mode = 'RGBA'
+            image_settings.color_depth = '8'
+            image_settings.compression = compression
+        elif self.image_format == "JPEG":
+            image_settings.color_mode = 'RGB'
+            image_settings.quality = quality
+        elif self.image_format == "WEBP":
+            image_settings.color_mode = 'RGBA'
+            image_settings.quality = quality
+        else:
+            image_settings.color_mode = 'RGBA'
+            image_settings.color_depth = '16'
+            image_settings.exr_codec = 'ZIP'
 
-        # 获取目标顶点（世界坐标）
-        eval_obj = self.target_obj.evaluated_get(deps_graph)
-        mesh = eval_obj.to_mesh()
-        vertices_world = [self.target_obj.matrix_world @ v.co for v in mesh.vertices]
-        eval_obj.to_mesh_clear()
+    def set_render_threads(self, threads=None):
+        """
+        修改渲染线程数（多进程渲染时按进程数划分 CPU 核心）
+        :param threads: 线程数，None 表示自动
+        """
+        if threads:
+            self.scene.render.threads_mode = 'FIXED'
+            self.scene.render.threads = threads
+        else:
+            self.scene.render.threads_mode = 'AUTO'
 
-        if not vertices_world:
-            return False, 1.0, None
+    def set_image_write_mode(self, mode="sync", max_workers=2, max_pending=4):
+        """
+        修改图像写出方式
+        async 模式下渲染结果经合成器 Viewer 节点读出，由后台线程编码 PNG 并写盘，下一位姿的渲染与编码写盘并行；
+        Viewer 节点像素为线性颜色，因此该模式固定使用 Standard 视图变换，并在编码时手动施加 sRGB 转换；
+        切换回同步写出时还原场景默认的视图变换（常驻进程中前后任务的写出方式可能不同）
+        :param mode: sync / async
+        :param max_workers: 编码线程数
+        :param max_pending: 最多排队的图像数量，超出时渲染等待（反压）
+        """
+        self.image_write_mode = mode.lower() if mode else "sync"
+        if self.image_write_mode == "async" and self.image_format != "PNG":
+            print(f"⚠️ 异步写出仅支持 PNG，{self.image_format} 格式使用同步写出")
+            self.image_write_mode = "sync"
+        if self.image_write_mode == "async" and self.annotation_mode == "mask":
+            print("⚠️ 实例掩膜标注占用 Viewer 节点，使用同步写出")
+            self.image_write_mode = "sync"
+        if self.image_writer is not None and self.image_writer.compress_level != self.png_compress_level:
+            self.image_writer.shutdown()
+            self.image_writer = None
+        view_settings = self.scene.view_settings
+        if self.image_write_mode == "async":
+            self.setup_viewer_node()
+            if self.scene_view_settings is None:
+                self.scene_view_settings = (view_settings.view_transform, view_settings.look,
+                                            view_settings.exposure, view_settings.gamma)
+            view_settings.view_transform = render_keys.ASYNC_VIEW_TRANSFORM
+            view_settings.look = 'None'
+            view_settings.exposure = 0.0
+            view_settings.gamma = 1.0
+            if self.image_writer is None:
+                self.image_writer = AsyncImageWriter(max_workers, max_pending, self.png_compress_level)
+        else:
+            if self.scene_view_settings is not None:
+                (view_settings.view_transform, view_settings.look,
+                 view_settings.exposure, view_settings.gamma) = self.scene_view_settings
+                self.scene_view_settings = None
+            if self.image_writer is not None:
+                self.image_writer.shutdown()
+                self.image_writer = None
+
+    def set_render_cache(self, cache_dir=None):
+        """
+        启用全局渲染缓存
+        :param cache_dir: 缓存目录，None 表示不使用缓存
+        """
+        if not cache_dir:
+            self.render_cache = None
+        elif self.render_cache is None or self.render_cache.cache_dir != cache_dir:
+            self.render_cache = RenderCache(cache_dir)
+
+    @property
+    def render_samples(self):
+        """当前渲染器的采样数"""
+        if self.renderer == "CYCLES":
+            return self.scene.cycles.samples
+        return getattr(self.scene.eevee, "taa_render_samples", None)
+
+    @property
+    def png_compress_level(self):
+        """PNG 压缩率（0-100%）对应的 zlib 压缩级别"""
+        return round(self.image_compression / 100 * 9)
+
+    def compositor_nodes(self):
+        """
+        获取合成器的 渲染层 与 Viewer 节点（兼容 Blender 5.0 的 compositing_node_group 与旧版 node_tree）
+        :return: (tree, layers, viewer)
+        """
+        if hasattr(self.scene, "compositing_node_group"):
+            tree = self.scene.compositing_node_group
+            if tree is None:
+                tree = self.bpy.data.node_groups.new("RealEarthCompositor", "CompositorNodeTree")
+                self.scene.compositing_node_group = tree
+        else:
+            self.scene.use_nodes = True
+            tree = self.scene.node_tree
+        self.scene.render.use_compositing = True
+
+        layers = next((node for node in tree.nodes if node.type == 'R_LAYERS'), None)
+        if layers is None:
+            layers = tree.nodes.new("CompositorNodeRLayers")
+
+        # 合成输出保持为渲染层图像（Viewer 节点改接其他通道时不影响保存的图像）
+        if hasattr(self.scene, "compositing_node_group"):
+            output = next((node for node in tree.nodes if node.type == 'GROUP_OUTPUT'), None)
+            if output is None:
+                if not any(item.item_type == 'SOCKET' and item.in_out == 'OUTPUT' for item in tree.interface.items_tree):
+                    tree.interface.new_socket("Image", in_out='OUTPUT', socket_type='NodeSocketColor')
+                output = tree.nodes.new("NodeGroupOutput")
+            image_input = output.inputs[0]
+        else:
+            composite = next((node for node in tree.nodes if node.type == 'COMPOSITE'), None)
+            if composite is None:
+                composite = tree.nodes.new("CompositorNodeComposite")
+            image_input = composite.inputs["Image"]
+        if not image_input.is_linked:
+            tree.links.new(layers.outputs["Image"], image_input)
+        viewer = next((node for node in tree.nodes if node.type == 'VIEWER'), None)
+        if viewer is None:
+            viewer = tree.nodes.new("CompositorNodeViewer")
+        return tree, layers, viewer
+
+    def setup_viewer_node(self):
+        """
+        在合成器中连接 渲染层 → Viewer 节点
+        """
+        tree, layers, viewer = self.compositor_nodes()
+        if hasattr(viewer, "use_alpha"):
+            viewer.use_alpha = True
+        tree.links.new(layers.outputs["Image"], viewer.inputs["Image"])
+
+    def setup_instance_pass(self):
+        """
+        启用 Cryptomatte 对象层，并在合成器中连接 CryptoObject00 的 R 通道（主导对象 ID）→ Viewer 节点
+        """
+        view_layer = self.bpy.context.view_layer
+        view_layer.use_pass_cryptomatte_object = True
+        view_layer.pass_cryptomatte_depth = 2
+
+        tree, layers, viewer = self.compositor_nodes()
+        separate = tree.nodes.get("InstanceID")
+        if separate is None:
+            separate = tree.nodes.new("CompositorNodeSeparateColor")
+            separate.name = "InstanceID"
+        tree.links.new(layers.outputs["CryptoObject00"], separate.inputs[0])
+        tree.links.new(separate.outputs[0], viewer.inputs["Image"])
+
+    def set_annotation_mode(self, mode="raycast"):
+        """
+        修改标注方式
+        mask 模式渲染 Cryptomatte 对象层，由像素计算精确的可见标注框与遮挡比例，完整（amodal）标注框由目标三角形光栅化得到；
+        渲染前只做画面与尺寸检查，不再逐采样点发射射线，遮挡过高的图像在渲染后剔除
+        :param mode: raycast / mask
+        """
+        self.annotation_mode = mode.lower() if mode else "raycast"
+        if self.annotation_mode != "mask" and self.prepass_width:
+            self.set_prepass(0)
+        if self.annotation_mode == "mask":
+            if self.image_write_mode == "async":
+                self.set_image_write_mode("sync")
+            self.setup_instance_pass()
+        else:
+            self.bpy.context.view_layer.use_pass_cryptomatte_object = False
+            if self.image_write_mode == "async":
+                self.setup_viewer_node()
+
+    def set_pose_sampler(self, sampler=None):
+        """
+        修改位姿采样配置
+        :param sampler: {"strategy": grid / random / stratified / sobol / halton, "budget": 每个目标的图像数量,
+                         "seed": 随机种子, "look_at_jitter": 观察点抖动半径（米）}，None 表示网格采样
+        """
+        if sampler and sampler.get("strategy", "grid") not in pose_sampler.STRATEGIES:
+            raise ValueError(f"不支持的位姿采样策略: {sampler['strategy']}")
+        self.pose_sampler = sampler
 
-        # 随机采样
-        num_vertices = len(vertices_world)
-        sample_count = max(50, int(num_vertices * sample_rate))
-        indices = np.random.choice(num_vertices, size=min(sample_count, num_vertices), replace=False)
-        sampled_points = [vertices_world[i] for i in indices]
-
-        visible_2d = []
-        occluded = 0
-
-        for pt in sampled_points:
-            direction = (pt - camera_loc).normalized()
-            # 射线投射（忽略目标自身）
-            result, location, normal, index, hit_obj, matrix = self.scene.ray_cast(
-                deps_graph, camera_loc, direction, distance=(pt - camera_loc).length - 1e-4
-            )
-
-            if not result or hit_obj == self.target_obj:
-                # 无遮挡，或仅击中自己（视为可见）
-                co_2d = world_to_camera_view(self.scene, self.camera_obj, pt)
-                if 0 <= co_2d.x <= 1 and 0 <= co_2d.y <= 1 and co_2d.z > 0:
-                    visible_2d.append((co_2d.x, co_2d.y))
+    def candidate_poses(self, distance_list, elevation_deg_list, rotation_step_deg, target_paths):
+        """
+        按位姿采样配置生成候选位姿（随机种子附加目标名称，与 render_farm.expected_keys 一致）
+        :return: (poses, budget)
+        """
+        return pose_sampler.candidate_poses(self.pose_sampler, distance_list, elevation_deg_list, rotation_step_deg,
+                                            render_keys.pose_salt(target_paths))
+
+    def set_prepass(self, width=0):
+        """
+        修改低分辨率预渲染筛选：每个位姿先以 width 宽度（高度按画面比例）渲染实例掩膜，
+        目标可见、尺寸与遮挡满足阈值时才渲染全分辨率图像（需要 mask 标注方式提供的实例通道）
+        :param width: 预渲染宽度（像素），0 表示不预渲染
+        """
+        width = int(width or 0)
+        if width and self.annotation_mode != "mask":
+            print("⚠️ 低分辨率预渲染需要实例掩膜标注方式，已关闭预渲染")
+            width = 0
+        self.prepass_width = width
+        self.prepass_rejected = 0
+
+    @property
+    def prepass_size(self):
+        """预渲染像素尺寸 [宽, 高]（不超过输出尺寸，保持画面比例）"""
+        width, height = self.image_size
+        prepass_width = min(self.prepass_width, width)
+        return [prepass_width, max(1, round(height * prepass_width / width))]
+
+    def prepass_instances(self, objects, triangles_list):
+        """
+        以低分辨率、最少采样数渲染当前相机视图，并由实例掩膜计算各目标的标注（渲染完成后恢复输出设置）
+        :return: instance_mask.instance_annotations 的返回值
+        """
+        render = self.scene.render
+        resolution = (render.resolution_x, render.resolution_y, render.resolution_percentage)
+        render.resolution_x, render.resolution_y = self.prepass_size
+        render.resolution_percentage = 100
+        if self.renderer == "CYCLES":
+            samples = (self.scene.cycles.samples, self.scene.cycles.use_denoising)
+            self.scene.cycles.samples, self.scene.cycles.use_denoising = 1, False
+        else:
+            samples = self.scene.eevee.taa_render_samples
+            self.scene.eevee.taa_render_samples = 1
+        try:
+            self.render_image()
+            return self.measure_instances(objects, triangles_list)
+        finally:
+            render.resolution_x, render.resolution_y, render.resolution_percentage = resolution
+            if self.renderer == "CYCLES":
+                self.scene.cycles.samples, self.scene.cycles.use_denoising = samples
             else:
-                occluded += 1
+                self.scene.eevee.taa_render_samples = samples
 
-        total = len(sampled_points)
-        if total == 0:
+    def prepass_accepted(self, result):
+        """
+        预渲染结果是否可能满足阈值（放宽一个预渲染像素的尺寸与 PREPASS_OCCLUSION_MARGIN 的遮挡比例，
+        最终仍以全分辨率实例掩膜判定）
+        """
+        if result["bbox"] is None:
+            return False
+        width, height = self.image_size
+        prepass_width, prepass_height = self.prepass_size
+        _, _, w, h = result["bbox"]
+        return ((w + 1 / prepass_width) * width >= self.min_bbox_pixels and
+                (h + 1 / prepass_height) * height >= self.min_bbox_pixels and
+                result["occlusion"] <= self.occlusion_threshold + PREPASS_OCCLUSION_MARGIN)
+
+    def set_lod_selection(self, max_pixel_error=0):
+        """
+        修改距离自适应 LOD：每个位姿按相机距离为目标与场景瓦片选择屏幕空间误差不超过阈值的最粗 LOD
+        （模型需已预处理生成 LOD 库，未预处理的目标与场景瓦片始终使用原始网格）
+        :param max_pixel_error: 屏幕空间误差阈值（像素），0 表示始终使用原始网格
+        """
+        self.lod_pixel_error = float(max_pixel_error or 0)
+        if not self.lod_pixel_error:
+            self.apply_lods()
+            return
+        if self.scene_lod_slots is None:
+            self.scene_lod_slots = []
+            manifest = scene_library.load_manifest(self.scene_model_path)
+            for name, lods in (manifest or {}).get("objects", {}).items():
+                obj = self.bpy.data.objects.get(name)
+                if obj is not None and obj.type == 'MESH':
+                    self.scene_lod_slots.append(self.lod_slot(obj, dict(manifest, lods=lods), keep_materials=True))
+            if manifest is None:
+                print(f"⚠️ 场景模型 {self.scene_model_name} 未生成 LOD 库，场景始终使用原始网格")
+            else:
+                print(f"✅ 场景 LOD 库导入成功 | 可切换 LOD 的对象数：{len(self.scene_lod_slots)}")
+
+    @staticmethod
+    def lod_slot(obj, manifest, keep_materials=False):
+        """
+        对象的 LOD 状态
+        :param obj: 当前使用 LOD0 网格的对象
+        :param manifest: 预处理库清单（含 library 与 lods），None 表示没有 LOD 库
+        :param keep_materials: LOD 网格不带材质时为 True（切换后沿用对象原有材质）
+        """
+        if manifest is None:
+            return None
+        return {
+            "obj": obj,
+            "library": manifest["library"],
+            "lods": manifest["lods"],
+            "level": 0,
+            "meshes": {0: obj.data},
+            "materials": [slot.material for slot in obj.material_slots] if keep_materials else None,
+            "box": None,
+        }
+
+    def target_lod_slots(self):
+        """当前目标的 LOD 状态列表（多目标同帧渲染时与 frame_targets 顺序一致，没有 LOD 库的目标为 None）"""
+        if self.frame_targets:
+            return [target["lod"] for target in self.frame_targets]
+        return [self.target_lod]
+
+    def pose_lods(self, distance, elevation_deg, azimuth_deg, look_at=None):
+        """
+        位姿的 LOD 选择（由相机位置、焦距与输出宽度决定，渲染与写标注时结果一致）
+        :return: {"target": [各目标 LOD 级别，没有 LOD 库时为 None], "scene": [各场景瓦片 LOD 级别]}，未启用时返回 None
+        """
+        if not self.lod_pixel_error:
+            return None
+        position = np.array(self.camera_position(distance, elevation_deg, azimuth_deg, look_at))
+        focal_px = lod.focal_pixels(visibility.camera_frame_tangents(self.scene, self.camera_obj),
+                                    self.image_size[0])
+
+        def select(slots):
+            if not slots:
+                return []
+            boxes = np.array([self.slot_box(slot) for slot in slots])
+            distances = lod.box_distances(position, boxes[:, 0], boxes[:, 1])
+            return lod.select_levels(lod.error_table([slot["lods"] for slot in slots]), distances, focal_px,
+                                     self.lod_pixel_error).tolist()
+
+        target_slots = self.target_lod_slots()
+        target_levels = iter(select([slot for slot in target_slots if slot is not None]))
+        return {"target": [None if slot is None else next(target_levels) for slot in target_slots],
+                "scene": select(self.scene_lod_slots)}
+
+    def slot_box(self, slot):
+        """
+        对象的世界坐标轴对齐包围盒（对象在批次内不移动，首次使用时计算）
+        :return: (2, 3) 数组
+        """
+        if slot["box"] is None:
+            corners = np.array([list(slot["obj"].matrix_world @ Vector(corner)) for corner in slot["obj"].bound_box])
+            slot["box"] = np.stack([corners.min(axis=0), corners.max(axis=0)])
+        return slot["box"]
+
+    def apply_lods(self, levels=None):
+        """
+        切换目标与场景瓦片的 LOD 网格
+        :param levels: pose_lods 的返回值，None 表示恢复原始网格
+        """
+        target_slots = [slot for slot in self.target_lod_slots() if slot is not None]
+        scene_slots = self.scene_lod_slots or []
+        if levels is None:
+            target_levels, scene_levels = [0] * len(target_slots), [0] * len(scene_slots)
+        else:
+            target_levels = [level for level in levels["target"] if level is not None]
+            scene_levels = levels["scene"]
+        with tracing.span("lod_switch"):
+            for slot, level in zip(target_slots + scene_slots, target_levels + scene_levels):
+                self.set_slot_level(slot, level)
+
+    def set_slot_level(self, slot, level):
+        """
+        将对象切换到指定 LOD 级别的网格（首次使用时从 LOD 库链接）
+        """
+        if slot["level"] == level:
+            return
+        mesh = slot["meshes"].get(level)
+        if mesh is None:
+            mesh = self.link_library_mesh(slot["library"], slot["lods"][level]["mesh"])
+            slot["meshes"][level] = mesh
+        obj = slot["obj"]
+        obj.data = mesh
+        if slot["materials"] is not None:
+            # 场景 LOD 网格不带材质，改为对象级材质
+            for material_slot, material in zip(obj.material_slots, slot["materials"]):
+                material_slot.link = 'DATA' if level == 0 else 'OBJECT'
+                if level:
+                    material_slot.material = material
+        slot["level"] = level
+
+    @staticmethod
+    def lod_annotation(levels, index=0):
+        """
+        LOD 选择的标注字段：目标的 LOD 级别，以及各级 LOD 的场景瓦片数量
+        :param levels: pose_lods 的返回值
+        :param index: 目标序号
+        """
+        scene_counts = np.bincount(np.asarray(levels["scene"], dtype=np.int64)) if levels["scene"] else []
+        return {"lod": levels["target"][index] or 0, "scene_lod": [int(count) for count in scene_counts]}
+
+    def measure_instances(self, objects, triangles_list):
+        """
+        由当前渲染结果的实例掩膜计算各目标的标注
+        :param objects: 各目标对象（含子对象，参与 Cryptomatte 匹配）
+        :param triangles_list: 各目标的世界坐标三角形
+        :return: instance_mask.instance_annotations 的返回值
+        """
+        pixels, width, height = self.read_render_pixels()
+        id_bits = pixels.view(np.uint32)[0::4].reshape(height, width)[::-1]
+        instance_ids = [[instance_mask.cryptomatte_id(o.name) for o in [obj] + list(obj.children_recursive)]
+                        for obj in objects]
+        instances = instance_mask.instance_map(id_bits, instance_ids)
+
+        self.bpy.context.view_layer.update()
+        amodal_masks = []
+        for triangles in triangles_list:
+            ndc = visibility.world_to_ndc(triangles.reshape(-1, 3), self.scene, self.camera_obj).reshape(-1, 3, 3)
+            in_front = (ndc[:, :, 2] > 0).all(axis=1)
+            pixels_2d = instance_mask.ndc_to_pixels(ndc[in_front, :, :2], width, height)
+            amodal_masks.append(instance_mask.rasterize(pixels_2d, width, height))
+        return instance_mask.instance_annotations(instances, amodal_masks)
+
+    def instance_accepted(self, result):
+        """
+        实例掩膜结果是否满足可见、尺寸与遮挡阈值
+        """
+        if result["bbox"] is None:
+            return False
+        width, height = self.image_size
+        _, _, w, h = result["bbox"]
+        return (w * width >= self.min_bbox_pixels and h * height >= self.min_bbox_pixels and
+                result["occlusion"] <= self.occlusion_threshold)
+
+    @staticmethod
+    def instance_extra(result):
+        """
+        实例掩膜标注的附加字段
+        """
+        return {"amodal_bbox": list(result["amodal_bbox"]) if result["amodal_bbox"] else None,
+                "visible_pixels": result["visible_pixels"], "amodal_pixels": result["amodal_pixels"]}
+
+    def instance_triangles(self, obj):
+        """
+        目标（含子对象）的世界坐标三角形，用于计算完整投影（单目标渲染时缓存到 target_triangles）
+        """
+        if obj is self.target_obj and self.target_triangles is not None:
+            return self.target_triangles
+        deps_graph = self.bpy.context.evaluated_depsgraph_get()
+        triangles = visibility.objects_world_triangles([obj] + list(obj.children_recursive), deps_graph)
+        if obj is self.target_obj:
+            self.target_triangles = triangles
+        return triangles
+
+    def read_render_pixels(self):
+        """
+        读取 Viewer 节点中的渲染结果像素
+        :return: (pixels, width, height)，pixels 为自下而上的线性 RGBA float32 数组
+        """
+        image = self.bpy.data.images["Viewer Node"]
+        width, height = image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        return pixels, width, height
+
+    def get_visible_info(self, occlusion_threshold=0.8, sample_rate=0.1):
+        """
+        批量射线检测判断目标是否可见（遮挡比例 <= threshold）
+        返回: (is_visible: bool, occlusion_ratio: float, bbox: (cx,cy,w,h) or None)
+        """
+        # 更新视图层，确保相机矩阵为最新
+        self.bpy.context.view_layer.update()
+        camera_loc = np.array(self.camera_obj.matrix_world.translation)
+
+        # 获取目标采样点（世界坐标，来自目标几何缓存）
+        if self.target_vertices is None:
+            self.cache_target_geometry(sample_rate)
+        if not len(self.target_vertices):
             return False, 1.0, None
+        if self.target_sample_rate != sample_rate:
+            self.resample_target(sample_rate)
+        sampled_points = self.target_samples
+
+        # 批量遮挡检测（遮挡体不含目标自身，击中自身视为可见）
+        occluded = self.occluder.segments_occluded(camera_loc, sampled_points)
 
-        occlusion_ratio = occluded / total
+        # 批量投影未遮挡点
+        co_2d = visibility.world_to_ndc(sampled_points[~occluded], self.scene, self.camera_obj)
+        in_frame = (co_2d[:, 0] >= 0) & (co_2d[:, 0] <= 1) & (co_2d[:, 1] >= 0) & (co_2d[:, 1] <= 1) & (co_2d[:, 2] > 0)
+
+        total = len(sampled_points)
+        occlusion_ratio = float(np.count_nonzero(occluded)) / total
         is_visible = occlusion_ratio <= occlusion_threshold
 
         # 计算 bbox（仅基于可见点）
-        if visible_2d:
-            xs = [p[0] for p in visible_2d]
-            ys = [p[1] for p in visible_2d]
-
-            x_min, x_max = min(xs), max(xs)
-            y_min, y_max = min(ys), max(ys)
-            cx = (x_min + x_max) / 2
-            cy = 1 - (y_min + y_max) / 2
-            w = x_max - x_min
-            h = y_max - y_min
-            bbox = (float(cx), float(cy), float(w), float(h))
-        else:
-            bbox = None
+        bbox = visibility.ndc_bbox(co_2d[in_frame, :2])
 
         return is_visible, occlusion_ratio, bbox
 
-    def annotations_to_json(self, filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio):
+    def render_params(self):
+        """
+        当前场景、目标、日光、分辨率、渲染器与图像格式（与位姿无关的渲染参数）
+        """
+        target_path = [target["path"] for target in self.frame_targets] if self.frame_targets \
+            else self.target_model_path
+        return render_keys.render_params(self.scene_model_path, self.scene_model_point, target_path,
+                                         self.sun_azimuth_deg, self.sun_elevation_deg,
+                                         [self.scene.render.resolution_x, self.scene.render.resolution_y],
+                                         self.renderer, self.image_format, self.image_compression,
+                                         self.image_quality, self.annotation_mode, self.lod_pixel_error,
+                                         self.texture_size,
+                                         render_keys.write_view_transform(self.image_write_mode, self.image_format,
+                                                                          self.annotation_mode))
+
+    def render_key(self, distance, elevation_deg, azimuth_deg, look_at=None):
+        """
+        单个位姿在数据集中的内容键
+        """
+        return render_keys.lit_render_key(self.render_params(), self.lighting_spec, distance, elevation_deg,
+                                          azimuth_deg, look_at)[0]
+
+    def cache_key(self, distance, elevation_deg, azimuth_deg, look_at=None):
         """
-        将标注信息导出为JSON格式
+        单个位姿在全局渲染缓存中的键（模型按文件内容哈希，并包含采样数，不同任务间通用）
+        """
+        if self.scene_model_digest is None:
+            self.scene_model_digest = render_keys.file_digest(self.scene_model_path)
+        if self.frame_targets:
+            target_digest = [target["digest"] for target in self.frame_targets]
+        else:
+            if self.target_model_digest is None:
+                self.target_model_digest = render_keys.file_digest(self.target_model_path)
+            target_digest = self.target_model_digest
+        params = self.render_params()
+        params.update({"scene": self.scene_model_digest, "target": target_digest, "samples": self.render_samples})
+        return render_keys.render_key(params, distance, elevation_deg, azimuth_deg, look_at,
+                                      self.pose_lighting(distance, elevation_deg, azimuth_deg, look_at))
+
+    def annotations_to_json(self, filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio,
+                            extra=None, look_at=None):
+        """
+        追加写入一条标注记录（JSON Lines，写入后立即 flush，任务结束后再合并为 metadata.json）
         :param filename: 文件名
         :param distance: 摄像机与目标模型的距离
         :param elevation_deg: 摄像机与目标模型的仰角
@@ -438,102 +1183,284 @@ class SceneRenderer:
         :param w: 归一化图像宽度
         :param h: 归一化图像高度
         :param occlusion_ratio: 遮挡概率
+        :param extra: 附加标注字段（实例掩膜标注的完整标注框与像素数）
+        :param look_at: 观察点偏移
         """
-        self.annotation_lines.update({
-            filename: [
-                {
-                    "target_name": self.target_model_name,
-                    "target_class": self.target_model_class,
-                    "scene_name": self.scene_model_name,
-                    "scene_class": self.scene_model_class,
-                    "sun_energy": self.sun_energy,
-                    "sun_azimuth_deg": self.sun_azimuth_deg,
-                    "sun_elevation_deg": self.sun_elevation_deg,
-                    "distance": distance,
-                    "elevation_deg": elevation_deg,
-                    "azimuth_deg": azimuth_deg,
-                    "bbox": [cx, cy, w, h],
-                    "occlusion": occlusion_ratio,
-                    "renderer": self.renderer,
-                }
-            ],
-        })
-
-    def render_with_annotations(self, distance, elevation_deg, rotation_step_deg=45):
+        key = self.render_key(distance, elevation_deg, azimuth_deg, look_at)
+        annotation = self.target_annotation(self.target_model_name, self.target_model_class, distance, elevation_deg,
+                                            azimuth_deg, [cx, cy, w, h], occlusion_ratio, look_at)
+        levels = self.pose_lods(distance, elevation_deg, azimuth_deg, look_at)
+        if levels is not None:
+            annotation.update(self.lod_annotation(levels))
+        annotation.update(extra or {})
+        self.annotation_writer.write(filename, [annotation], render_key=key)
+        self.completed_poses[key] = filename
+
+    def target_annotation(self, target_name, target_class, distance, elevation_deg, azimuth_deg, bbox,
+                          occlusion_ratio, look_at=None):
         """
-        导出渲染图像与标注信息
-        :param distance: 摄像机与目标模型的距离
-        :param elevation_deg: 摄像机与目标模型的仰角
-        :param rotation_step_deg: 摄像机环绕拍摄时的角度间隔
+        单个目标的标注条目（观察点有偏移时记录 look_at，光照随机化时记录该位姿抽取的光照参数）
+        """
+        annotation = {
+            "target_name": target_name,
+            "target_class": target_class,
+            "scene_name": self.scene_model_name,
+            "scene_class": self.scene_model_class,
+            "sun_energy": self.sun_energy,
+            "sun_azimuth_deg": self.sun_azimuth_deg,
+            "sun_elevation_deg": self.sun_elevation_deg,
+            "distance": distance,
+            "elevation_deg": elevation_deg,
+            "azimuth_deg": azimuth_deg,
+            "bbox": bbox,
+            "occlusion": occlusion_ratio,
+            "renderer": self.renderer,
+            "image_size": self.image_size,
+        }
+        if look_at is not None:
+            annotation["look_at"] = list(look_at)
+        annotation.update(self.pose_lighting(distance, elevation_deg, azimuth_deg, look_at) or {})
+        return annotation
+
+    def frame_annotations_to_json(self, filename, distance, elevation_deg, azimuth_deg, targets, look_at=None):
+        """
+        追加写入多目标同帧图像的标注记录（每个可见目标一条标注）
+        :param targets: [(目标序号, (cx, cy, w, h), 遮挡比例, 附加标注字段), ...]
+        :param look_at: 观察点偏移
+        """
+        key = self.render_key(distance, elevation_deg, azimuth_deg, look_at)
+        levels = self.pose_lods(distance, elevation_deg, azimuth_deg, look_at)
+        annotations = []
+        for index, bbox, occlusion_ratio, extra in targets:
+            frame_target = self.frame_targets[index]
+            annotation = self.target_annotation(frame_target["name"], frame_target["class"], distance,
+                                                elevation_deg, azimuth_deg, list(bbox), occlusion_ratio, look_at)
+            if levels is not None:
+                annotation.update(self.lod_annotation(levels, index))
+            annotation.update({"instance": index, "target_position": frame_target["position"], **(extra or {})})
+            annotations.append(annotation)
+        self.annotation_writer.write(filename, annotations, render_key=key)
+        self.completed_poses[key] = filename
+
+    def plan_poses(self, poses, occlusion_threshold=None, min_bbox_pixels=None):
+        """
+        渲染前批量评估位姿（不修改场景状态），剔除目标不在画面内、过小或遮挡过高的位姿
+        （mask 标注方式下跳过遮挡检查，渲染后由实例掩膜剔除）
+        :param poses: (N, 3) 位姿数组，每行为 (distance, elevation_deg, azimuth_deg)
+        :param occlusion_threshold: 遮挡比例阈值，默认为 self.occlusion_threshold
+        :param min_bbox_pixels: 标注框最小边长（像素），默认为 self.min_bbox_pixels
+        :return: 可渲染位姿列表 [(distance, elevation_deg, azimuth_deg, occlusion_ratio, bbox, look_at), ...]
+        """
+        occlusion_threshold = self.occlusion_threshold if occlusion_threshold is None else occlusion_threshold
+        min_bbox_pixels = self.min_bbox_pixels if min_bbox_pixels is None else min_bbox_pixels
+        resolution = self.image_size
+        tangents = visibility.camera_frame_tangents(self.scene, self.camera_obj)
+        occluder = None if self.annotation_mode == "mask" else self.occluder
+        with tracing.span("ray_casting", poses=len(poses), samples=len(self.target_samples)):
+            result = pose_planner.plan_poses(poses, self.target_samples, occluder, tangents, resolution,
+                                             occlusion_threshold, min_bbox_pixels)
+
+        summary = pose_planner.summarize(result["status"])
+        print(f"📋 位姿预筛选完成 | 共 {len(poses)} 个位姿，" + "，".join(f"{k}: {v}" for k, v in summary.items()))
+
+        planned_poses = []
+        for i in np.flatnonzero(result["status"] == pose_planner.POSE_ACCEPTED):
+            distance, elevation_deg, azimuth_deg = poses[i, :3].tolist()
+            planned_poses.append((distance, elevation_deg, azimuth_deg, float(result["occlusion"][i]),
+                                  tuple(result["bbox"][i].tolist()), pose_planner.pose_look_at(poses[i])))
+        self.planned_count += len(planned_poses)
+        return planned_poses
+
+    def render_poses(self, planned_poses, budget=0):
+        """
+        渲染预筛选后的位姿并导出标注信息
+        :param planned_poses: plan_poses 的返回值
+        :param budget: 图像数量上限（已完成、缓存命中与新渲染的图像均计入，被剔除的位姿不计入），0 表示不限制
         """
         # 确保数据集导出文件夹存在
         os.makedirs(self.output_dir, exist_ok=True)
 
-        # 计算环绕角度
-        angles = []
-        current = 0
-        while current < 360:
-            angles.append(current)
-            current += rotation_step_deg
-        angles = sorted(set(angles))
-
-        # 调整相机
-        for azimuth_deg in angles:
-            # 计算相机位置
-            elevation_deg = 89 if elevation_deg >= 90 else elevation_deg
-            elev = math.radians(elevation_deg)
-            azim = math.radians(azimuth_deg)
-            x = distance * math.cos(elev) * math.sin(azim)
-            y = distance * math.cos(elev) * math.cos(azim)
-            z = distance * math.sin(elev)
-            self.configure_camara(x, y, z)
-            print(f"✅ 相机参数调整完毕 | 相机距离：{distance}米，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
+        saved = 0
+        for distance, elevation_deg, azimuth_deg, occlusion_ratio, (cx, cy, w, h), look_at in planned_poses:
+            if budget and saved >= budget:
+                break
 
-            # 检测遮挡与 bbox
-            result = self.get_visible_info()
-            if not result[0]:
-                print(f"⚠️ 标不可见，跳过保存")
+            # 跳过内容键已完成的图像
+            key = self.render_key(distance, elevation_deg, azimuth_deg, look_at)
+            if key in self.completed_poses:
+                print(f"♻️ 跳过已完成图像 {self.completed_poses[key]}")
+                saved += 1
                 continue
-
-            is_visible, occlusion_ratio, (cx, cy, w, h) = result
-            if occlusion_ratio > 0.6:
-                print(
-                    f"❌ 遮挡比例过高，跳过保存 | 遮挡比例: {occlusion_ratio:.2%}")
+            if self.is_rejected(key):
+                print(f"♻️ 跳过已剔除位姿 | 相机距离：{distance}米，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
                 continue
 
+            # 调整相机
+            x, y, z = self.camera_position(distance, elevation_deg, azimuth_deg, look_at)
+            self.configure_camara(x, y, z, look_at)
+            if self.lighting_spec:
+                self.apply_lighting(self.pose_lighting(distance, elevation_deg, azimuth_deg, look_at))
+            print(f"✅ 相机参数调整完毕 | 相机距离：{distance}米，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
+
             # 保存图像
             self.index += 1
-            filename = f"image_{self.index:04d}.png"
-            self.scene.render.filepath = os.path.join(self.output_dir, filename)
-            self.bpy.ops.render.render(write_still=True)
+            filename = f"{self.image_prefix}_{key}{self.image_extension}"
+            image_path = os.path.join(self.output_dir, filename)
+
+            # 全局渲染缓存命中时直接链接图像，标注使用缓存中与图像对应的标注框与遮挡比例
+            cache_key = None
+            if self.render_cache is not None:
+                cache_key = self.cache_key(distance, elevation_deg, azimuth_deg, look_at)
+                with tracing.span("cache_fetch", image=filename):
+                    cached = self.render_cache.fetch(cache_key, image_path)
+                if cached is not None:
+                    cx, cy, w, h = cached["bbox"]
+                    self.save_annotation(filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h,
+                                         cached["occlusion"], cached.get("extra"), look_at)
+                    saved += 1
+                    continue
+
+            # 按相机距离切换 LOD（缓存命中时无需切换）
+            if self.lod_pixel_error:
+                self.apply_lods(self.pose_lods(distance, elevation_deg, azimuth_deg, look_at))
+
+            # 低分辨率预渲染筛选，未通过时不渲染全分辨率图像
+            if self.prepass_width:
+                with tracing.span("prepass", image=filename, resolution=self.prepass_size):
+                    result = self.prepass_instances([self.target_obj], [self.instance_triangles(self.target_obj)])[0]
+                if not self.prepass_accepted(result):
+                    self.index -= 1
+                    self.prepass_rejected += 1
+                    self.reject_pose(key, "prepass")
+                    print(f"⚠️ 预渲染检查未通过，跳过该位姿 | 遮挡比例: {result['occlusion']:.2%}")
+                    continue
+
+            with tracing.span("render", image=filename, renderer=self.renderer):
+                self.render_image()
+
+            # 实例掩膜标注：由渲染结果计算标注框与遮挡比例，不满足阈值的图像不保存
+            extra = None
+            if self.annotation_mode == "mask":
+                with tracing.span("instance_mask", image=filename):
+                    result = self.measure_instances([self.target_obj], [self.instance_triangles(self.target_obj)])[0]
+                if not self.instance_accepted(result):
+                    self.index -= 1
+                    self.reject_pose(key, "mask")
+                    print(f"⚠️ 实例掩膜检查未通过，跳过该位姿 | 遮挡比例: {result['occlusion']:.2%}")
+                    continue
+                (cx, cy, w, h), occlusion_ratio = result["bbox"], result["occlusion"]
+                extra = self.instance_extra(result)
+
+            annotation = (filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio, extra,
+                          look_at)
+            self.write_image(image_path, annotation, cache_key)
+            saved += 1
+
+        # 等待本批图像全部落盘（标注依赖当前目标信息）
+        if self.image_writer is not None:
+            with tracing.span("write_wait"):
+                self.image_writer.drain(wait=True)
+
+    def render_image(self):
+        """
+        渲染当前相机视图到内存（Render Result）
+        """
+        self.bpy.ops.render.render(write_still=False)
+
+    def write_image(self, image_path, annotation, cache_key=None, save=None):
+        """
+        写出渲染结果，图像落盘后写入标注
+        :param image_path: 图像文件路径
+        :param annotation: 标注保存函数的参数（第一个为文件名）
+        :param cache_key: 全局渲染缓存键，图像落盘后加入缓存
+        :param save: 标注保存函数，默认为 save_annotation
+        """
+        if self.image_writer is not None:
+            # 像素交给后台线程编码写盘（编码写盘耗时由后台线程记录）
+            with tracing.span("read_pixels", image=annotation[0]):
+                pixels, width, height = self.read_render_pixels()
+            with tracing.span("write_submit", image=annotation[0]):
+                self.image_writer.submit(image_path, pixels, width, height,
+                                         on_written=lambda: self.commit_image(image_path, annotation, cache_key, save))
+        else:
+            # 按场景输出设置保存（与 write_still 相同的编码与色彩管理）；
+            # 已有文件可能与渲染缓存共用硬链接，先删除再写出，避免原地覆盖缓存内容
+            with tracing.span("file_write", image=annotation[0], format=self.image_format):
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                self.bpy.data.images["Render Result"].save_render(image_path, scene=self.scene)
+                render_checkpoint.fsync_file(image_path)
+            self.commit_image(image_path, annotation, cache_key, save)
+
+    def commit_image(self, image_path, annotation, cache_key=None, save=None):
+        """
+        图像落盘后写入标注，并加入全局渲染缓存（缓存中保存标注保存函数返回的像素相关标注）
+        """
+        cached_annotation = (save or self.save_annotation)(*annotation)
+        if cache_key is not None and self.render_cache is not None:
+            with tracing.span("cache_store", image=annotation[0]):
+                self.render_cache.store(cache_key, image_path, cached_annotation)
 
-            # 保存标注信息
-            self.annotations_to_json(filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio)
+    def save_annotation(self, filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio,
+                        extra=None, look_at=None):
+        """
+        图像落盘后写入标注信息，作为该位姿的断点
+        :return: 与图像像素相关的标注（供全局渲染缓存保存）
+        """
+        with tracing.span("json_dump", image=filename):
+            self.annotations_to_json(filename, distance, elevation_deg, azimuth_deg, cx, cy, w, h, occlusion_ratio,
+                                     extra, look_at)
+        print(f"✅ 已保存 {filename} | 遮挡比例: {occlusion_ratio:.2%}")
+        return {"bbox": [cx, cy, w, h], "occlusion": occlusion_ratio, "extra": extra, "image_size": self.image_size}
 
-            print(
-                f"✅ 已保存 {filename} | 遮挡比例: {occlusion_ratio:.2%}")
+    def save_frame_annotation(self, filename, distance, elevation_deg, azimuth_deg, targets, look_at=None):
+        """
+        多目标同帧图像落盘后写入标注信息
+        :param targets: [(目标序号, (cx, cy, w, h), 遮挡比例, 附加标注字段), ...]
+        :return: 与图像像素相关的标注（供全局渲染缓存保存）
+        """
+        with tracing.span("json_dump", image=filename, targets=len(targets)):
+            self.frame_annotations_to_json(filename, distance, elevation_deg, azimuth_deg, targets, look_at)
+        print(f"✅ 已保存 {filename} | 可见目标: {len(targets)} / {len(self.frame_targets)}")
+        return {"targets": [[index, list(bbox), occlusion_ratio, extra]
+                            for index, bbox, occlusion_ratio, extra in targets],
+                "image_size": self.image_size}
+
+    def rejection_thresholds(self):
+        """
+        位姿剔除所依据的筛选阈值（记录在剔除记录中，阈值变化后重新评估被剔除的位姿）
+        """
+        return {"occlusion_threshold": self.occlusion_threshold, "min_bbox_pixels": self.min_bbox_pixels}
 
-        # 保存标注文件
-        if not os.path.exists(self.annotations_file):
-            with open(self.annotations_file, 'w', encoding="utf-8") as f:
-                json.dump(self.annotation_lines, f, indent=4)
-        else:
-            with open(self.annotations_file, 'r+', encoding="utf-8") as f:
-                try:
-                    existing_data = json.load(f)
-                    existing_data.update(self.annotation_lines)
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(existing_data, f, indent=4)
-                except json.JSONDecodeError:
-                    f.seek(0)
-                    f.truncate()
-                    json.dump(self.annotation_lines, f, indent=4)
-        print(f"📄 标注文件已保存: {self.annotations_file}")
+    def is_rejected(self, key):
+        """
+        该内容键的位姿是否已在当前筛选阈值下被剔除
+        """
+        return key in self.rejected_poses and self.rejected_poses[key] == self.rejection_thresholds()
+
+    def reject_pose(self, key, reason):
+        """
+        写入位姿剔除记录，作为该位姿的断点（不生成图像，后续运行直接跳过）
+        :param key: 位姿内容键
+        :param reason: 剔除原因（prepass / mask）
+        """
+        thresholds = self.rejection_thresholds()
+        self.annotation_writer.write(None, [], render_key=key, rejected=reason, thresholds=thresholds)
+        self.rejected_poses[key] = thresholds
+
+    def render_with_annotations(self, distance, elevation_deg, rotation_step_deg=45):
+        """
+        导出渲染图像与标注信息
+        :param distance: 摄像机与目标模型的距离
+        :param elevation_deg: 摄像机与目标模型的仰角
+        :param rotation_step_deg: 摄像机环绕拍摄时的角度间隔
+        """
+        poses = pose_planner.pose_grid([distance], [elevation_deg], rotation_step_deg)
+        self.render_poses(self.plan_poses(poses))
 
     def batch_render_with_annotations(self, distance_list: list, elevation_deg_list: list, rotation_step_deg=45):
         """
-        批量导出渲染图像与标注信息
+        批量导出渲染图像与标注信息（每个目标先对完整位姿网格预筛选，再渲染）
         :param distance_list: 摄像机与目标模型的距离列表
         :param elevation_deg_list: 摄像机与目标模型的仰角列表
         :param rotation_step_deg: 摄像机环绕拍摄时的角度间隔
@@ -544,20 +1471,246 @@ class SceneRenderer:
             render_task_index += 1
             print(f"➡️ ---------- 渲染目标 {render_task_index} / {render_target_num} 开始 ----------")
             self.load_target_model(target_model)
-            for distance in distance_list:
-                for elevation_deg in elevation_deg_list:
-                    self.render_with_annotations(distance, elevation_deg, rotation_step_deg)
+            poses, budget = self.candidate_poses(distance_list, elevation_deg_list, rotation_step_deg,
+                                                 [target_model["path"]])
+            planned_poses = self.plan_poses(poses)
+            # 按采样序列顺序渲染可渲染位姿，保存 budget 张图像后停止（预渲染与实例掩膜剔除的位姿由后续候选补足，
+            # 采样序列的前缀均匀覆盖视角）
+            expected = min(len(planned_poses), budget) if budget else len(planned_poses)
+            print(f"📋 目标 {self.target_model_name} 预计渲染 {expected} 张图像")
+            self.render_poses(planned_poses, budget)
+        if self.prepass_width:
+            print(f"📋 低分辨率预渲染共剔除 {self.prepass_rejected} 个位姿")
+        if self.lighting_spec:
+            self.apply_lighting()
+        if self.lod_pixel_error:
+            self.apply_lods()
+        self.annotation_writer.close()
+        print(f"📄 标注记录已保存: {self.annotations_file}")
+
+    def load_target_group(self, target_models, gap=1.0, sample_rate=0.1):
+        """
+        同时导入一组目标，在场景控制点（原点）附近随机摆放且水平投影互不重叠
+        （随机种子由场景与目标决定，同一组合的摆放保持不变）
+        :param target_models: 目标模型列表
+        :param gap: 相邻目标的最小间距（米）
+        :param sample_rate: 顶点采样比例
+        """
+        self.remove_target_model()
+        for target_model in target_models:
+            if not os.path.exists(target_model["path"]):
+                raise FileNotFoundError(f"目标模型文件不存在: {target_model['path']}")
+        target_paths = [target_model["path"] for target_model in target_models]
+        tracing.set_context(target=",".join(Path(path).stem for path in target_paths))
+        rng = np.random.default_rng(render_keys.layout_seed(self.scene_model_path, self.scene_model_point,
+                                                            target_paths))
+
+        # 导入并随机旋转各目标
+        for i, target_model in enumerate(target_models):
+            obj = self.import_target(target_model["path"], f"targetModel_{i}")
+            obj.matrix_world = Matrix.Rotation(rng.random() * 2 * math.pi, 4, 'Z') @ obj.matrix_world
+            self.frame_targets.append({
+                "path": target_model["path"],
+                "name": Path(target_model["path"]).stem,
+                "class": target_model["class"],
+                "digest": render_keys.file_digest(target_model["path"]) if self.render_cache is not None else None,
+                "obj": obj,
+                "lod": self.lod_slot(obj, target_library.load_manifest(target_model["path"])),
+            })
+
+        # 按水平包围圆摆放
+        with tracing.span("target_geometry", targets=len(self.frame_targets)):
+            self.bpy.context.view_layer.update()
+            deps_graph = self.bpy.context.evaluated_depsgraph_get()
+            footprints = [target_layout.footprint(visibility.object_world_vertices(target["obj"], deps_graph))
+                          for target in self.frame_targets]
+            positions = target_layout.sample_layout([radius for _, radius in footprints], rng, gap)
+            for target, (center, _), position in zip(self.frame_targets, footprints, positions):
+                matrix_world = target["obj"].matrix_world.copy()
+                matrix_world.translation.x += position[0] - center[0]
+                matrix_world.translation.y += position[1] - center[1]
+                target["obj"].matrix_world = matrix_world
+                target["position"] = [round(float(value), 3) for value in position]
+
+            # 各目标几何缓存与自身遮挡体（同帧其他目标相互遮挡）
+            self.bpy.context.view_layer.update()
+            deps_graph = self.bpy.context.evaluated_depsgraph_get()
+            for target in self.frame_targets:
+                vertices = visibility.object_world_vertices(target["obj"], deps_graph)
+                sample_count = min(max(50, int(len(vertices) * sample_rate)), len(vertices))
+                target["samples"] = np.ascontiguousarray(
+                    vertices[np.random.choice(len(vertices), size=sample_count, replace=False)])
+                objects = [target["obj"]] + list(target["obj"].children_recursive)
+                target["triangles"] = visibility.objects_world_triangles(objects, deps_graph)
+                target["occluder"] = OccluderBVH.from_triangles(target["triangles"])
+        print(f"✅ 目标组导入成功 | " + "，".join(f"{t['name']} {t['position']}" for t in self.frame_targets))
+
+    def plan_frame_poses(self, poses, occlusion_threshold=None, min_bbox_pixels=None):
+        """
+        多目标同帧渲染的位姿预筛选：逐目标评估（遮挡体包含场景与同帧其他目标），至少一个目标可用时渲染该位姿
+        （mask 标注方式下跳过遮挡检查，渲染后由实例掩膜剔除）
+        :return: 可渲染位姿列表 [(distance, elevation_deg, azimuth_deg, [(目标序号, bbox, 遮挡比例, 附加标注字段), ...],
+                 look_at), ...]
+        """
+        occlusion_threshold = self.occlusion_threshold if occlusion_threshold is None else occlusion_threshold
+        min_bbox_pixels = self.min_bbox_pixels if min_bbox_pixels is None else min_bbox_pixels
+        resolution = self.image_size
+        tangents = visibility.camera_frame_tangents(self.scene, self.camera_obj)
+        accepted = [[] for _ in range(len(poses))]
+        for index, target in enumerate(self.frame_targets):
+            occluder = None
+            if self.annotation_mode != "mask":
+                occluder = OccluderGroup([self.occluder] + [other["occluder"] for other in self.frame_targets
+                                                            if other is not target])
+            with tracing.span("ray_casting", poses=len(poses), samples=len(target["samples"]), instance=index):
+                result = pose_planner.plan_poses(poses, target["samples"], occluder, tangents, resolution,
+                                                 occlusion_threshold, min_bbox_pixels)
+            summary = pose_planner.summarize(result["status"])
+            print(f"📋 目标 {target['name']} 位姿预筛选完成 | " + "，".join(f"{k}: {v}" for k, v in summary.items()))
+            for i in np.flatnonzero(result["status"] == pose_planner.POSE_ACCEPTED):
+                accepted[i].append((index, tuple(result["bbox"][i].tolist()), float(result["occlusion"][i]), {}))
+
+        planned_poses = []
+        for pose, targets in zip(poses, accepted):
+            if targets:
+                planned_poses.append((*pose[:3].tolist(), targets, pose_planner.pose_look_at(pose)))
+        self.planned_count += len(planned_poses)
+        return planned_poses
+
+    def render_frame_poses(self, planned_poses, budget=0):
+        """
+        渲染多目标同帧位姿并导出标注信息（每个位姿只渲染一次）
+        :param planned_poses: plan_frame_poses 的返回值
+        :param budget: 图像数量上限，0 表示不限制
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        saved = 0
+        for distance, elevation_deg, azimuth_deg, targets, look_at in planned_poses:
+            if budget and saved >= budget:
+                break
+
+            key = self.render_key(distance, elevation_deg, azimuth_deg, look_at)
+            if key in self.completed_poses:
+                print(f"♻️ 跳过已完成图像 {self.completed_poses[key]}")
+                saved += 1
+                continue
+            if self.is_rejected(key):
+                print(f"♻️ 跳过已剔除位姿 | 相机距离：{distance}米，方向角：{azimuth_deg}°，高低角：{elevation_deg}°")
+                continue
+
+            x, y, z = self.camera_position(distance, elevation_deg, azimuth_deg, look_at)
+            self.configure_camara(x, y, z, look_at)
+            if self.lighting_spec:
+                self.apply_lighting(self.pose_lighting(distance, elevation_deg, azimuth_deg, look_at))
+
+            self.index += 1
+            filename = f"{self.image_prefix}_{key}{self.image_extension}"
+            image_path = os.path.join(self.output_dir, filename)
+
+            cache_key = None
+            if self.render_cache is not None:
+                cache_key = self.cache_key(distance, elevation_deg, azimuth_deg, look_at)
+                with tracing.span("cache_fetch", image=filename):
+                    cached = self.render_cache.fetch(cache_key, image_path)
+                if cached is not None:
+                    # 早期缓存条目没有附加标注字段
+                    self.save_frame_annotation(filename, distance, elevation_deg, azimuth_deg,
+                                               [(*target, None)[:4] for target in cached["targets"]], look_at)
+                    saved += 1
+                    continue
+
+            # 按相机距离切换 LOD（缓存命中时无需切换）
+            if self.lod_pixel_error:
+                self.apply_lods(self.pose_lods(distance, elevation_deg, azimuth_deg, look_at))
+
+            # 低分辨率预渲染筛选，所有目标均未通过时不渲染全分辨率图像
+            if self.prepass_width:
+                with tracing.span("prepass", image=filename, resolution=self.prepass_size):
+                    results = self.prepass_instances([target["obj"] for target in self.frame_targets],
+                                                     [target["triangles"] for target in self.frame_targets])
+                if not any(self.prepass_accepted(result) for result in results):
+                    self.index -= 1
+                    self.prepass_rejected += 1
+                    self.reject_pose(key, "prepass")
+                    print("⚠️ 预渲染检查未通过，跳过该位姿 | 无满足阈值的目标")
+                    continue
+
+            with tracing.span("render", image=filename, renderer=self.renderer, targets=len(targets)):
+                self.render_image()
+
+            # 实例掩膜标注：同一帧的实例掩膜一次计算全部目标，只保留满足阈值的目标
+            if self.annotation_mode == "mask":
+                with tracing.span("instance_mask", image=filename, targets=len(self.frame_targets)):
+                    results = self.measure_instances([target["obj"] for target in self.frame_targets],
+                                                     [target["triangles"] for target in self.frame_targets])
+                targets = [(index, result["bbox"], result["occlusion"], self.instance_extra(result))
+                           for index, result in enumerate(results) if self.instance_accepted(result)]
+                if not targets:
+                    self.index -= 1
+                    self.reject_pose(key, "mask")
+                    print("⚠️ 实例掩膜检查未通过，跳过该位姿 | 无满足阈值的目标")
+                    continue
+
+            self.write_image(image_path, (filename, distance, elevation_deg, azimuth_deg, targets, look_at),
+                             cache_key, save=self.save_frame_annotation)
+            saved += 1
+
+        if self.image_writer is not None:
+            with tracing.span("write_wait"):
+                self.image_writer.drain(wait=True)
+
+    def batch_render_frames(self, distance_list: list, elevation_deg_list: list, rotation_step_deg=45,
+                            targets_per_frame=2):
+        """
+        多目标同帧批量渲染：目标按顺序分组，每组同时摆放在场景中，每个位姿只渲染一次，每个可见目标一条标注
+        :param distance_list: 摄像机与目标组中心的距离列表
+        :param elevation_deg_list: 摄像机高低角列表
+        :param rotation_step_deg: 摄像机环绕拍摄时的角度间隔
+        :param targets_per_frame: 每帧目标数量
+        """
+        target_groups = render_keys.target_groups(self.target_model_list, targets_per_frame)
+        for group_index, target_group in enumerate(target_groups, 1):
+            print(f"➡️ ---------- 渲染目标组 {group_index} / {len(target_groups)} 开始 ----------")
+            self.load_target_group(target_group)
+            poses, budget = self.candidate_poses(distance_list, elevation_deg_list, rotation_step_deg,
+                                                 [target_model["path"] for target_model in target_group])
+            planned_poses = self.plan_frame_poses(poses)
+            expected = min(len(planned_poses), budget) if budget else len(planned_poses)
+            print(f"📋 目标组预计渲染 {expected} 张图像")
+            self.render_frame_poses(planned_poses, budget)
+        self.remove_target_model()
+        if self.prepass_width:
+            print(f"📋 低分辨率预渲染共剔除 {self.prepass_rejected} 个位姿")
+        if self.lighting_spec:
+            self.apply_lighting()
+        if self.lod_pixel_error:
+            self.apply_lods()
+        self.annotation_writer.close()
+        print(f"📄 标注记录已保存: {self.annotations_file}")
 
 
 @timer
 def main(config: dict):
+    tracing.configure(config.get('trace'))
     scene_renderer_object = SceneRenderer(config['scene_model'], config['target_model_list'],
                                           render_id=config['render_id'], output_dir=config['output_dir'],
-                                          index=config['index'])
-
+                                          index=config['index'],
+                                          image_prefix=config.get('image_prefix', "image"),
+                                          annotations_name=config.get('annotations_name', "metadata.jsonl"),
+                                          texture_size=config.get('texture_size',
+                                                                  scene_textures.task_texture_size(config)))
+    return run_task(scene_renderer_object, config)
+
+
+def run_task(scene_renderer_object: SceneRenderer, config: dict):
+    """
+    按任务配置渲染（场景已导入，可复用常驻进程中的 SceneRenderer）
+    """
     # 修改日光参数
     scene_renderer_object.configure_sun(azimuth_deg=config['sun_azimuth_deg'],
                                         elevation_deg=config['sun_elevation_deg'])
+    scene_renderer_object.set_lighting_randomization(config.get('lighting_spec'))
 
     # 保存模型
     # scene_renderer_object.export_blender_file(scene_renderer_object.output_dir,
@@ -566,12 +1719,29 @@ def main(config: dict):
     # 修改分辨率
     scene_renderer_object.set_resolution(config['resolution'][0], config['resolution'][1])
 
+    # 修改图像格式
+    scene_renderer_object.set_image_format(config.get('image_format', "PNG"), config.get('image_compression', 15),
+                                           config.get('image_quality', 90))
+
     # 修改渲染器
     scene_renderer_object.set_renderer(config['renderer'])
-
-    # 批量渲染
-    scene_renderer_object.batch_render_with_annotations(config['camera_distances'], config['camera_elevations'],
-                                                        config['camera_rotation_step_deg'])
+    scene_renderer_object.set_render_threads(config.get('render_threads'))
+    scene_renderer_object.set_annotation_mode(config.get('annotation_mode', "raycast"))
+    scene_renderer_object.set_pose_sampler(config.get('pose_sampler'))
+    scene_renderer_object.set_prepass(config.get('prepass_width', 0))
+    scene_renderer_object.set_lod_selection(config.get('lod_pixel_error', 0))
+    scene_renderer_object.set_image_write_mode(config.get('image_write_mode', "sync"))
+    scene_renderer_object.set_render_cache(config.get('render_cache_dir'))
+
+    # 批量渲染（targets_per_frame > 1 时多目标同帧渲染）
+    targets_per_frame = config.get('targets_per_frame', 1)
+    if targets_per_frame > 1:
+        scene_renderer_object.batch_render_frames(config['camera_distances'], config['camera_elevations'],
+                                                  config['camera_rotation_step_deg'], targets_per_frame)
+    else:
+        scene_renderer_object.batch_render_with_annotations(config['camera_distances'],
+                                                            config['camera_elevations'],
+                                                            config['camera_rotation_step_deg'])
 
     return scene_renderer_object.index, scene_renderer_object.render_id
 
@@ -606,4 +1776,5 @@ if __name__ == '__main__':
         "index": 0,
     }
     _index, _render_id = main(CONFIG)
+    annotation_writer.compact(os.path.join(CONFIG["output_dir"], _render_id))
     print(f"渲染任务 {_render_id} 已渲染 {_index} 张图片")
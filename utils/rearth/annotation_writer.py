@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午4:05
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : annotation_writer.py
+# @Project : RealEarthStudio
+# @Details : 标注流式写入（JSON Lines 追加写）与合并为 metadata.json
+
+
+import os
+import glob
+import json
+
+ANNOTATIONS_FILE = "metadata.json"
+
+
+class AnnotationWriter:
+    """ 标注追加写入器：每张图像一行记录，写入后立即 flush """
+
+    def __init__(self, path, durable=False):
+        """
+        初始化对象
+        :param path: JSON Lines 文件路径
+        :param durable: 每条记录写入后是否 fsync（用作断点时开启）
+        """
+        self.path = path
+        self.durable = durable
+        self.file = None
+
+    def write(self, filename, annotations, **extra):
+        """
+        追加一条记录
+        :param filename: 图像文件名
+        :param annotations: 该图像的标注列表
+        :param extra: 附加字段
+        """
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, 'a', encoding="utf-8")
+        record = {"filename": filename, "annotations": annotations, **extra}
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        if self.durable:
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_records(path):
+    """
+    读取 JSON Lines 标注记录（忽略进程中断时写了一半的末行）
+    """
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"⚠️ 跳过损坏的标注记录: {path}")
+    return records
+
+
+def rewrite_records(path, records):
+    """
+    用给定记录原子地重写 JSON Lines 文件
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def compact(dataset_dir, pattern="*.jsonl", output_name=ANNOTATIONS_FILE):
+    """
+    合并目录下的 JSON Lines 标注为 metadata.json（filename -> [标注列表]）
+    :param dataset_dir: 数据集目录
+    :param pattern: 标注记录文件匹配模式
+    :param output_name: 输出文件名
+    :return: 合并后的图像数量
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    merged = {}
+    for path in sorted(glob.glob(os.path.join(dataset_dir, pattern))):
+        for record in read_records(path):
+            if record.get("rejected"):
+                # 断点中的剔除位姿记录没有图像
+                continue
+            merged[record["filename"]] = record["annotations"]
+
+    output_file = os.path.join(dataset_dir, output_name)
+    tmp_file = output_file + ".tmp"
+    with open(tmp_file, 'w', encoding="utf-8") as f:
+        json.dump(merged, f, indent=4)
+    os.replace(tmp_file, output_file)
+    print(f"📄 标注文件已合并: {output_file} | 共 {len(merged)} 张图像")
+    return len(merged)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午5:20
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : image_writer.py
+# @Project : RealEarthStudio
+# @Details : 异步图像写出：渲染结果像素拷贝出 Blender 后，由后台线程编码 PNG 并写盘
+
+
+import os
+import zlib
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.other import tracing
+
+
+def linear_to_srgb(linear):
+    """
+    线性颜色转换到 sRGB（sRGB OETF，与 Blender 的 Standard 视图变换一致）
+    :param linear: 线性颜色数组（0-1）
+    """
+    linear = np.clip(linear, 0.0, 1.0)
+    return np.where(linear <= 0.0031308, linear * 12.92, 1.055 * np.power(linear, 1 / 2.4) - 0.055)
+
+
+def float_to_rgba8(pixels, width, height):
+    """
+    将 Blender 图像像素（自下而上、线性 RGBA 浮点）转换为自上而下的 sRGB RGBA uint8 数组
+    :param pixels: (width * height * 4,) float32 数组
+    :return: (height, width, 4) uint8 数组
+    """
+    rgba = pixels.reshape(height, width, 4)[::-1]
+    out = np.empty((height, width, 4), dtype=np.uint8)
+    out[..., :3] = np.rint(linear_to_srgb(rgba[..., :3]) * 255)
+    out[..., 3] = np.rint(np.clip(rgba[..., 3], 0.0, 1.0) * 255)
+    return out
+
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def encode_png(rgba, compress_level=6):
+    """
+    编码 8 位 RGBA PNG（每行使用 Up 滤波）
+    :param rgba: (height, width, 4) uint8 数组
+    :param compress_level: zlib 压缩级别（0-9）
+    :return: PNG 文件内容
+    """
+    height, width = rgba.shape[:2]
+    rows = rgba.reshape(height, width * 4)
+    filtered = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    filtered[1:, 1:] = rows[1:] - rows[:-1]  # uint8 减法自动按 256 取模
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _png_chunk(b"IHDR", header) +
+            _png_chunk(b"IDAT", zlib.compress(filtered.tobytes(), compress_level)) +
+            _png_chunk(b"IEND", b""))
+
+
+def write_file_durable(path, data):
+    """
+    写入文件并刷盘（先写临时文件再替换，中断时不会留下不完整的图像）
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AsyncImageWriter:
+    """ 异步图像写出（有界队列，提交超出上限时阻塞渲染线程） """
+
+    def __init__(self, max_workers=2, max_pending=4, compress_level=6):
+        """
+        初始化对象
+        :param max_workers: 编码线程数
+        :param max_pending: 最多在内存中排队的图像数量（反压）
+        :param compress_level: PNG 压缩级别
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image_writer")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.compress_level = compress_level
+        self.pending = deque()
+
+    def _encode_and_write(self, path, pixels, width, height):
+        try:
+            with tracing.span("file_write", image=os.path.basename(path), format="PNG"):
+                write_file_durable(path, encode_png(float_to_rgba8(pixels, width, height), self.compress_level))
+        finally:
+            self.slots.release()
+
+    def submit(self, path, pixels, width, height, on_written=None):
+        """
+        提交图像写出任务
+        :param path: 图像文件路径
+        :param pixels: Blender 图像像素（自下而上、线性 RGBA 浮点）
+        :param width: 图像宽度
+        :param height: 图像高度
+        :param on_written: 图像落盘后的回调（在调用线程中按提交顺序执行，见 drain）
+        """
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._encode_and_write, path, pixels, width, height)
+        except Exception:
+            self.slots.release()
+            raise
+        self.pending.append((future, on_written))
+        self.drain()
+
+    def drain(self, wait=False):
+        """
+        按提交顺序执行已落盘图像的回调
+        :param wait: 是否等待全部图像写出
+        """
+        while self.pending and (wait or self.pending[0][0].done()):
+            future, on_written = self.pending.popleft()
+            future.result()
+            if on_written:
+                on_written()
+
+    def shutdown(self):
+        try:
+            self.drain(wait=True)
+        finally:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午11:00
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : instance_mask.py
+# @Project : RealEarthStudio
+# @Details : 实例掩膜标注：由 Cryptomatte 对象 ID 计算可见标注框与像素级遮挡比例，由三角形光栅化计算完整（amodal）投影（NumPy实现，不依赖 bpy）
+
+
+import numpy as np
+
+# 光栅化时每块最多计算的 (三角形, 像素) 对数量
+MAX_RASTER_PAIRS = 1 << 22
+
+
+def murmurhash3_32(data, seed=0):
+    """
+    MurmurHash3 x86_32（Blender Cryptomatte 使用的对象名称哈希）
+    :param data: bytes
+    :return: 32 位无符号整数
+    """
+    c1, c2, mask = 0xcc9e2d51, 0x1b873593, 0xffffffff
+    h = seed & mask
+    rounded_end = len(data) & ~3
+    for i in range(0, rounded_end, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        k = (k * c2) & mask
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & mask
+        h = (h * 5 + 0xe6546b64) & mask
+
+    k = 0
+    tail = data[rounded_end:]
+    if len(tail) >= 3:
+        k ^= tail[2] << 16
+    if len(tail) >= 2:
+        k ^= tail[1] << 8
+    if len(tail) >= 1:
+        k ^= tail[0]
+        k = (k * c1) & mask
+        k = ((k << 15) | (k >> 17)) & mask
+        k = (k * c2) & mask
+        h ^= k
+
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & mask
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & mask
+    h ^= h >> 16
+    return h
+
+
+def cryptomatte_id(name):
+    """
+    对象名称对应的 Cryptomatte ID（float32 的位模式，指数位限制在 1-254 之间，与 Blender 一致）
+    :return: 32 位无符号整数
+    """
+    h = murmurhash3_32(name.encode("utf-8"))
+    exponent = min(max((h >> 23) & 0xff, 1), 254)
+    return (h & 0x807fffff) | (exponent << 23)
+
+
+def instance_map(id_bits, instance_ids):
+    """
+    将每个像素的主导对象 ID 转换为实例序号
+    :param id_bits: (H, W) uint32 数组，Cryptomatte 第 0 层的对象 ID 位模式
+    :param instance_ids: 各实例包含的对象 Cryptomatte ID 列表（一个实例可由多个对象组成）
+    :return: (H, W) int16 数组，背景为 -1
+    """
+    object_ids = np.array([object_id for ids in instance_ids for object_id in ids], dtype=np.uint32)
+    labels = np.array([index for index, ids in enumerate(instance_ids) for _ in ids], dtype=np.int16)
+    if len(object_ids) == 0:
+        return np.full(id_bits.shape, -1, dtype=np.int16)
+    order = np.argsort(object_ids)
+    sorted_ids, sorted_labels = object_ids[order], labels[order]
+    position = np.clip(np.searchsorted(sorted_ids, id_bits), 0, len(sorted_ids) - 1)
+    matched = sorted_ids[position] == id_bits
+    return np.where(matched, sorted_labels[position], -1).astype(np.int16)
+
+
+def mask_bbox(mask):
+    """
+    二值掩膜的标注框
+    :param mask: (H, W) bool 数组（自上而下）
+    :return: ((cx, cy, w, h), 像素数)，图像坐标系（y 向下）归一化；掩膜为空时标注框为 None
+    """
+    height, width = mask.shape
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None, 0
+    cols = np.flatnonzero(mask.any(axis=0))
+    x_min, x_max = cols[0] / width, (cols[-1] + 1) / width
+    y_min, y_max = rows[0] / height, (rows[-1] + 1) / height
+    bbox = ((x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min)
+    return tuple(float(v) for v in bbox), int(np.count_nonzero(mask))
+
+
+def rasterize(triangles, width, height):
+    """
+    三角形覆盖光栅化（像素中心采样，无深度），用于计算目标不考虑遮挡时的完整投影
+    按包围盒尺寸分组向量化计算（超出画面的部分裁剪掉）
+    :param triangles: (T, 3, 2) 像素坐标（x 向右，y 向下）
+    :param width: 图像宽度
+    :param height: 图像高度
+    :return: (H, W) bool 数组
+    """
+    covered = np.zeros((height, width), dtype=bool)
+    triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 2)
+
+    # 像素中心落在 [x0, x1] × [y0, y1] 范围内
+    x0 = np.maximum(np.ceil(triangles[:, :, 0].min(axis=1) - 0.5), 0).astype(np.int64)
+    x1 = np.minimum(np.floor(triangles[:, :, 0].max(axis=1) - 0.5), width - 1).astype(np.int64)
+    y0 = np.maximum(np.ceil(triangles[:, :, 1].min(axis=1) - 0.5), 0).astype(np.int64)
+    y1 = np.minimum(np.floor(triangles[:, :, 1].max(axis=1) - 0.5), height - 1).astype(np.int64)
+    keep = (x1 >= x0) & (y1 >= y0)
+    triangles, x0, x1, y0, y1 = triangles[keep], x0[keep], x1[keep], y0[keep], y1[keep]
+    size = np.maximum(x1 - x0, y1 - y0) + 1
+
+    # 按包围盒边长分组（1, 2, 4, ...），组内在 size × size 网格上计算边函数
+    bucket = np.ceil(np.log2(size)).astype(np.int64)
+    for b in np.unique(bucket):
+        side = 1 << int(b)
+        index = np.flatnonzero(bucket == b)
+        offsets_y, offsets_x = np.divmod(np.arange(side * side), side)
+        chunk = max(1, MAX_RASTER_PAIRS // (side * side))
+        for start in range(0, len(index), chunk):
+            batch = index[start:start + chunk]
+            px = x0[batch, None] + offsets_x[None, :]
+            py = y0[batch, None] + offsets_y[None, :]
+            inside = (px <= x1[batch, None]) & (py <= y1[batch, None]) & \
+                _inside_triangles(triangles[batch], px + 0.5, py + 0.5)
+            covered[py[inside], px[inside]] = True
+    return covered
+
+
+def _inside_triangles(triangles, px, py):
+    """像素中心是否在三角形内（与顶点顺序无关，退化三角形视为不覆盖）"""
+    a, b, c = triangles[:, 0, None, :], triangles[:, 1, None, :], triangles[:, 2, None, :]
+
+    def edge(p, q):
+        return (q[..., 0] - p[..., 0]) * (py - p[..., 1]) - (q[..., 1] - p[..., 1]) * (px - p[..., 0])
+
+    area = (b[..., 0] - a[..., 0]) * (c[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (c[..., 0] - a[..., 0])
+    sign = np.sign(area)
+    return (sign != 0) & (edge(a, b) * sign >= 0) & (edge(b, c) * sign >= 0) & (edge(c, a) * sign >= 0)
+
+
+def ndc_to_pixels(ndc, width, height):
+    """
+    相机归一化坐标（y 向上）转换为像素坐标（y 向下）
+    """
+    return np.stack([ndc[..., 0] * width, (1 - ndc[..., 1]) * height], axis=-1)
+
+
+def instance_annotations(instances, amodal_masks):
+    """
+    计算各实例的可见标注框、完整标注框与像素级遮挡比例
+    :param instances: instance_map 的返回值
+    :param amodal_masks: 各实例不考虑遮挡时的投影掩膜（rasterize 的返回值）
+    :return: [dict(bbox, amodal_bbox, visible_pixels, amodal_pixels, occlusion), ...]，不可见的实例 bbox 为 None
+    """
+    results = []
+    for index, amodal in enumerate(amodal_masks):
+        bbox, visible_pixels = mask_bbox(instances == index)
+        amodal_bbox, amodal_pixels = mask_bbox(amodal)
+        amodal_pixels = max(amodal_pixels, visible_pixels)
+        occlusion = 1.0 - visible_pixels / amodal_pixels if amodal_pixels else 1.0
+        results.append({"bbox": bbox, "amodal_bbox": amodal_bbox, "visible_pixels": visible_pixels,
+                        "amodal_pixels": amodal_pixels, "occlusion": float(occlusion)})
+    return results
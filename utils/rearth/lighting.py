@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午12:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : lighting.py
+# @Project : RealEarthStudio
+# @Details : 光照域随机化：按分布配置为每个位姿抽取日光强度、方向、色温与环境光强度（NumPy实现，不依赖 bpy）
+
+
+import math
+
+import numpy as np
+
+# 可随机化的光照参数及取值范围（与标注字段同名）
+LIGHTING_PARAMS = {
+    "sun_energy": (0.0, 1000.0),
+    "sun_azimuth_deg": (-360.0, 720.0),
+    "sun_elevation_deg": (0.0, 90.0),
+    "sun_color_temperature": (1000.0, 40000.0),
+    "world_strength": (0.0, 100.0),
+}
+
+
+def validate_spec(spec):
+    """
+    检查光照分布配置
+    每个参数可取：[最小值, 最大值]（均匀分布）、{"normal": [均值, 标准差], "range": [最小值, 最大值]}（截断正态分布）、
+    {"choice": [取值, ...]}（等概率选取）；"seed" 为随机种子
+    :raises ValueError: 配置无效
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("光照分布配置必须是字典")
+    for name, dist in spec.items():
+        if name == "seed":
+            if not isinstance(dist, int) or dist < 0:
+                raise ValueError("seed 必须是非负整数")
+            continue
+        if name not in LIGHTING_PARAMS:
+            raise ValueError(f"不支持的光照参数: {name}（可选：{', '.join(LIGHTING_PARAMS)}）")
+        low, high = LIGHTING_PARAMS[name]
+        if isinstance(dist, list):
+            values = dist
+            if len(values) != 2 or values[0] > values[1]:
+                raise ValueError(f"{name} 的均匀分布必须为 [最小值, 最大值]")
+        elif isinstance(dist, dict) and "normal" in dist:
+            normal, values = dist["normal"], dist.get("range", [])
+            if not isinstance(normal, list) or len(normal) != 2 or not all(_is_number(v) for v in normal) \
+                    or normal[1] < 0:
+                raise ValueError(f"{name} 的正态分布必须为 {{\"normal\": [均值, 标准差]}}")
+            if not isinstance(values, list) or (values and (len(values) != 2 or values[0] > values[1])):
+                raise ValueError(f"{name} 的截断范围必须为 [最小值, 最大值]")
+        elif isinstance(dist, dict) and "choice" in dist:
+            values = dist["choice"]
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"{name} 的候选值必须为非空列表")
+        else:
+            raise ValueError(f"{name} 的分布必须为 [最小值, 最大值]、{{\"normal\": ...}} 或 {{\"choice\": ...}}")
+        for value in values:
+            if not _is_number(value) or not (low <= value <= high):
+                raise ValueError(f"{name} 的取值必须在 {low} 到 {high} 之间")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def sample_lighting(spec, seed_key):
+    """
+    为单个位姿抽取光照参数（由位姿内容键与配置种子决定，同一位姿每次抽取结果相同）
+    :param spec: 光照分布配置（validate_spec 检查通过）
+    :param seed_key: 位姿内容键（十六进制字符串）
+    :return: {参数名: 取值}，只包含配置中的参数；配置为空时返回 None
+    """
+    names = [name for name in spec if name != "seed"]
+    if not names:
+        return None
+    rng = np.random.default_rng([int(spec.get("seed", 0)), int(seed_key, 16)])
+    draw = {}
+    for name in sorted(names):
+        dist = spec[name]
+        if isinstance(dist, list):
+            value = rng.uniform(dist[0], dist[1])
+        elif "normal" in dist:
+            value = rng.normal(*dist["normal"])
+            low, high = dist.get("range") or LIGHTING_PARAMS[name]
+            value = min(max(value, low), high)
+        else:
+            value = dist["choice"][rng.integers(len(dist["choice"]))]
+        draw[name] = round(float(value), 3)
+    return draw
+
+
+def kelvin_to_rgb(kelvin):
+    """
+    色温转换为线性 RGB（黑体辐射颜色的拟合近似，最大分量归一化为 1）
+    :param kelvin: 色温（K）
+    :return: (r, g, b)
+    """
+    t = kelvin / 100
+    if t <= 66:
+        r = 255.0
+        g = 99.4708025861 * math.log(t) - 161.1195681661
+    else:
+        r = 329.698727446 * (t - 60) ** -0.1332047592
+        g = 288.1221695283 * (t - 60) ** -0.0755148492
+    if t >= 66:
+        b = 255.0
+    elif t <= 19:
+        b = 0.0
+    else:
+        b = 138.5177312231 * math.log(t - 10) - 305.0447927307
+    srgb = [min(max(c / 255, 0.0), 1.0) for c in (r, g, b)]
+    linear = [c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4 for c in srgb]
+    peak = max(linear)
+    return tuple(c / peak for c in linear)
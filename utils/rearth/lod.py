@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午1:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : lod.py
+# @Project : RealEarthStudio
+# @Details : 多级细节（LOD）：生成简化网格并估计几何误差，按相机距离与屏幕空间误差选择 LOD 级别
+
+
+import numpy as np
+
+# 估计简化误差时原始网格顶点的最大采样数
+ERROR_SAMPLES = 5000
+
+# 简化误差取顶点偏差的分位数（忽略个别孤立顶点）
+ERROR_PERCENTILE = 95
+
+
+def build_levels(bpy, obj, lod_ratios, name_prefix):
+    """
+    以 Decimate 修改器生成各级 LOD 网格，并估计各级相对原始网格的几何误差
+    （原始网格采样顶点到简化网格表面的距离分位数，单位与网格坐标一致）
+    :param bpy: bpy 模块
+    :param obj: 网格对象（不含其他修改器）
+    :param lod_ratios: 各级 LOD 的面数比例，比例不小于 1 时复制原始网格
+    :param name_prefix: LOD 网格名称前缀（网格名称为 前缀_LOD级别）
+    :return: (网格列表, [{"level", "ratio", "mesh", "faces", "error"}, ...])
+    """
+    from mathutils.bvhtree import BVHTree
+
+    source = np.empty(len(obj.data.vertices) * 3, dtype=np.float64)
+    obj.data.vertices.foreach_get("co", source)
+    source = source.reshape(-1, 3)
+    if len(source) > ERROR_SAMPLES:
+        source = source[np.random.default_rng(0).choice(len(source), ERROR_SAMPLES, replace=False)]
+
+    meshes, lods = [], []
+    for level, ratio in enumerate(lod_ratios):
+        if ratio >= 1.0:
+            mesh = obj.data.copy()
+            error = 0.0
+        else:
+            modifier = obj.modifiers.new("LOD", 'DECIMATE')
+            modifier.ratio = ratio
+            deps_graph = bpy.context.evaluated_depsgraph_get()
+            mesh = bpy.data.meshes.new_from_object(obj.evaluated_get(deps_graph))
+            obj.modifiers.remove(modifier)
+            error = mesh_error(BVHTree, mesh, source)
+        mesh.name = f"{name_prefix}_LOD{level}"
+        meshes.append(mesh)
+        lods.append({"level": level, "ratio": ratio, "mesh": mesh.name, "faces": len(mesh.polygons),
+                     "error": round(error, 6)})
+    return meshes, lods
+
+
+def mesh_error(bvh_tree, mesh, points):
+    """
+    采样点到网格表面距离的分位数
+    :param bvh_tree: mathutils.bvhtree.BVHTree
+    :param mesh: 简化后的网格
+    :param points: (S, 3) 原始网格采样顶点
+    """
+    if len(mesh.polygons) == 0 or len(points) == 0:
+        return float("inf") if len(points) else 0.0
+    tree = bvh_tree.FromPolygons([v.co for v in mesh.vertices], [p.vertices for p in mesh.polygons])
+    distances = [tree.find_nearest(point)[3] for point in points.tolist()]
+    return float(np.percentile([d for d in distances if d is not None] or [np.inf], ERROR_PERCENTILE))
+
+
+def focal_pixels(tangents, width):
+    """
+    透视相机的焦距（像素），正交相机返回 None
+    :param tangents: visibility.camera_frame_tangents 的返回值
+    :param width: 输出图像宽度（像素）
+    """
+    x_min, x_max, _, _, is_ortho = tangents
+    return None if is_ortho else width / (x_max - x_min)
+
+
+def box_distances(point, box_min, box_max):
+    """
+    点到各轴对齐包围盒的最近距离（点在包围盒内时为 0）
+    :param point: (3,) 相机位置
+    :param box_min: (M, 3) 包围盒最小角点
+    :param box_max: (M, 3) 包围盒最大角点
+    :return: (M,) 数组
+    """
+    offset = np.maximum(np.maximum(box_min - point, point - box_max), 0.0)
+    return np.linalg.norm(offset, axis=1)
+
+
+def select_levels(errors, distances, focal_px, max_pixel_error):
+    """
+    为每个对象选择屏幕空间误差不超过阈值的最粗 LOD 级别
+    （屏幕空间误差 = 几何误差 × 焦距像素 / 相机距离）
+    :param errors: (M, L) 各对象各级 LOD 的几何误差，级别不足 L 的以 inf 填充
+    :param distances: (M,) 相机到各对象的距离
+    :param focal_px: focal_pixels 的返回值，None 时始终使用 LOD0
+    :param max_pixel_error: 屏幕空间误差阈值（像素），不大于 0 时始终使用 LOD0
+    :return: (M,) 整数数组
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    if focal_px is None or max_pixel_error <= 0 or errors.size == 0:
+        return np.zeros(len(errors), dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pixel_error = errors * focal_px / np.maximum(np.asarray(distances, dtype=np.float64), 1e-6)[:, None]
+    acceptable = pixel_error <= max_pixel_error
+    acceptable[:, 0] = True
+    # 各级误差未必单调，取可接受级别中最粗的一级
+    return errors.shape[1] - 1 - np.argmax(acceptable[:, ::-1], axis=1)
+
+
+def error_table(lods_list):
+    """
+    将各对象的 LOD 清单整理为误差矩阵
+    :param lods_list: [[{"error", ...}, ...], ...]
+    :return: (M, L) 数组，级别不足的以 inf 填充
+    """
+    levels = max((len(lods) for lods in lods_list), default=0)
+    table = np.full((len(lods_list), levels), np.inf, dtype=np.float64)
+    for i, lods in enumerate(lods_list):
+        table[i, :len(lods)] = [lod.get("error", np.inf) for lod in lods]
+    return table
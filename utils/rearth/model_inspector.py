@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午1:50
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : model_inspector.py
+# @Project : RealEarthStudio
+# @Details : 模型检查：在独立 Blender 进程中并行导入模型，校验可渲染性并统计三角面数、尺寸、贴图内存、材质数，渲染缩略图
+
+
+import os
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.rearth import target_library
+
+# 各模型类型支持的文件格式
+MODEL_EXTENSIONS = {
+    "target": ("glb", "fbx"),
+    "scene": ("blend", "glb", "fbx"),
+}
+
+# 缩略图边长（像素）
+THUMBNAIL_SIZE = 256
+
+
+def open_model(bpy, model_path, model_type):
+    """
+    在空场景中导入模型（目标模型与渲染时一样整合为一个对象，导入失败时抛出与渲染时相同的错误）
+    :return: 参与统计的网格对象列表
+    """
+    ext = model_path.split('.')[-1].lower()
+    if ext not in MODEL_EXTENSIONS[model_type]:
+        raise ValueError(f"不支持的模型格式: {ext}")
+
+    if ext == "blend":
+        bpy.ops.wm.open_mainfile(filepath=model_path)
+    else:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        if model_type == "target":
+            obj = target_library.import_model(bpy, model_path, "targetModel")
+            return [o for o in [obj] + list(obj.children_recursive) if o.type == 'MESH']
+        if ext == "fbx":
+            bpy.ops.import_scene.fbx(filepath=model_path)
+        else:
+            bpy.ops.import_scene.gltf(filepath=model_path)
+    return [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+
+
+def texture_memory(bpy, materials):
+    """
+    材质引用的贴图解码后的内存（字节，不含 mipmap）
+    """
+    images = set()
+    for material in materials:
+        if material is None or not material.use_nodes:
+            continue
+        for node in material.node_tree.nodes:
+            if node.type == 'TEX_IMAGE' and node.image is not None:
+                images.add(node.image)
+    total = 0
+    for image in images:
+        width, height = image.size
+        total += width * height * image.channels * (4 if image.is_float else 1)
+    return total
+
+
+def render_thumbnail(bpy, bounds_min, bounds_max, thumbnail_path):
+    """
+    以斜上方视角渲染缩略图（相机按包围球取景）
+    """
+    from mathutils import Vector
+
+    scene = bpy.context.scene
+    center = (Vector(bounds_min) + Vector(bounds_max)) / 2
+    radius = max((Vector(bounds_max) - Vector(bounds_min)).length / 2, 1e-3)
+
+    camera_data = bpy.data.cameras.new("thumbnailCamera")
+    camera = bpy.data.objects.new("thumbnailCamera", camera_data)
+    scene.collection.objects.link(camera)
+    distance = radius / math.sin(camera_data.angle / 2) * 1.1
+    direction = Vector((1.0, -1.0, 0.8)).normalized()
+    camera.location = center + direction * distance
+    camera.rotation_euler = (-direction).to_track_quat('-Z', 'Y').to_euler()
+    camera_data.clip_end = distance + radius * 2
+    scene.camera = camera
+
+    sun_data = bpy.data.lights.new("thumbnailSun", 'SUN')
+    sun_data.energy = 3.0
+    sun = bpy.data.objects.new("thumbnailSun", sun_data)
+    sun.rotation_euler = (math.radians(45), 0, math.radians(30))
+    scene.collection.objects.link(sun)
+    if scene.world is None:
+        scene.world = bpy.data.worlds.new("thumbnailWorld")
+
+    scene.render.engine = 'BLENDER_EEVEE'
+    scene.render.resolution_x = scene.render.resolution_y = THUMBNAIL_SIZE
+    scene.render.resolution_percentage = 100
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.filepath = thumbnail_path
+    bpy.ops.render.render(write_still=True)
+
+
+def inspect_model(model_path, model_type="target", thumbnail_path=None):
+    """
+    检查单个模型（需在可导入 bpy 的进程中运行）
+    :param model_path: 模型路径
+    :param model_type: target / scene
+    :param thumbnail_path: 缩略图输出路径，None 表示不渲染缩略图
+    :return: 统计字典 {"triangle_count", "bounds", "texture_memory", "material_count", "thumbnail"}
+    :raises ValueError: 模型没有可渲染的网格
+    """
+    import bpy
+    import numpy as np
+    from mathutils import Vector
+
+    mesh_objects = open_model(bpy, model_path, model_type)
+    deps_graph = bpy.context.evaluated_depsgraph_get()
+    triangle_count, corners, materials = 0, [], set()
+    for obj in mesh_objects:
+        mesh = obj.evaluated_get(deps_graph).data
+        mesh.calc_loop_triangles()
+        triangle_count += len(mesh.loop_triangles)
+        corners.extend(list(obj.matrix_world @ Vector(corner)) for corner in obj.bound_box)
+        materials.update(slot.material for slot in obj.material_slots if slot.material is not None)
+    if triangle_count == 0:
+        raise ValueError("导入的模型中没有有效的可渲染对象！")
+
+    corners = np.array(corners, dtype=np.float64)
+    bounds_min, bounds_max = corners.min(axis=0), corners.max(axis=0)
+    if not np.isfinite(corners).all():
+        raise ValueError("模型包围盒无效（顶点坐标含 NaN/Inf）")
+
+    thumbnail = None
+    if thumbnail_path:
+        try:
+            render_thumbnail(bpy, bounds_min.tolist(), bounds_max.tolist(), thumbnail_path)
+            thumbnail = thumbnail_path
+        except RuntimeError as e:
+            print(f"⚠️ 缩略图渲染失败 {model_path}: {e}")
+
+    return {
+        "triangle_count": triangle_count,
+        "bounds": [round(float(value), 4) for value in bounds_max - bounds_min],
+        "texture_memory": texture_memory(bpy, materials),
+        "material_count": len(materials),
+        "thumbnail": thumbnail,
+    }
+
+
+def inspect_models(model_paths, model_type="target", thumbnail_dir=None, max_workers=4):
+    """
+    并行检查一批模型（每个模型在独立的 Blender 进程中检查，单个模型导致进程崩溃不影响其他模型）
+    :param model_paths: 模型路径列表
+    :param model_type: target / scene
+    :param thumbnail_dir: 缩略图输出目录（文件名为 序号_模型文件名.png），None 表示不渲染缩略图
+    :param max_workers: 并行进程数
+    :return: [(模型路径, 统计字典, 错误信息), ...]，与 model_paths 顺序一致，通过检查时错误信息为 None
+    """
+    def inspect(index, model_path):
+        thumbnail_path = None
+        if thumbnail_dir:
+            thumbnail_path = os.path.join(thumbnail_dir, f"{index:05d}_{os.path.basename(model_path)}.png")
+        try:
+            stats = target_library.run_builder(inspect_model, model_path, model_type, thumbnail_path)
+        except RuntimeError as e:
+            print(f"❌ 模型检查未通过 {model_path}: {e}")
+            return model_path, None, str(e)
+        print(f"✅ 模型检查通过 {model_path} | 三角面数：{stats['triangle_count']}，尺寸：{stats['bounds']}")
+        return model_path, stats, None
+
+    if thumbnail_dir:
+        os.makedirs(thumbnail_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(inspect, range(len(model_paths)), model_paths))
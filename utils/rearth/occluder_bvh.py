@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 上午10:05
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : occluder_bvh.py
+# @Project : RealEarthStudio
+# @Details : 场景遮挡体BVH（NumPy实现，批量线段遮挡查询）
+
+
+import os
+import numpy as np
+
+
+def _expand_bits(v):
+    """将 10 位整数的每一位间隔插入两个 0（用于 Morton 编码）"""
+    v = v.astype(np.uint32)
+    v = (v * np.uint32(0x00010001)) & np.uint32(0xFF0000FF)
+    v = (v * np.uint32(0x00000101)) & np.uint32(0x0F00F00F)
+    v = (v * np.uint32(0x00000011)) & np.uint32(0xC30C30C3)
+    v = (v * np.uint32(0x00000005)) & np.uint32(0x49249249)
+    return v
+
+
+def morton_codes(points):
+    """
+    计算三维点的 30 位 Morton 编码
+    :param points: (N, 3) 数组
+    :return: (N,) uint32 数组
+    """
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.uint32)
+    p_min = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - p_min, 1e-9)
+    grid = np.clip((points - p_min) / extent * 1023.0, 0, 1023).astype(np.uint32)
+    return (_expand_bits(grid[:, 0]) << np.uint32(2)) | (_expand_bits(grid[:, 1]) << np.uint32(1)) | _expand_bits(
+        grid[:, 2])
+
+
+class OccluderBVH:
+    """ 场景遮挡体 BVH """
+
+    LEAF_SIZE = 8
+    TRIANGLE_CHUNK = 1 << 20
+
+    def __init__(self, node_min, node_max, triangles, leaf_size=LEAF_SIZE):
+        """
+        初始化对象（节点按完全二叉树的堆序存储，节点 i 的子节点为 2i+1 与 2i+2）
+        :param node_min: (2L-1, 3) 节点包围盒最小值，空节点为 NaN
+        :param node_max: (2L-1, 3) 节点包围盒最大值，空节点为 NaN
+        :param triangles: (L*leaf_size, 3, 3) 按叶子排序的三角形，填充位为 NaN
+        :param leaf_size: 每个叶子的三角形数量
+        """
+        self.node_min = node_min
+        self.node_max = node_max
+        self.triangles = triangles
+        self.leaf_size = leaf_size
+        self.leaf_count = (len(node_min) + 1) // 2
+        self.depth = int(round(np.log2(self.leaf_count)))
+
+        # 世界坐标到 BVH 局部坐标的变换（场景按控制点旋转时使用）
+        self.world_to_local = None
+
+    @property
+    def triangle_count(self):
+        return int(np.count_nonzero(~np.isnan(self.triangles[:, 0, 0])))
+
+    @classmethod
+    def from_triangles(cls, triangles, leaf_size=LEAF_SIZE):
+        """
+        由世界坐标三角形构建 BVH
+        :param triangles: (M, 3, 3) 三角形顶点
+        :param leaf_size: 每个叶子的三角形数量
+        """
+        triangles = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
+        tri_count = len(triangles)
+
+        # 按质心的 Morton 编码排序，使相邻三角形落入同一叶子
+        order = np.argsort(morton_codes(triangles.mean(axis=1)), kind="stable")
+        triangles = triangles[order]
+
+        # 叶子数量取 2 的幂，构成完全二叉树
+        leaf_count = 1
+        while leaf_count * leaf_size < tri_count:
+            leaf_count *= 2
+
+        padded = np.full((leaf_count * leaf_size, 3, 3), np.nan, dtype=np.float32)
+        padded[:tri_count] = triangles
+
+        # 叶子包围盒（fmin/fmax 忽略 NaN，全空叶子保持 NaN）
+        leaf_points = padded.reshape(leaf_count, leaf_size * 3, 3)
+        with np.errstate(invalid="ignore"):
+            leaf_min = np.fmin.reduce(leaf_points, axis=1)
+            leaf_max = np.fmax.reduce(leaf_points, axis=1)
+
+        node_count = 2 * leaf_count - 1
+        node_min = np.full((node_count, 3), np.nan, dtype=np.float32)
+        node_max = np.full((node_count, 3), np.nan, dtype=np.float32)
+        node_min[leaf_count - 1:] = leaf_min
+        node_max[leaf_count - 1:] = leaf_max
+
+        # 自底向上逐层合并
+        level_start, level_count = leaf_count - 1, leaf_count
+        while level_count > 1:
+            children = slice(level_start, level_start + level_count)
+            parent_start = (level_start - 1) // 2
+            parents = slice(parent_start, parent_start + level_count // 2)
+            node_min[parents] = np.fmin(node_min[children][0::2], node_min[children][1::2])
+            node_max[parents] = np.fmax(node_max[children][0::2], node_max[children][1::2])
+            level_start, level_count = parent_start, level_count // 2
+
+        return cls(node_min, node_max, padded, leaf_size)
+
+    def save(self, path, signature=()):
+        """
+        保存为未压缩的 .npz 文件（先写临时文件再替换，避免中断时留下损坏缓存）
+        :param path: 缓存文件路径
+        :param signature: 源文件签名（如大小与修改时间），用于判断缓存是否失效
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, node_min=self.node_min, node_max=self.node_max, triangles=self.triangles,
+                     leaf_size=np.int64(self.leaf_size), signature=np.asarray(signature, dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature=()):
+        """
+        读取 .npz 缓存文件
+        :param path: 缓存文件路径
+        :param signature: 期望的源文件签名，不一致时返回 None
+        """
+        with np.load(path) as data:
+            if not np.array_equal(data["signature"], np.asarray(signature, dtype=np.int64)):
+                return None
+            return cls(data["node_min"], data["node_max"], data["triangles"], int(data["leaf_size"]))
+
+    def set_matrix_world(self, matrix):
+        """
+        设置 BVH 局部坐标到世界坐标的变换
+        :param matrix: (4, 4) 数组，None 表示单位矩阵
+        """
+        self.world_to_local = None if matrix is None else np.linalg.inv(np.asarray(matrix, dtype=np.float64))
+
+    def _segment_hits_box(self, origins, inv_dirs, t_max, nodes):
+        """批量线段-包围盒相交测试（slab 法）"""
+        with np.errstate(invalid="ignore", over="ignore"):
+            t1 = (self.node_min[nodes] - origins) * inv_dirs
+            t2 = (self.node_max[nodes] - origins) * inv_dirs
+            t_near = np.max(np.minimum(t1, t2), axis=1)
+            t_far = np.min(np.maximum(t1, t2), axis=1)
+            return (t_near <= t_far) & (t_far >= 0) & (t_near <= t_max)
+
+    @staticmethod
+    def _segment_hits_triangle(origins, dirs, t_max, triangles, t_min=1e-7):
+        """批量线段-三角形相交测试（Möller–Trumbore）"""
+        v0 = triangles[:, 0].astype(np.float64)
+        e1 = triangles[:, 1] - v0
+        e2 = triangles[:, 2] - v0
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            p = np.cross(dirs, e2)
+            det = np.einsum("ij,ij->i", e1, p)
+            inv_det = 1.0 / det
+            s = origins - v0
+            u = np.einsum("ij,ij->i", s, p) * inv_det
+            q = np.cross(s, e1)
+            v = np.einsum("ij,ij->i", dirs, q) * inv_det
+            t = np.einsum("ij,ij->i", e2, q) * inv_det
+            return (np.abs(det) > 1e-12) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > t_min) & (t < t_max)
+
+    def segments_occluded(self, origins, ends, end_offset=1e-4):
+        """
+        批量判断线段 origin→end 是否被遮挡
+        :param origins: (3,) 或 (R, 3) 线段起点（如相机位置）
+        :param ends: (R, 3) 线段终点（如目标采样点）
+        :param end_offset: 终点前的忽略距离（米），避免与终点所在表面自相交
+        :return: (R,) bool 数组
+        """
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        origins = np.broadcast_to(np.asarray(origins, dtype=np.float64), ends.shape)
+        if self.world_to_local is not None:
+            rotation, translation = self.world_to_local[:3, :3], self.world_to_local[:3, 3]
+            ends = ends @ rotation.T + translation
+            origins = origins @ rotation.T + translation
+        ray_count = len(ends)
+        occluded = np.zeros(ray_count, dtype=bool)
+        if ray_count == 0:
+            return occluded
+
+        # 以参数 t∈(0, t_max) 表示线段，方向向量不做归一化
+        dirs = ends - origins
+        lengths = np.linalg.norm(dirs, axis=1)
+        with np.errstate(divide="ignore"):
+            t_max = np.where(lengths > 0, 1.0 - end_offset / lengths, 0.0)
+            inv_dirs = 1.0 / dirs
+
+        # 波前式遍历：所有 (线段, 节点) 对同时下降一层
+        rays = np.arange(ray_count)
+        nodes = np.zeros(ray_count, dtype=np.int64)
+        for _ in range(self.depth):
+            hit = self._segment_hits_box(origins[rays], inv_dirs[rays], t_max[rays], nodes)
+            rays, nodes = rays[hit], nodes[hit]
+            if len(rays) == 0:
+                return occluded
+            rays = np.repeat(rays, 2)
+            nodes = np.repeat(2 * nodes + 1, 2) + np.tile([0, 1], len(nodes))
+
+        hit = self._segment_hits_box(origins[rays], inv_dirs[rays], t_max[rays], nodes)
+        rays, leaves = rays[hit], nodes[hit] - (self.leaf_count - 1)
+
+        # 叶子内三角形测试（分块，限制内存）
+        leaf_chunk = max(1, self.TRIANGLE_CHUNK // self.leaf_size)
+        offsets = np.arange(self.leaf_size)
+        for start in range(0, len(rays), leaf_chunk):
+            chunk_rays = rays[start:start + leaf_chunk]
+            keep = ~occluded[chunk_rays]
+            chunk_rays = chunk_rays[keep]
+            if len(chunk_rays) == 0:
+                continue
+            chunk_leaves = leaves[start:start + leaf_chunk][keep]
+            tri_index = (chunk_leaves[:, None] * self.leaf_size + offsets).ravel()
+            pair_rays = np.repeat(chunk_rays, self.leaf_size)
+            hits = self._segment_hits_triangle(origins[pair_rays], dirs[pair_rays], t_max[pair_rays],
+                                               self.triangles[tri_index])
+            occluded[pair_rays[hits]] = True
+
+        return occluded
+
+
+class OccluderGroup:
+    """ 多个遮挡体的组合（如场景与同帧的其他目标），任一遮挡体遮挡即视为遮挡 """
+
+    def __init__(self, occluders):
+        self.occluders = [occluder for occluder in occluders if occluder is not None]
+
+    def segments_occluded(self, origins, ends, end_offset=1e-4):
+        ends = np.asarray(ends, dtype=np.float64).reshape(-1, 3)
+        occluded = np.zeros(len(ends), dtype=bool)
+        for occluder in self.occluders:
+            remaining = np.flatnonzero(~occluded)
+            if len(remaining) == 0:
+                break
+            batch_origins = np.broadcast_to(np.asarray(origins, dtype=np.float64), ends.shape)[remaining]
+            occluded[remaining] = occluder.segments_occluded(batch_origins, ends[remaining], end_offset)
+        return occluded
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 上午11:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : pose_planner.py
+# @Project : RealEarthStudio
+# @Details : 相机位姿预筛选（渲染前批量剔除画面外、过小及被遮挡的位姿）
+
+
+import numpy as np
+
+from utils.rearth.visibility import camera_to_ndc, ndc_bbox
+
+# 位姿状态
+POSE_ACCEPTED = 0
+POSE_OUT_OF_FRAME = 1
+POSE_TOO_SMALL = 2
+POSE_OCCLUDED = 3
+
+POSE_STATUS_NAMES = {
+    POSE_ACCEPTED: "可渲染",
+    POSE_OUT_OF_FRAME: "目标不在画面内",
+    POSE_TOO_SMALL: "目标过小",
+    POSE_OCCLUDED: "遮挡比例过高",
+}
+
+MAX_RAYS_PER_BATCH = 1 << 20
+
+
+def azimuth_angles(rotation_step_deg):
+    """
+    计算环绕角度
+    :param rotation_step_deg: 摄像机环绕拍摄时的角度间隔
+    """
+    angles = []
+    current = 0
+    while current < 360:
+        angles.append(current)
+        current += rotation_step_deg
+    return sorted(set(angles))
+
+
+def pose_grid(distance_list, elevation_deg_list, rotation_step_deg):
+    """
+    生成 距离 × 高低角 × 方位角 的位姿网格
+    :return: (N, 3) 数组，每行为 (distance, elevation_deg, azimuth_deg)
+    """
+    poses = [(distance, 89 if elevation_deg >= 90 else elevation_deg, azimuth_deg)
+             for distance in distance_list
+             for elevation_deg in elevation_deg_list
+             for azimuth_deg in azimuth_angles(rotation_step_deg)]
+    return np.array(poses, dtype=np.float64).reshape(-1, 3)
+
+
+def look_at_points(poses):
+    """
+    位姿的观察点（(N, 6) 位姿数组的后 3 列；(N, 3) 位姿数组观察点为原点）
+    :return: (N, 3) 数组
+    """
+    if poses.shape[1] >= 6:
+        return poses[:, 3:6]
+    return np.zeros((len(poses), 3), dtype=np.float64)
+
+
+def pose_look_at(pose):
+    """
+    单个位姿的观察点偏移，位于原点时返回 None（内容键与标注保持与无偏移时一致）
+    :param pose: 位姿数组的一行
+    """
+    look_at = [float(value) for value in pose[3:6]]
+    return tuple(look_at) if any(look_at) else None
+
+
+def camera_positions(poses):
+    """
+    由位姿计算相机位置（相机绕观察点环绕，目标位于原点）
+    :param poses: (N, 3) 数组 (distance, elevation_deg, azimuth_deg)，或附加观察点的 (N, 6) 数组
+    """
+    distance = poses[:, 0]
+    elev = np.radians(poses[:, 1])
+    azim = np.radians(poses[:, 2])
+    return np.stack([distance * np.cos(elev) * np.sin(azim),
+                     distance * np.cos(elev) * np.cos(azim),
+                     distance * np.sin(elev)], axis=1) + look_at_points(poses)
+
+
+def look_at_rotations(positions, look_at=(0, 0, 0)):
+    """
+    计算相机朝向（-Z 指向目标、Y 轴朝上，与 to_track_quat('-Z', 'Y') 一致）
+    :param look_at: 观察点，(3,) 或 (N, 3)
+    :return: (N, 3, 3) 旋转矩阵，列向量为相机 X/Y/Z 轴的世界坐标
+    """
+    back = positions - np.asarray(look_at, dtype=np.float64)
+    back /= np.linalg.norm(back, axis=1, keepdims=True)
+    right = np.cross([0.0, 0.0, 1.0], back)
+    right /= np.linalg.norm(right, axis=1, keepdims=True)
+    up = np.cross(back, right)
+    return np.stack([right, up, back], axis=2)
+
+
+def bounding_box_corners(vertices):
+    """
+    计算顶点集的 8 个包围盒角点
+    """
+    v_min, v_max = vertices.min(axis=0), vertices.max(axis=0)
+    return np.array([[x, y, z] for x in (v_min[0], v_max[0])
+                     for y in (v_min[1], v_max[1])
+                     for z in (v_min[2], v_max[2])], dtype=np.float64)
+
+
+def project(points, positions, rotations, tangents):
+    """
+    将世界坐标点投影到每个位姿的相机归一化坐标
+    :param points: (S, 3) 世界坐标
+    :param positions: (N, 3) 相机位置
+    :param rotations: (N, 3, 3) 相机旋转
+    :param tangents: visibility.camera_frame_tangents 的返回值
+    :return: (N, S, 3) 数组
+    """
+    local = np.einsum("nji,nsj->nsi", rotations, points[None, :, :] - positions[:, None, :])
+    return camera_to_ndc(local, tangents)
+
+
+def plan_poses(poses, samples, occluder, tangents, resolution, occlusion_threshold=0.6, min_bbox_pixels=8):
+    """
+    批量评估位姿：包围盒不在画面内、投影过小或遮挡比例过高的位姿直接剔除
+    :param poses: (N, 3) 位姿数组，或附加观察点的 (N, 6) 数组
+    :param samples: (S, 3) 目标采样点（世界坐标）
+    :param occluder: 场景遮挡体 OccluderBVH，None 表示跳过遮挡检查（渲染后由实例掩膜计算遮挡与标注框）
+    :param tangents: visibility.camera_frame_tangents 的返回值
+    :param resolution: (宽, 高) 输出像素尺寸
+    :param occlusion_threshold: 遮挡比例阈值
+    :param min_bbox_pixels: 标注框最小边长（像素）
+    :return: dict(status, occlusion, bbox)，bbox 为 (N, 4) 数组 (cx, cy, w, h)，无效时为 NaN
+    """
+    pose_count = len(poses)
+    status = np.full(pose_count, POSE_ACCEPTED, dtype=np.int8)
+    occlusion = np.ones(pose_count, dtype=np.float64)
+    bbox = np.full((pose_count, 4), np.nan, dtype=np.float64)
+    if pose_count == 0 or len(samples) == 0:
+        status[:] = POSE_OUT_OF_FRAME
+        return {"status": status, "occlusion": occlusion, "bbox": bbox}
+
+    positions = camera_positions(poses)
+    rotations = look_at_rotations(positions, look_at_points(poses))
+    width, height = resolution
+
+    # 1. 包围盒画面检查
+    corners = project(bounding_box_corners(samples), positions, rotations, tangents)
+    in_front = corners[:, :, 2] > 0
+    with np.errstate(invalid="ignore"):
+        x_min = np.where(in_front, corners[:, :, 0], np.inf).min(axis=1)
+        x_max = np.where(in_front, corners[:, :, 0], -np.inf).max(axis=1)
+        y_min = np.where(in_front, corners[:, :, 1], np.inf).min(axis=1)
+        y_max = np.where(in_front, corners[:, :, 1], -np.inf).max(axis=1)
+    out_of_frame = ~in_front.any(axis=1) | (x_max < 0) | (x_min > 1) | (y_max < 0) | (y_min > 1)
+    status[out_of_frame] = POSE_OUT_OF_FRAME
+
+    # 2. 投影尺寸检查（包围盒裁剪到画面后的像素尺寸）
+    clipped_w = (np.clip(x_max, 0, 1) - np.clip(x_min, 0, 1)) * width
+    clipped_h = (np.clip(y_max, 0, 1) - np.clip(y_min, 0, 1)) * height
+    too_small = ~out_of_frame & ((clipped_w < min_bbox_pixels) | (clipped_h < min_bbox_pixels))
+    status[too_small] = POSE_TOO_SMALL
+
+    # 跳过遮挡检查时以裁剪到画面内的包围盒投影作为标注框
+    if occluder is None:
+        accepted = status == POSE_ACCEPTED
+        x_min, x_max = np.clip(x_min, 0, 1), np.clip(x_max, 0, 1)
+        y_min, y_max = np.clip(y_min, 0, 1), np.clip(y_max, 0, 1)
+        bbox[accepted] = np.stack([(x_min + x_max) / 2, 1 - (y_min + y_max) / 2,
+                                   x_max - x_min, y_max - y_min], axis=1)[accepted]
+        occlusion[accepted] = 0.0
+        return {"status": status, "occlusion": occlusion, "bbox": bbox}
+
+    # 3. 采样点遮挡检查（仅对通过前两步的位姿，按批发射射线）
+    candidates = np.flatnonzero(status == POSE_ACCEPTED)
+    batch_size = max(1, MAX_RAYS_PER_BATCH // len(samples))
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        origins = np.repeat(positions[batch], len(samples), axis=0)
+        ends = np.tile(samples, (len(batch), 1))
+        occluded = occluder.segments_occluded(origins, ends).reshape(len(batch), len(samples))
+        occlusion[batch] = occluded.mean(axis=1)
+
+        co_2d = project(samples, positions[batch], rotations[batch], tangents)
+        visible = ~occluded & (co_2d[:, :, 0] >= 0) & (co_2d[:, :, 0] <= 1) & \
+                  (co_2d[:, :, 1] >= 0) & (co_2d[:, :, 1] <= 1) & (co_2d[:, :, 2] > 0)
+        for row, pose_index in enumerate(batch):
+            pose_bbox = ndc_bbox(co_2d[row, visible[row], :2])
+            if pose_bbox is None:
+                status[pose_index] = POSE_OCCLUDED if occlusion[pose_index] > 0 else POSE_OUT_OF_FRAME
+                continue
+            bbox[pose_index] = pose_bbox
+
+    status[(status == POSE_ACCEPTED) & (occlusion > occlusion_threshold)] = POSE_OCCLUDED
+    return {"status": status, "occlusion": occlusion, "bbox": bbox}
+
+
+def summarize(status):
+    """
+    统计各状态的位姿数量
+    """
+    return {name: int(np.count_nonzero(status == code)) for code, name in POSE_STATUS_NAMES.items()}
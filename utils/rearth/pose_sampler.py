@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午11:50
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : pose_sampler.py
+# @Project : RealEarthStudio
+# @Details : 相机位姿采样：网格、均匀随机、分层随机与低差异序列（Sobol/Halton），可选观察点抖动（NumPy实现，不依赖 bpy）
+
+
+import zlib
+
+import numpy as np
+
+from utils.rearth.pose_planner import pose_grid
+
+STRATEGIES = ("grid", "random", "stratified", "sobol", "halton")
+
+# 随机采样时生成的候选位姿数量为图像预算的倍数（预筛选与渲染时剔除的位姿由后续候选补足，按序列顺序保存 budget 张）
+CANDIDATE_FACTOR = 4
+
+# Sobol 序列方向数（Joe-Kuo new-joe-kuo-6.21201，前 6 维；第 1 维为 van der Corput 序列）
+SOBOL_DIRECTIONS = [
+    (0, 0, []),
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+]
+SOBOL_BITS = 32
+
+HALTON_PRIMES = (2, 3, 5, 7, 11, 13)
+
+
+def _sobol_vectors(dim):
+    """第 dim 维的方向向量（左对齐到 SOBOL_BITS 位）"""
+    if dim == 0:
+        return [1 << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+    s, a, m = SOBOL_DIRECTIONS[dim]
+    m = list(m)
+    for i in range(s, SOBOL_BITS):
+        value = m[i - s] ^ (m[i - s] << s)
+        for k in range(1, s):
+            value ^= ((a >> (s - 1 - k)) & 1) * (m[i - k] << k)
+        m.append(value)
+    return [m[i] << (SOBOL_BITS - 1 - i) for i in range(SOBOL_BITS)]
+
+
+def sobol(count, dims, rng=None):
+    """
+    Sobol 低差异序列（格雷码构造，跳过首个零点；给定 rng 时施加随机数字平移以便按种子复现不同序列）
+    :param count: 点数
+    :param dims: 维数（不超过 6）
+    :param rng: numpy.random.Generator，None 表示不平移
+    :return: (count, dims) 数组，取值 [0, 1)
+    """
+    if dims > len(SOBOL_DIRECTIONS):
+        raise ValueError(f"Sobol 序列最多支持 {len(SOBOL_DIRECTIONS)} 维")
+    index = np.arange(1, count + 1, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    points = np.zeros((count, dims), dtype=np.uint64)
+    for dim in range(dims):
+        for bit, vector in enumerate(_sobol_vectors(dim)):
+            points[:, dim] ^= np.where((gray >> np.uint64(bit)) & np.uint64(1), np.uint64(vector), np.uint64(0))
+    if rng is not None:
+        points ^= rng.integers(0, 1 << SOBOL_BITS, size=dims, dtype=np.uint64)
+    return points.astype(np.float64) / float(1 << SOBOL_BITS)
+
+
+def halton(count, dims, rng=None):
+    """
+    Halton 低差异序列（各维以前 dims 个素数为基的逆序数；给定 rng 时施加 Cranley-Patterson 随机平移）
+    :param count: 点数
+    :param dims: 维数（不超过 6）
+    :param rng: numpy.random.Generator，None 表示不平移
+    :return: (count, dims) 数组，取值 [0, 1)
+    """
+    if dims > len(HALTON_PRIMES):
+        raise ValueError(f"Halton 序列最多支持 {len(HALTON_PRIMES)} 维")
+    points = np.zeros((count, dims), dtype=np.float64)
+    for dim, base in enumerate(HALTON_PRIMES[:dims]):
+        index = np.arange(1, count + 1, dtype=np.int64)
+        scale = 1.0
+        while index.any():
+            scale /= base
+            index, digit = np.divmod(index, base)
+            points[:, dim] += digit * scale
+    if rng is not None:
+        points = (points + rng.random(dims)) % 1.0
+    return points
+
+
+def stratified(count, dims, rng):
+    """
+    分层随机采样：将单位立方体等分为 m^dims 个格子（m^dims ≥ count），按随机平移 Halton 序列首次落入的顺序选取
+    count 个格子并在格内随机取点（预筛选后按顺序截取前 budget 个时，任意前缀仍均匀覆盖采样范围）
+    :return: (count, dims) 数组，取值 [0, 1)
+    """
+    cells_per_dim = max(1, int(np.ceil(count ** (1 / dims) - 1e-9)))
+    total = cells_per_dim ** dims
+    shift = rng.random(dims)
+    order, visited = [], np.zeros(total, dtype=bool)
+    chunk = max(count, 64)
+    for start in range(0, 8 * total, chunk):
+        points = (halton(start + chunk, dims)[start:] + shift) % 1.0
+        index = np.minimum((points * cells_per_dim).astype(np.int64), cells_per_dim - 1)
+        for cell in np.ravel_multi_index(tuple(index.T), (cells_per_dim,) * dims):
+            if not visited[cell]:
+                visited[cell] = True
+                order.append(cell)
+        if len(order) >= count:
+            break
+    # 极少数未被序列访问到的格子按随机顺序补足
+    order.extend(rng.permutation(np.flatnonzero(~visited)))
+    cells = np.asarray(order[:count], dtype=np.int64)
+    index = np.stack(np.unravel_index(cells, (cells_per_dim,) * dims), axis=1)
+    return (index + rng.random((count, dims))) / cells_per_dim
+
+
+def unit_samples(strategy, count, dims, rng):
+    """
+    按采样策略生成单位立方体内的采样点
+    :param strategy: random / stratified / sobol / halton
+    :return: (count, dims) 数组，取值 [0, 1)
+    """
+    if strategy == "random":
+        return rng.random((count, dims))
+    if strategy == "stratified":
+        return stratified(count, dims, rng)
+    if strategy == "sobol":
+        return sobol(count, dims, rng)
+    if strategy == "halton":
+        return halton(count, dims, rng)
+    raise ValueError(f"不支持的位姿采样策略: {strategy}")
+
+
+def sample_poses(strategy, count, distance_range, elevation_range, rng):
+    """
+    在 距离 × 高低角 × 方位角 范围内采样位姿（高低角按球面面积均匀分布，即 sin(高低角) 均匀）
+    :param strategy: random / stratified / sobol / halton
+    :param count: 位姿数量
+    :param distance_range: (最小距离, 最大距离)
+    :param elevation_range: (最小高低角, 最大高低角)，单位为度
+    :param rng: numpy.random.Generator
+    :return: (count, 3) 数组，每行为 (distance, elevation_deg, azimuth_deg)
+    """
+    u = unit_samples(strategy, count, 3, rng)
+    d_min, d_max = distance_range
+    sin_min, sin_max = np.sin(np.radians(np.clip(elevation_range, 0, 89)))
+    distance = d_min + u[:, 0] * (d_max - d_min)
+    elevation_deg = np.degrees(np.arcsin(sin_min + u[:, 1] * (sin_max - sin_min)))
+    azimuth_deg = u[:, 2] * 360.0
+    return np.round(np.stack([distance, elevation_deg, azimuth_deg], axis=1), 3)
+
+
+def jitter_look_at(poses, radius, rng):
+    """
+    为位姿附加观察点偏移（球内均匀分布，相机绕偏移后的观察点环绕）
+    :param poses: (N, 3) 位姿数组
+    :param radius: 偏移半径（米），0 表示不偏移
+    :return: (N, 6) 数组，每行为 (distance, elevation_deg, azimuth_deg, look_x, look_y, look_z)
+    """
+    offsets = np.zeros((len(poses), 3), dtype=np.float64)
+    if radius > 0 and len(poses):
+        direction = rng.normal(size=(len(poses), 3))
+        direction /= np.linalg.norm(direction, axis=1, keepdims=True)
+        offsets = np.round(direction * radius * np.cbrt(rng.random((len(poses), 1))), 3)
+    return np.concatenate([poses[:, :3], offsets], axis=1)
+
+
+def candidate_poses(sampler, distance_list, elevation_deg_list, rotation_step_deg, salt=""):
+    """
+    按任务的位姿采样配置生成候选位姿
+    :param sampler: {"strategy", "budget", "seed", "look_at_jitter"}，None 表示网格采样
+    :param distance_list: 相机距离列表（随机采样时取其最小值与最大值作为范围）
+    :param elevation_deg_list: 相机高低角列表（随机采样时取其最小值与最大值作为范围）
+    :param rotation_step_deg: 相机方位角间隔（仅网格采样使用）
+    :param salt: 随机种子附加值（如目标名称，使不同目标的采样位姿不同）
+    :return: (poses, budget)，poses 为 (N, 6) 数组；budget 为每个目标的图像数量上限，0 表示不限制；
+             距离或高低角列表为空、随机采样数量为 0 时返回空位姿
+    """
+    sampler = sampler or {}
+    strategy = sampler.get("strategy", "grid")
+    seed = int(sampler.get("seed", 0))
+    rng = np.random.default_rng([seed, zlib.crc32(salt.encode("utf-8"))])
+
+    if strategy == "grid":
+        poses, budget = pose_grid(distance_list, elevation_deg_list, rotation_step_deg), 0
+    else:
+        budget = int(sampler.get("budget", 0))
+        if not distance_list or not elevation_deg_list or budget <= 0:
+            return np.zeros((0, 6), dtype=np.float64), budget
+        poses = sample_poses(strategy, budget * CANDIDATE_FACTOR,
+                             (min(distance_list), max(distance_list)),
+                             (min(elevation_deg_list), max(elevation_deg_list)), rng)
+    return jitter_look_at(poses, float(sampler.get("look_at_jitter", 0)), rng), budget
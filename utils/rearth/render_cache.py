@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午9:30
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_cache.py
+# @Project : RealEarthStudio
+# @Details : 全局渲染缓存：按内容键保存渲染图像及标注，不同渲染任务中相同的图像以硬链接复用，按容量 LRU 淘汰
+
+
+import os
+import json
+import shutil
+
+from utils.rearth.render_checkpoint import is_valid_image
+
+
+def link_or_copy(src, dst):
+    """
+    以硬链接方式放置文件（跨文件系统等无法链接时复制），目标已存在时替换
+    """
+    tmp_path = dst + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class RenderCache:
+    """ 全局渲染缓存（缓存目录/键前两位/键.扩展名 + 键.json 标注） """
+
+    def __init__(self, cache_dir, max_bytes=0):
+        """
+        初始化对象
+        :param cache_dir: 缓存目录
+        :param max_bytes: 缓存独占的磁盘容量上限（字节，不含与数据集图像共用的硬链接），0 表示不限制
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.stores = 0
+
+    def _paths(self, key, extension):
+        entry_dir = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(entry_dir, key + extension), os.path.join(entry_dir, key + ".json")
+
+    def fetch(self, key, image_path):
+        """
+        缓存命中时将图像链接到 image_path，并刷新其最近使用时间
+        :param key: 缓存键
+        :param image_path: 数据集中的图像路径
+        :return: 缓存的标注信息，未命中时返回 None
+        """
+        cached_image, cached_annotation = self._paths(key, os.path.splitext(image_path)[1])
+        try:
+            with open(cached_annotation, 'r', encoding="utf-8") as f:
+                annotation = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not is_valid_image(cached_image):
+            return None
+
+        try:
+            link_or_copy(cached_image, image_path)
+            os.utime(cached_image)
+            os.utime(cached_annotation)
+        except OSError as e:
+            # 并发淘汰等情况下视为未命中
+            print(f"⚠️ 渲染缓存读取失败: {e}")
+            return None
+        self.hits += 1
+        return annotation
+
+    def store(self, key, image_path, annotation):
+        """
+        将已落盘的图像及其标注加入缓存（图像以硬链接保存，不额外占用空间）
+        :param key: 缓存键
+        :param image_path: 数据集中的图像路径
+        :param annotation: 标注信息（可 JSON 序列化）
+        """
+        cached_image, cached_annotation = self._paths(key, os.path.splitext(image_path)[1])
+        try:
+            os.makedirs(os.path.dirname(cached_image), exist_ok=True)
+            link_or_copy(image_path, cached_image)
+            tmp_path = cached_annotation + ".tmp"
+            with open(tmp_path, 'w', encoding="utf-8") as f:
+                json.dump(annotation, f, ensure_ascii=False)
+            os.replace(tmp_path, cached_annotation)
+        except OSError as e:
+            print(f"⚠️ 渲染缓存写入失败: {e}")
+            return
+        self.stores += 1
+
+    def evict(self):
+        """
+        按最近使用时间淘汰缓存条目，直至缓存独占的容量不超过上限
+        （仍与数据集图像共用硬链接的文件删除后不释放磁盘空间，不计入容量，其条目也不淘汰）
+        :return: 淘汰的条目数
+        """
+        if not self.max_bytes or not os.path.isdir(self.cache_dir):
+            return 0
+
+        entries = {}
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = os.path.join(root, name.split(".", 1)[0])
+                size, mtime, paths, shared = entries.get(key, (0, 0.0, [], False))
+                entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime), paths + [path],
+                                shared or stat.st_nlink > 1)
+
+        entries = {key: entry for key, entry in entries.items() if not entry[3]}
+        total = sum(entry[0] for entry in entries.values())
+        evicted = 0
+        for _, (size, _, paths, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+        if evicted:
+            print(f"🧹 渲染缓存淘汰 {evicted} 个条目 | 剩余 {total / 1024 ** 3:.2f} GB")
+        return evicted
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午4:40
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_checkpoint.py
+# @Project : RealEarthStudio
+# @Details : 逐图像断点续渲：校验已完成的图像与标注记录，重启后跳过已完成的图像（按内容键）
+
+
+import os
+
+from utils.rearth.annotation_writer import read_records, rewrite_records
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+
+def is_valid_png(path):
+    """
+    校验 PNG 文件完整性（文件头签名与末尾 IEND 块）
+    """
+    try:
+        size = os.path.getsize(path)
+        if size < len(PNG_SIGNATURE) + len(PNG_IEND):
+            return False
+        with open(path, "rb") as f:
+            if f.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+                return False
+            f.seek(-len(PNG_IEND), os.SEEK_END)
+            return f.read() == PNG_IEND
+    except OSError:
+        return False
+
+
+def is_valid_jpeg(path):
+    """
+    校验 JPEG 文件完整性（SOI 与 EOI 标记）
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return False
+            f.seek(-2, os.SEEK_END)
+            return f.read() == b"\xff\xd9"
+    except OSError:
+        return False
+
+
+def is_valid_webp(path):
+    """
+    校验 WebP 文件完整性（RIFF 头中记录的长度与文件长度一致）
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(12)
+        return (len(header) == 12 and header[:4] == b"RIFF" and header[8:] == b"WEBP" and
+                int.from_bytes(header[4:8], "little") + 8 == os.path.getsize(path))
+    except OSError:
+        return False
+
+
+def is_valid_image(path):
+    """
+    校验图像文件完整性（按扩展名选择校验方式，EXR 仅检查文件头）
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".png":
+        return is_valid_png(path)
+    if ext in (".jpg", ".jpeg"):
+        return is_valid_jpeg(path)
+    if ext == ".webp":
+        return is_valid_webp(path)
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == b"\x76\x2f\x31\x01" if ext == ".exr" else len(f.read(1)) == 1
+    except OSError:
+        return False
+
+
+def fsync_file(path):
+    """
+    将文件内容刷入磁盘（不支持时忽略）
+    """
+    try:
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+    except OSError:
+        pass
+
+
+def load_checkpoint(annotations_file):
+    """
+    读取标注记录中已完成的图像与已剔除的位姿，并重写记录文件，只保留图像完整的记录与剔除记录
+    （图像已写出但记录未写入的图像视为未完成，会被重新渲染覆盖）
+    :param annotations_file: 标注记录文件（JSON Lines）
+    :return: (已完成图像 {render_key: filename}, 已剔除位姿 {render_key: 剔除时的筛选阈值})
+    """
+    completed, rejected = {}, {}
+    if not os.path.exists(annotations_file):
+        return completed, rejected
+
+    output_dir = os.path.dirname(annotations_file)
+    records = read_records(annotations_file)
+    valid_records = []
+    for record in records:
+        filename, key = record.get("filename"), record.get("render_key")
+        if not key:
+            continue
+        if record.get("rejected"):
+            # 剔除记录没有图像
+            rejected[key] = record.get("thresholds")
+        elif not filename or not is_valid_image(os.path.join(output_dir, filename)):
+            continue
+        else:
+            completed[key] = filename
+        valid_records.append(record)
+
+    # 丢弃图像缺失或损坏的记录（对应图像将重新渲染）
+    if len(valid_records) != len(records):
+        rewrite_records(annotations_file, valid_records)
+        print(f"⚠️ 丢弃 {len(records) - len(valid_records)} 条无效标注记录: {annotations_file}")
+
+    return completed, rejected
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午1:30
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_farm.py
+# @Project : RealEarthStudio
+# @Details : 多进程渲染：按 (场景, 目标) 拆分渲染任务并分发到常驻 Blender 进程
+
+
+from utils.rearth import render_worker, annotation_writer, render_keys, pose_planner, pose_sampler, scene_textures
+
+FRAGMENT_PATTERN = "metadata_*.jsonl"
+
+
+def build_work_units(config, scene_model_list, target_model_list):
+    """
+    将渲染任务拆分为 (场景, 目标) 工作单元（多目标同帧渲染时为 (场景, 目标组)）
+    :param config: 公共渲染配置（与 SceneRenderer.main 的配置一致）
+    :param scene_model_list: 场景模型列表
+    :param target_model_list: 目标模型列表
+    :return: 工作单元配置列表，每个单元使用独立的标注分片（分片名由场景与目标决定，增删模型后保持不变）；
+             启用贴图降采样时在此为每个场景选定贴图版本，渲染进程与内容键使用同一结果
+    """
+    targets_per_frame = config.get("targets_per_frame", 1)
+    units = []
+    for scene_model in scene_model_list:
+        texture_size = scene_textures.task_texture_size(dict(config, scene_model=scene_model))
+        for target_group in render_keys.target_groups(target_model_list, targets_per_frame):
+            if targets_per_frame > 1:
+                unit_name = render_keys.unit_key(scene_model, target_group)
+            else:
+                unit_name = render_keys.unit_key(scene_model, target_group[0])
+            unit = dict(config)
+            unit.update({
+                "unit_name": unit_name,
+                "scene_model": scene_model,
+                "target_model_list": target_group,
+                "index": 0,
+                "image_prefix": "image",
+                "annotations_name": f"metadata_{unit_name}.jsonl",
+                "texture_size": texture_size,
+            })
+            units.append(unit)
+    return units
+
+
+def run_work_units(units, max_workers=1, on_unit_done=None, memory_budget_mb=0):
+    """
+    使用常驻渲染进程池执行工作单元（同一场景的单元复用已导入场景的进程）
+    :param units: build_work_units 的返回值
+    :param max_workers: 并行进程数
+    :param on_unit_done: 单元完成回调 on_unit_done(done_count, total_count, unit_name, image_count)
+    :param memory_budget_mb: 常驻进程内存预算（MB），0 表示不限制
+    :return: 渲染图像总数
+    """
+    pool = render_worker.get_pool(max_workers, memory_budget_mb)
+    image_count, errors = pool.run(units, on_unit_done)
+    if errors:
+        raise RuntimeError(f"{len(errors)} 个工作单元渲染失败: " + "; ".join(errors))
+    return image_count
+
+
+def merge_annotation_fragments(dataset_dir):
+    """
+    合并各工作单元的标注分片（JSON Lines）为 metadata.json
+    :param dataset_dir: 数据集目录
+    :return: 合并后的标注条目数
+    """
+    return annotation_writer.compact(dataset_dir, FRAGMENT_PATTERN)
+
+
+def expected_keys(units):
+    """
+    当前任务参数下全部位姿的内容键（与 SceneRenderer.render_key 一致，含预筛选时会被剔除的位姿）
+    :param units: build_work_units 的返回值
+    """
+    keys = set()
+    for unit in units:
+        targets_per_frame = unit.get("targets_per_frame", 1)
+        for target_group in render_keys.target_groups(unit["target_model_list"], targets_per_frame):
+            target_path = [model["path"] for model in target_group]
+            poses, _ = pose_sampler.candidate_poses(unit.get("pose_sampler"), unit["camera_distances"],
+                                                    unit["camera_elevations"], unit["camera_rotation_step_deg"],
+                                                    render_keys.pose_salt(target_path))
+            if targets_per_frame <= 1:
+                target_path = target_path[0]
+            params = render_keys.render_params(unit["scene_model"]["path"], unit["scene_model"]["points"],
+                                               target_path, unit["sun_azimuth_deg"],
+                                               unit["sun_elevation_deg"], unit["resolution"], unit["renderer"],
+                                               unit.get("image_format", "PNG"), unit.get("image_compression", 15),
+                                               unit.get("image_quality", 90), unit.get("annotation_mode", "raycast"),
+                                               unit.get("lod_pixel_error", 0), unit.get("texture_size"),
+                                               render_keys.write_view_transform(unit.get("image_write_mode"),
+                                                                                unit.get("image_format", "PNG"),
+                                                                                unit.get("annotation_mode", "raycast")))
+            keys.update(render_keys.lit_render_key(params, unit.get("lighting_spec"), *pose[:3],
+                                                   pose_planner.pose_look_at(pose))[0]
+                        for pose in poses.tolist())
+    return keys
+
+
+def prune_dataset(dataset_dir, units):
+    """
+    增量失效：删除当前任务参数下不再需要的图像与标注，保留的图像在渲染时跳过
+    :param dataset_dir: 数据集目录
+    :param units: build_work_units 的返回值
+    :return: 删除的图像数量
+    """
+    return render_keys.prune_dataset(dataset_dir, expected_keys(units), FRAGMENT_PATTERN)
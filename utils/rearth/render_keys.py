@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午8:50
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_keys.py
+# @Project : RealEarthStudio
+# @Details : 渲染内容键：按影响图像内容的参数计算哈希，用于图像命名、断点续渲与增量失效
+
+
+import os
+import glob
+import json
+import hashlib
+from pathlib import Path
+
+from utils.rearth import lighting
+from utils.rearth.annotation_writer import read_records, rewrite_records, ANNOTATIONS_FILE
+
+KEY_LENGTH = 16
+DEFAULT_POINTS = [[0, 0, 0], [0, 1, 0]]
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.webp", "*.exr", "*.tmp")
+
+# 异步写出时固定使用的视图变换（Viewer 节点像素为线性颜色，编码时手动施加 sRGB 转换）
+ASYNC_VIEW_TRANSFORM = "Standard"
+
+
+def digest(params, length=KEY_LENGTH):
+    """
+    计算参数字典的哈希（键排序后的 JSON）
+    """
+    text = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:length]
+
+
+def file_digest(path, chunk_size=8 * 1024 * 1024):
+    """
+    文件内容哈希（SHA-256，分块读取；结果按文件大小与修改时间缓存到同目录的 .sha256 文件）
+    :param path: 文件路径
+    :return: 十六进制哈希
+    """
+    stat = os.stat(path)
+    signature = f"{stat.st_size} {stat.st_mtime_ns}"
+    cache_path = path + ".sha256"
+    try:
+        with open(cache_path, 'r', encoding="utf-8") as f:
+            cached_signature, _, cached_digest = f.read().strip().rpartition(" ")
+        if cached_signature == signature and cached_digest:
+            return cached_digest
+    except (OSError, ValueError):
+        pass
+
+    with open(path, "rb") as f:
+        file_hash = stream_digest(iter(lambda: f.read(chunk_size), b""))
+    cache_file_digest(path, file_hash)
+    return file_hash
+
+
+def stream_digest(chunks):
+    """
+    分块计算内容哈希（SHA-256），无需将整个文件读入内存
+    :param chunks: 字节块迭代器（如上传文件的 chunks()）
+    :return: 十六进制哈希
+    """
+    sha256 = hashlib.sha256()
+    for chunk in chunks:
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def cache_file_digest(path, file_hash):
+    """
+    写入文件内容哈希缓存（已知哈希时避免 file_digest 重新读取文件）
+    """
+    stat = os.stat(path)
+    try:
+        with open(path + ".sha256", 'w', encoding="utf-8") as f:
+            f.write(f"{stat.st_size} {stat.st_mtime_ns} {file_hash}\n")
+    except OSError:
+        pass
+
+
+def render_params(scene_path, points, target_path, sun_azimuth_deg, sun_elevation_deg, resolution, renderer,
+                  image_format="PNG", image_compression=15, image_quality=90, annotation_mode="raycast",
+                  lod_pixel_error=0, texture_size=None, view_transform=None):
+    """
+    与位姿无关的渲染参数（场景、控制点、目标、日光、分辨率、渲染器、图像编码、标注方式、LOD 误差阈值、场景贴图上限）
+    :param target_path: 目标模型路径，多目标同帧渲染时为路径列表
+    :param annotation_mode: 标注方式，默认的 raycast 不写入参数（保持已有内容键不变）
+    :param lod_pixel_error: LOD 屏幕空间误差阈值（像素），0 表示始终使用原始网格（不写入参数）
+    :param texture_size: 场景贴图降采样版本的最大边长，None 表示使用原始贴图（不写入参数）
+    :param view_transform: 替换场景默认设置的视图变换（如异步写出时的 Standard），None 表示场景默认（不写入参数）
+    :return: 参数字典
+    """
+    image_format = image_format.upper()
+    if image_format == "PNG":
+        image = [image_format, int(image_compression)]
+    elif image_format in ("JPEG", "WEBP"):
+        image = [image_format, int(image_quality)]
+    else:
+        image = [image_format]
+    params = {
+        "scene": Path(scene_path).stem,
+        "points": points or DEFAULT_POINTS,
+        "target": _model_names(target_path),
+        "sun": [round(float(sun_azimuth_deg), 6), round(float(sun_elevation_deg), 6)],
+        "resolution": [int(resolution[0]), int(resolution[1])],
+        "renderer": renderer.upper(),
+        "image": image,
+    }
+    if annotation_mode and annotation_mode.lower() != "raycast":
+        params["annotation"] = annotation_mode.lower()
+    if lod_pixel_error:
+        params["lod"] = round(float(lod_pixel_error), 6)
+    if texture_size:
+        params["texture"] = int(texture_size)
+    if view_transform:
+        params["view"] = view_transform
+    return params
+
+
+def write_view_transform(image_write_mode, image_format="PNG", annotation_mode="raycast"):
+    """
+    图像写出方式对应的视图变换：异步写出（仅 PNG 且非实例掩膜标注时生效）固定使用 Standard，同步写出使用场景默认
+    :return: 视图变换名称，使用场景默认时返回 None
+    """
+    if (image_write_mode or "sync").lower() != "async" or image_format.upper() != "PNG" \
+            or (annotation_mode or "raycast").lower() == "mask":
+        return None
+    return ASYNC_VIEW_TRANSFORM
+
+
+def render_key(params, distance, elevation_deg, azimuth_deg, look_at=None, lighting=None):
+    """
+    单张图像的内容键
+    :param params: render_params 的返回值
+    :param look_at: 观察点偏移，None 表示观察原点（不写入键）
+    :param lighting: 该位姿抽取的光照参数，None 表示使用任务光照（不写入键）
+    """
+    pose = [round(float(distance), 6), round(float(elevation_deg), 6), round(float(azimuth_deg), 6)]
+    if look_at is not None:
+        pose += [round(float(value), 6) for value in look_at]
+    if lighting is not None:
+        return digest({**params, "pose": pose, "lighting": lighting})
+    return digest({**params, "pose": pose})
+
+
+def lit_render_key(params, lighting_spec, distance, elevation_deg, azimuth_deg, look_at=None):
+    """
+    光照随机化时的内容键：由不含光照的位姿键抽取该位姿的光照参数，再将其写入键
+    :param lighting_spec: 光照分布配置，为空时与 render_key 相同
+    :return: (内容键, 光照参数或 None)
+    """
+    key = render_key(params, distance, elevation_deg, azimuth_deg, look_at)
+    draw = lighting.sample_lighting(lighting_spec, key) if lighting_spec else None
+    if draw is None:
+        return key, None
+    return render_key(params, distance, elevation_deg, azimuth_deg, look_at, draw), draw
+
+
+def _model_names(path):
+    if isinstance(path, (list, tuple)):
+        return [Path(p).stem for p in path]
+    return Path(path).stem
+
+
+def unit_key(scene_model, target_model):
+    """
+    (场景, 目标) 工作单元键（与任务中模型的先后顺序无关）
+    :param target_model: 目标模型，多目标同帧渲染时为目标模型列表
+    """
+    if isinstance(target_model, (list, tuple)):
+        target_path = [model["path"] for model in target_model]
+    else:
+        target_path = target_model["path"]
+    return digest({"scene": Path(scene_model["path"]).stem, "points": scene_model.get("points") or DEFAULT_POINTS,
+                   "target": _model_names(target_path)}, 12)
+
+
+def target_groups(target_model_list, targets_per_frame=1):
+    """
+    多目标同帧渲染时按顺序将目标分组，每组同时摆放在一帧中
+    :param target_model_list: 目标模型列表
+    :param targets_per_frame: 每帧目标数量
+    """
+    size = max(1, int(targets_per_frame or 1))
+    return [target_model_list[i:i + size] for i in range(0, len(target_model_list), size)]
+
+
+def layout_seed(scene_path, points, target_paths):
+    """
+    多目标摆放的随机种子（同一场景与目标组合的摆放保持不变，内容键无需包含摆放位置）
+    """
+    return int(digest({"scene": Path(scene_path).stem, "points": points or DEFAULT_POINTS,
+                       "target": _model_names(list(target_paths))}, 8), 16)
+
+
+def pose_salt(target_paths):
+    """
+    随机位姿采样的种子附加值（由目标名称决定，不同目标的采样位姿不同，同一目标保持不变）
+    :param target_paths: 目标模型路径列表
+    """
+    return ",".join(_model_names(list(target_paths)))
+
+
+def prune_dataset(dataset_dir, wanted_keys, pattern="metadata_*.jsonl"):
+    """
+    删除内容键不再需要的图像与标注记录，以及没有标注记录的残留图像
+    :param dataset_dir: 数据集目录
+    :param wanted_keys: 当前任务参数下的全部内容键
+    :param pattern: 标注分片匹配模式
+    :return: 删除的图像数量
+    """
+    if not os.path.isdir(dataset_dir):
+        return 0
+
+    kept_files, removed_records = set(), 0
+    for path in glob.glob(os.path.join(dataset_dir, pattern)):
+        records = read_records(path)
+        kept = [record for record in records if record.get("render_key") in wanted_keys]
+        kept_files.update(record["filename"] for record in kept if record.get("filename"))
+        removed_records += len(records) - len(kept)
+        if not kept:
+            os.remove(path)
+        elif len(kept) != len(records):
+            rewrite_records(path, kept)
+
+    removed_images = 0
+    for image_pattern in IMAGE_PATTERNS:
+        for path in glob.glob(os.path.join(dataset_dir, image_pattern)):
+            if os.path.basename(path) not in kept_files:
+                os.remove(path)
+                removed_images += 1
+
+    # 合并后的标注文件已过期，渲染完成后重新生成
+    if removed_records or removed_images:
+        merged_file = os.path.join(dataset_dir, ANNOTATIONS_FILE)
+        if os.path.exists(merged_file):
+            os.remove(merged_file)
+        print(f"🧹 增量失效 | 删除 {removed_images} 张图像，{removed_records} 条标注记录")
+    return removed_images
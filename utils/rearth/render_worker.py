@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午2:40
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : render_worker.py
+# @Project : RealEarthStudio
+# @Details : 常驻渲染进程池：每个进程保留一个已导入的场景，按场景复用，按内存预算淘汰
+
+
+import os
+import json
+import time
+import atexit
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+
+def scene_key(config):
+    """
+    场景缓存键：场景模型文件ID（无则用路径）+ 控制点 + 贴图版本
+    """
+    scene_model = config["scene_model"]
+    return f"{scene_model.get('model_id') or scene_model['path']}|{json.dumps(scene_model.get('points'))}" \
+           f"|{config.get('texture_size')}"
+
+
+def process_memory_mb():
+    """
+    当前进程常驻内存（MB），无法获取时返回 0
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def _worker_loop(conn):
+    """
+    常驻渲染进程主循环：同一场景的任务只重置目标、日光、相机与分辨率
+    """
+    # 延迟导入：仅渲染进程加载 bpy
+    from utils.rearth import SceneRenderer
+    from utils.other import tracing
+
+    renderer, loaded_key, trace_config = None, None, None
+    while True:
+        try:
+            config = conn.recv()
+        except EOFError:
+            break
+        if config is None:
+            break
+
+        # 计时记录配置随渲染任务变化
+        if config.get("trace") != trace_config:
+            trace_config = config.get("trace")
+            tracing.configure(trace_config)
+
+        key = scene_key(config)
+        try:
+            with tracing.span("scene_load", reused=renderer is not None and key == loaded_key):
+                if renderer is None or key != loaded_key:
+                    renderer = SceneRenderer.SceneRenderer(
+                        config['scene_model'], config['target_model_list'],
+                        render_id=config['render_id'], output_dir=config['output_dir'], index=config['index'],
+                        image_prefix=config.get('image_prefix', "image"),
+                        annotations_name=config.get('annotations_name', "metadata.jsonl"),
+                        texture_size=config.get('texture_size'))
+                    loaded_key = key
+                else:
+                    print(f"♻️ 复用已导入场景 {renderer.scene_model_name}")
+                    renderer.prepare_task(
+                        config['target_model_list'], render_id=config['render_id'], output_dir=config['output_dir'],
+                        index=config['index'], image_prefix=config.get('image_prefix', "image"),
+                        annotations_name=config.get('annotations_name', "metadata.jsonl"))
+            with tracing.span("unit", unit=config.get("unit_name")):
+                index, _ = SceneRenderer.run_task(renderer, config)
+            conn.send(("done", index, process_memory_mb()))
+        except Exception:
+            # 出错后场景状态不可信，下个任务重新导入
+            renderer, loaded_key = None, None
+            conn.send(("error", traceback.format_exc(), process_memory_mb()))
+    tracing.get_tracer().close()
+
+
+class WarmWorker:
+    """ 常驻渲染进程 """
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.scene_key = None
+        self.unit = None
+        self.memory_mb = 0.0
+        self.last_used = time.monotonic()
+
+    @property
+    def busy(self):
+        return self.unit is not None
+
+    def submit(self, unit):
+        self.unit = unit
+        self.scene_key = scene_key(unit)
+        self.conn.send(unit)
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class WarmRenderPool:
+    """ 常驻渲染进程池（场景 LRU） """
+
+    def __init__(self, max_workers=1, memory_budget_mb=0):
+        """
+        初始化对象
+        :param max_workers: 最大进程数
+        :param memory_budget_mb: 所有常驻进程的内存预算（MB），0 表示不限制
+        """
+        self.context = multiprocessing.get_context("spawn")
+        self.max_workers = max(1, max_workers)
+        self.memory_budget_mb = memory_budget_mb
+        self.workers = []
+
+    def _pick_worker(self, unit):
+        """为工作单元选择进程：优先已加载同一场景的空闲进程，其次新建，最后复用最久未用的空闲进程"""
+        idle = [w for w in self.workers if not w.busy]
+        key = scene_key(unit)
+        for worker in idle:
+            if worker.scene_key == key:
+                return worker
+        if len(self.workers) < self.max_workers:
+            worker = WarmWorker(self.context)
+            self.workers.append(worker)
+            return worker
+        if idle:
+            return min(idle, key=lambda w: w.last_used)
+        return None
+
+    def _evict(self):
+        """超出内存预算时，关闭最久未用的空闲进程"""
+        if not self.memory_budget_mb:
+            return
+        while sum(w.memory_mb for w in self.workers) > self.memory_budget_mb:
+            idle = [w for w in self.workers if not w.busy]
+            if not idle:
+                break
+            worker = min(idle, key=lambda w: w.last_used)
+            print(f"🧹 常驻渲染进程超出内存预算，释放场景 {worker.scene_key} ({worker.memory_mb:.0f} MB)")
+            worker.stop()
+            self.workers.remove(worker)
+
+    def run(self, units, on_unit_done=None):
+        """
+        执行工作单元
+        :param units: 工作单元配置列表
+        :param on_unit_done: 单元完成回调 on_unit_done(done_count, total_count, unit_name, image_count)
+        :return: (渲染图像总数, 错误列表)
+        """
+        # 同一场景的单元相邻排列，便于连续复用
+        pending = sorted(units, key=scene_key)
+        total, done, image_count, errors = len(units), 0, 0, []
+
+        while pending or any(w.busy for w in self.workers):
+            # 分发
+            while pending:
+                # 优先分发能命中已加载场景的单元
+                idle_keys = {w.scene_key for w in self.workers if not w.busy}
+                unit = next((u for u in pending if scene_key(u) in idle_keys), pending[0])
+                worker = self._pick_worker(unit)
+                if worker is None:
+                    break
+                pending.remove(unit)
+                worker.submit(unit)
+
+            # 等待任一进程完成
+            busy = {w.conn: w for w in self.workers if w.busy}
+            for conn in wait(list(busy)):
+                worker = busy[conn]
+                unit_name = worker.unit["unit_name"]
+                done += 1
+                try:
+                    status, payload, worker.memory_mb = conn.recv()
+                except (EOFError, OSError):
+                    # 进程异常退出（如内存不足），移出进程池
+                    status, payload = "error", "渲染进程异常退出"
+                    worker.stop()
+                    self.workers.remove(worker)
+                worker.unit = None
+                worker.last_used = time.monotonic()
+
+                if status == "done":
+                    image_count += payload
+                    print(f"🔆 工作单元 {unit_name} 完成 ({done} / {total}) | 渲染图像 {payload} 张")
+                    if on_unit_done:
+                        on_unit_done(done, total, unit_name, payload)
+                else:
+                    worker.scene_key = None
+                    errors.append(f"{unit_name}: {payload}")
+                    print(f"❌ 工作单元 {unit_name} 渲染失败: {payload}")
+            self._evict()
+
+        return image_count, errors
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+
+
+_pool = None
+
+
+def get_pool(max_workers=1, memory_budget_mb=0):
+    """
+    获取当前进程内的常驻渲染进程池（跨渲染任务保留已导入的场景）
+    """
+    global _pool
+    if _pool is None:
+        _pool = WarmRenderPool(max_workers, memory_budget_mb)
+        atexit.register(_pool.shutdown)
+    else:
+        _pool.max_workers = max(1, max_workers)
+        _pool.memory_budget_mb = memory_budget_mb
+    return _pool
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午1:20
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : scene_library.py
+# @Project : RealEarthStudio
+# @Details : 场景模型预处理：为面数较多的场景瓦片生成多级 LOD 网格，保存为可按需链接的 .blend 库
+
+
+import os
+import glob
+import json
+
+from utils.rearth import lod, target_library
+from utils.rearth.render_keys import file_digest
+
+# 预处理库格式版本（生成逻辑变化时递增，旧版本的库视为过期）
+LIBRARY_VERSION = 1
+
+# 各级 LOD 的面数比例（LOD0 为场景中的原始网格，不写入库）
+LOD_RATIOS = (1.0, 0.5, 0.25, 0.1)
+
+# 面数少于该值的场景对象不生成 LOD
+MIN_FACES = 5000
+
+
+def manifest_path(scene_path):
+    """场景 LOD 库清单路径（与 .blend 缓存、遮挡体缓存同目录，如 xxx.glb.lod.json）"""
+    return scene_path + ".lod.json"
+
+
+def load_manifest(scene_path):
+    """
+    读取与场景文件内容一致的 LOD 库清单
+    :param scene_path: 场景模型路径
+    :return: 清单字典（library 为库文件绝对路径），库不存在或已过期时返回 None
+    """
+    try:
+        with open(manifest_path(scene_path), 'r', encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("version") != LIBRARY_VERSION or manifest.get("source_digest") != file_digest(scene_path):
+        return None
+    library = os.path.join(os.path.dirname(scene_path), manifest["library"])
+    if not os.path.isfile(library):
+        return None
+    return dict(manifest, library=library)
+
+
+def remove_library(scene_path):
+    """
+    删除场景文件的 LOD 库与清单
+    """
+    for path in glob.glob(glob.escape(scene_path) + ".lod.*.blend") + [manifest_path(scene_path)]:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def open_scene(bpy, scene_path):
+    """
+    打开场景模型（与 SceneRenderer.load_scene_model 一致：fbx/glb 优先打开 .blend 缓存，缓存不存在时导入并保存缓存，
+    保证对象名称与渲染时相同）
+    """
+    ext = scene_path.split('.')[-1].lower()
+    if ext == "blend":
+        bpy.ops.wm.open_mainfile(filepath=scene_path)
+    elif os.path.exists(scene_path + ".blend"):
+        bpy.ops.wm.open_mainfile(filepath=scene_path + ".blend")
+    elif ext in ["fbx", "glb"]:
+        bpy.ops.object.select_all(action='SELECT')
+        bpy.ops.object.delete(use_global=False, confirm=False)
+        if ext == "fbx":
+            bpy.ops.import_scene.fbx(filepath=scene_path)
+        else:
+            bpy.ops.import_scene.gltf(filepath=scene_path)
+        bpy.ops.wm.save_as_mainfile(filepath=scene_path + ".blend")
+    else:
+        raise FileNotFoundError(f"不支持的场景模型格式: {scene_path}")
+
+
+def build_library(scene_path, lod_ratios=LOD_RATIOS, min_faces=MIN_FACES):
+    """
+    生成场景 LOD 库（需在可导入 bpy 的进程中运行）：
+    为面数不少于 min_faces 且没有修改器的网格对象生成 LOD1 及以上各级网格，几何误差换算为世界尺度；
+    LOD 网格不带材质（渲染时沿用对象原有材质，避免重复加载贴图）
+    :param scene_path: 场景模型路径
+    :param lod_ratios: 各级 LOD 的面数比例（LOD0 固定为原始网格）
+    :param min_faces: 生成 LOD 的最少面数
+    :return: 清单字典
+    """
+    import bpy
+
+    open_scene(bpy, scene_path)
+    lod_ratios = [1.0] + [ratio for ratio in lod_ratios if ratio < 1.0]
+    objects, meshes = {}, []
+    for obj in list(bpy.data.objects):
+        if obj.type != 'MESH' or obj.modifiers or len(obj.data.polygons) < min_faces:
+            continue
+        levels, lods = lod.build_levels(bpy, obj, lod_ratios, obj.name)
+        bpy.data.meshes.remove(levels[0])
+        lods[0]["mesh"] = None
+        scale = max(abs(value) for value in obj.matrix_world.to_scale())
+        for mesh, level in zip(levels[1:], lods[1:]):
+            for i in range(len(mesh.materials)):
+                mesh.materials[i] = None
+            level["error"] = round(level["error"] * scale, 6)
+            meshes.append(mesh)
+        objects[obj.name] = lods
+
+    source_digest = file_digest(scene_path)
+    library_name = f"{os.path.basename(scene_path)}.lod.{source_digest[:12]}.blend"
+    library_path = os.path.join(os.path.dirname(scene_path), library_name)
+    bpy.data.libraries.write(library_path, set(meshes), fake_user=True)
+
+    manifest = {
+        "version": LIBRARY_VERSION,
+        "source_digest": source_digest,
+        "library": library_name,
+        "lod_ratios": lod_ratios,
+        "objects": objects,
+    }
+    tmp_path = manifest_path(scene_path) + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(scene_path))
+
+    # 删除旧版本的库文件
+    for path in glob.glob(glob.escape(scene_path) + ".lod.*.blend"):
+        if os.path.basename(path) != library_name:
+            os.remove(path)
+    print(f"✅ 场景模型预处理完成 {scene_path} | 生成 LOD 的对象数：{len(objects)}")
+    return manifest
+
+
+def preprocess(scene_path, lod_ratios=LOD_RATIOS, force=False):
+    """
+    在独立的 Blender 进程中生成场景 LOD 库
+    :param scene_path: 场景模型路径
+    :param lod_ratios: 各级 LOD 的面数比例
+    :param force: 库已是最新时是否重新生成
+    :return: 清单字典
+    """
+    if not force:
+        manifest = load_manifest(scene_path)
+        if manifest is not None and manifest["lod_ratios"] == [1.0] + [r for r in lod_ratios if r < 1.0]:
+            return manifest
+    return target_library.run_builder(build_library, scene_path, list(lod_ratios))
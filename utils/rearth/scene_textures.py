@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午3:00
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : scene_textures.py
+# @Project : RealEarthStudio
+# @Details : 场景贴图降采样：为场景模型生成限制贴图最大边长的 .blend 版本（贴图压缩保存在同目录），按输出分辨率与相机距离选择
+
+
+import os
+import glob
+import json
+import math
+import shutil
+
+from utils.rearth import target_library, scene_library
+from utils.rearth.render_keys import file_digest
+
+# 预处理版本格式（生成逻辑变化时递增，旧版本视为过期）
+LIBRARY_VERSION = 1
+
+# 贴图最大边长的各级上限（像素），不小于原始贴图的级别不生成
+TEXTURE_SIZES = (1024, 2048, 4096)
+
+# 降采样后无透明通道的颜色贴图保存为 JPEG 的质量
+JPEG_QUALITY = 90
+
+# 与 SceneRenderer 创建的默认相机一致（焦距、传感器宽度，毫米）
+CAMERA_LENS = 50.0
+CAMERA_SENSOR = 36.0
+
+# 画面中离相机最近的场景表面按相机距离的该比例估计（相机在目标斜上方时，近处地面比目标更近）
+NEAR_DISTANCE_RATIO = 0.5
+
+
+def manifest_path(scene_path):
+    """场景贴图版本清单路径（与 .blend 缓存、LOD 库同目录，如 xxx.glb.tex.json）"""
+    return scene_path + ".tex.json"
+
+
+def variant_path(scene_path, size):
+    """贴图上限为 size 的场景版本路径（如 xxx.glb.tex2048.blend，贴图保存在 xxx.glb.tex2048 目录）"""
+    return f"{scene_path}.tex{int(size)}.blend"
+
+
+def load_manifest(scene_path):
+    """
+    读取与场景文件内容一致的贴图版本清单
+    :param scene_path: 场景模型路径
+    :return: 清单字典，清单不存在或已过期时返回 None
+    """
+    try:
+        with open(manifest_path(scene_path), 'r', encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("version") != LIBRARY_VERSION or manifest.get("source_digest") != file_digest(scene_path):
+        return None
+    return manifest
+
+
+def remove_variants(scene_path):
+    """
+    删除场景的贴图版本、降采样贴图与清单
+    """
+    for path in glob.glob(glob.escape(scene_path) + ".tex*"):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isfile(path):
+            os.remove(path)
+
+
+def material_images(material):
+    """材质引用的贴图"""
+    if material is None or not material.use_nodes:
+        return set()
+    return {node.image for node in material.node_tree.nodes if node.type == 'TEX_IMAGE' and node.image is not None}
+
+
+def texture_extents(bpy):
+    """
+    各贴图尺寸覆盖的最大世界尺寸：按贴图最大边长分组，取使用该尺寸贴图的对象包围盒最大边长的最大值
+    :return: {贴图最大边长(str): 世界尺寸（米）}，没有贴图时为空字典
+    """
+    from mathutils import Vector
+
+    extents = {}
+    for obj in bpy.context.scene.objects:
+        if obj.type != 'MESH':
+            continue
+        images = set().union(*(material_images(slot.material) for slot in obj.material_slots))
+        edge = max((max(image.size) for image in images), default=0)
+        if edge == 0:
+            continue
+        corners = [obj.matrix_world @ Vector(corner) for corner in obj.bound_box]
+        extent = max(max(c[axis] for c in corners) - min(c[axis] for c in corners) for axis in range(3))
+        if extent > 0:
+            extents[str(edge)] = max(extents.get(str(edge), 0.0), round(extent, 4))
+    return extents
+
+
+def downscale_image(bpy, image, max_size, texture_dir, index=0):
+    """
+    将贴图缩小到最大边长不超过 max_size，压缩保存到 texture_dir 后替换场景中的原贴图
+    （无透明通道的颜色贴图保存为 JPEG，透明贴图与法线等非颜色数据保存为 PNG）
+    :param index: 贴图序号（用于文件名，避免同名贴图相互覆盖）
+    :return: 缩小后的贴图，无需缩小时返回原贴图
+    """
+    import numpy as np
+
+    width, height = image.size
+    scale = max_size / max(width, height)
+    if scale >= 1 or image.is_float:
+        # 浮点贴图（HDR 等）保持原样
+        return image
+    width, height = max(1, round(width * scale)), max(1, round(height * scale))
+    image.scale(width, height)
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+
+    has_alpha = image.alpha_mode != 'NONE' and bool((pixels[3::4] < 1.0).any())
+    file_format = 'PNG' if has_alpha or image.colorspace_settings.is_data else 'JPEG'
+    file_name = f"{index:04d}_{bpy.path.clean_name(image.name)}.{'png' if file_format == 'PNG' else 'jpg'}"
+
+    scaled = bpy.data.images.new(f"{image.name}_{max_size}", width, height, alpha=has_alpha)
+    scaled.colorspace_settings.name = image.colorspace_settings.name
+    scaled.alpha_mode = image.alpha_mode
+    scaled.pixels.foreach_set(pixels)
+    scaled.filepath_raw = os.path.join(texture_dir, file_name)
+    scaled.file_format = file_format
+    scaled.save(quality=JPEG_QUALITY)
+    scaled.source = 'FILE'
+
+    name = image.name
+    image.user_remap(scaled)
+    bpy.data.images.remove(image)
+    scaled.name = name
+    return scaled
+
+
+def build_variants(scene_path, sizes=TEXTURE_SIZES):
+    """
+    生成场景贴图版本（需在可导入 bpy 的进程中运行）：每个上限重新打开场景，缩小超过上限的贴图后另存为 .blend，
+    对象名称与原场景一致（LOD 库、遮挡体缓存通用）
+    :param scene_path: 场景模型路径
+    :param sizes: 贴图最大边长的各级上限
+    :return: 清单字典
+    """
+    import bpy
+
+    scene_library.open_scene(bpy, scene_path)
+    images = [image for image in bpy.data.images if image.type == 'IMAGE' and image.size[0]]
+    source_size = max((max(image.size) for image in images), default=0)
+    source_memory = sum(image.size[0] * image.size[1] * 4 for image in images)
+    extents = texture_extents(bpy)
+
+    remove_variants(scene_path)
+    variants = {}
+    for size in sorted(int(size) for size in sizes):
+        if not extents or size >= source_size:
+            continue
+        scene_library.open_scene(bpy, scene_path)
+        texture_dir = variant_path(scene_path, size)[:-len(".blend")]
+        os.makedirs(texture_dir, exist_ok=True)
+        memory = 0
+        for index, image in enumerate(list(bpy.data.images)):
+            if image.type != 'IMAGE' or not image.size[0]:
+                continue
+            image = downscale_image(bpy, image, size, texture_dir, index)
+            memory += image.size[0] * image.size[1] * 4
+        bpy.ops.wm.save_as_mainfile(filepath=variant_path(scene_path, size), copy=True, relative_remap=True)
+        variants[str(size)] = {"blend": os.path.basename(variant_path(scene_path, size)), "texture_memory": memory}
+        print(f"✅ 场景贴图版本生成完成 {size}px | 贴图内存：{memory / 1024 ** 2:.0f} MB")
+
+    manifest = {
+        "version": LIBRARY_VERSION,
+        "source_digest": file_digest(scene_path),
+        "sizes": sorted(int(size) for size in sizes),
+        "source_size": source_size,
+        "texture_memory": source_memory,
+        "texture_extents": extents,
+        "variants": variants,
+    }
+    tmp_path = manifest_path(scene_path) + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(scene_path))
+    print(f"✅ 场景贴图预处理完成 {scene_path} | 原始贴图最大边长：{source_size}px，版本：{list(variants)}")
+    return manifest
+
+
+def preprocess(scene_path, sizes=TEXTURE_SIZES, force=False):
+    """
+    在独立的 Blender 进程中生成场景贴图版本
+    :param scene_path: 场景模型路径
+    :param sizes: 贴图最大边长的各级上限
+    :param force: 清单已是最新时是否重新生成
+    :return: 清单字典
+    """
+    if not force:
+        manifest = load_manifest(scene_path)
+        if manifest is not None and manifest.get("sizes") == sorted(int(size) for size in sizes):
+            return manifest
+    return target_library.run_builder(build_variants, scene_path, list(sizes))
+
+
+def required_size(manifest, resolution, camera_distances):
+    """
+    渲染所需的贴图最大边长：贴图像素投影到画面上不小于一个像素即可保留全部细节，
+    各尺寸贴图所需边长 = min(贴图边长, 覆盖的世界尺寸 / 单个像素对应的世界尺寸)
+    （焦距像素 = 输出宽高较大者 × 焦距 / 传感器宽度，最近表面距离 = 最小相机距离 × NEAR_DISTANCE_RATIO）
+    :param manifest: 贴图版本清单
+    :param resolution: 输出分辨率 [宽, 高]
+    :param camera_distances: 任务的相机距离列表
+    :return: 所需最大边长（像素），无法估计时返回 None
+    """
+    if not manifest.get("texture_extents") or not camera_distances:
+        return None
+    focal_px = max(resolution) * CAMERA_LENS / CAMERA_SENSOR
+    footprint = max(min(camera_distances) * NEAR_DISTANCE_RATIO, 1e-6) / focal_px
+    return max(min(int(edge), math.ceil(extent / footprint)) for edge, extent in manifest["texture_extents"].items())
+
+
+def select_size(scene_path, resolution, camera_distances):
+    """
+    为渲染任务选择场景贴图版本：不低于所需边长的最小上限
+    :param scene_path: 场景模型路径
+    :param resolution: 输出分辨率 [宽, 高]
+    :param camera_distances: 任务的相机距离列表
+    :return: 贴图上限（像素），没有合适版本（需要原始贴图或尚未预处理）时返回 None
+    """
+    manifest = load_manifest(scene_path)
+    if manifest is None:
+        return None
+    needed = required_size(manifest, resolution, camera_distances)
+    if needed is None:
+        return None
+    sizes = sorted(int(size) for size in manifest["variants"] if int(size) >= needed)
+    if not sizes or not os.path.isfile(variant_path(scene_path, sizes[0])):
+        return None
+    return sizes[0]
+
+
+def task_texture_size(config):
+    """
+    渲染配置对应的场景贴图上限（未启用贴图降采样时返回 None，渲染进程与数据集增量失效时结果一致）
+    :param config: 渲染配置（含 scene_model、resolution、camera_distances、texture_downscale）
+    """
+    if not config.get("texture_downscale"):
+        return None
+    return select_size(config["scene_model"]["path"], config["resolution"], config["camera_distances"])
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 下午10:10
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : target_layout.py
+# @Project : RealEarthStudio
+# @Details : 多目标摆放：在场景控制点（原点）附近随机摆放多个目标，水平投影互不重叠（NumPy实现，不依赖 bpy）
+
+
+import numpy as np
+
+
+def footprint(vertices):
+    """
+    目标水平投影的包围圆
+    :param vertices: (N, 3) 世界坐标顶点
+    :return: (center, radius)，center 为 (2,) 数组
+    """
+    xy = np.asarray(vertices, dtype=np.float64)[:, :2]
+    center = (xy.min(axis=0) + xy.max(axis=0)) / 2
+    return center, float(np.linalg.norm(xy - center, axis=1).max())
+
+
+def sample_layout(radii, rng, gap=1.0, max_attempts=200):
+    """
+    随机摆放多个包围圆，互不重叠并尽量靠近原点（从大到小依次放置，取距原点最近的有效候选，放置失败时扩大摆放范围）
+    :param radii: 各目标包围圆半径
+    :param rng: numpy.random.Generator
+    :param gap: 相邻目标的最小间距（米）
+    :param max_attempts: 每个摆放范围内的尝试次数
+    :return: (N, 2) 各目标中心坐标（整体重心位于原点）
+    """
+    radii = np.asarray(radii, dtype=np.float64)
+    positions = np.zeros((len(radii), 2), dtype=np.float64)
+    if len(radii) <= 1:
+        return positions
+
+    placed = []
+    extent = radii.sum() + gap * (len(radii) - 1)
+    for i in np.argsort(-radii, kind="stable"):
+        if not placed:
+            placed.append(i)
+            continue
+        while True:
+            # 在半径 extent 的圆内均匀采样候选位置
+            r = extent * np.sqrt(rng.random(max_attempts))
+            theta = rng.random(max_attempts) * 2 * np.pi
+            candidates = np.stack([r * np.cos(theta), r * np.sin(theta)], axis=1)
+            distances = np.linalg.norm(candidates[:, None, :] - positions[placed][None, :, :], axis=2)
+            valid = np.flatnonzero((distances >= radii[placed] + radii[i] + gap).all(axis=1))
+            if len(valid):
+                positions[i] = candidates[valid[np.argmin(r[valid])]]
+                placed.append(i)
+                break
+            extent *= 1.25
+
+    return positions - positions.mean(axis=0)
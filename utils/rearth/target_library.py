@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/19 上午12:30
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : target_library.py
+# @Project : RealEarthStudio
+# @Details : 目标模型预处理：导入一次、合并网格、归一化原点并生成多级 LOD，保存为可直接链接的 .blend 库
+
+
+import os
+import glob
+import json
+import multiprocessing
+
+from utils.other import tracing
+from utils.rearth import lod
+from utils.rearth.render_keys import file_digest
+
+# 预处理库格式版本（生成逻辑变化时递增，旧版本的库视为过期）
+LIBRARY_VERSION = 2
+
+# 各级 LOD 的面数比例（LOD0 为原始网格）
+LOD_RATIOS = (1.0, 0.5, 0.25, 0.1)
+
+
+def manifest_path(model_path):
+    """预处理库清单路径（与模型文件同目录，如 xxx.lib.json）"""
+    return os.path.splitext(model_path)[0] + ".lib.json"
+
+
+def load_manifest(model_path):
+    """
+    读取与模型文件内容一致的预处理库清单
+    :param model_path: 目标模型路径
+    :return: 清单字典（library 为库文件绝对路径），库不存在或已过期时返回 None
+    """
+    try:
+        with open(manifest_path(model_path), 'r', encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if manifest.get("version") != LIBRARY_VERSION or manifest.get("source_digest") != file_digest(model_path):
+        return None
+    library = os.path.join(os.path.dirname(model_path), manifest["library"])
+    if not os.path.isfile(library):
+        return None
+    return dict(manifest, library=library)
+
+
+def remove_library(model_path):
+    """
+    删除模型文件的预处理库、清单与内容哈希缓存
+    """
+    stem = os.path.splitext(model_path)[0]
+    for path in glob.glob(glob.escape(stem) + ".*.blend") + [stem + ".lib.json", model_path + ".sha256"]:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def import_model(bpy, model_path, object_name="targetModel"):
+    """
+    导入目标模型文件，并整合为一个名为 object_name 的对象（多个网格合并为一个对象）
+    :param bpy: bpy 模块
+    :param model_path: 目标模型路径（fbx/glb）
+    :param object_name: 整合后的对象名称
+    :return: 整合后的对象
+    """
+    ext = model_path.split('.')[-1].lower()
+    with tracing.span("import_target", format=ext):
+        if ext == "fbx":
+            bpy.ops.import_scene.fbx(filepath=model_path)
+        elif ext == "glb":
+            bpy.ops.import_scene.gltf(filepath=model_path)
+
+    # 获取所有新导入的对象
+    imported_objects = list(bpy.context.selected_objects)
+
+    # 创建一个空的集合来存储所有网格对象
+    mesh_objects = [obj for obj in imported_objects if obj.type == 'MESH']
+
+    if not mesh_objects:
+        # 如果没有网格对象，查找其他类型的有效对象
+        valid_objects = [obj for obj in imported_objects if
+                         obj.type in ['MESH', 'CURVE', 'SURFACE', 'META', 'FONT']]
+        if valid_objects:
+            # 创建一个父级空对象来整合所有对象
+            bpy.ops.object.empty_add(type='PLAIN_AXES', location=(0, 0, 0))
+            target_empty = bpy.context.active_object
+            target_empty.name = object_name
+
+            # 将所有导入的对象作为子对象
+            for obj in valid_objects:
+                obj.parent = target_empty
+        else:
+            raise ValueError("导入的模型中没有有效的可渲染对象！")
+    elif len(mesh_objects) == 1:
+        # 如果只有一个网格对象，直接重命名
+        mesh_objects[0].name = object_name
+    else:
+        # 如果有多个网格对象，合并为一个对象
+        bpy.context.view_layer.objects.active = mesh_objects[0]
+        mesh_objects[0].select_set(True)
+
+        # 选择所有其他网格对象
+        for obj in mesh_objects[1:]:
+            obj.select_set(True)
+
+        # 合并选中的对象
+        with tracing.span("join", objects=len(mesh_objects)):
+            bpy.ops.object.join()
+        mesh_objects[0].name = object_name
+
+    # 返回整合后的对象
+    target_obj = bpy.data.objects.get(object_name)
+    if not target_obj:
+        raise ValueError("场景中未找到目标对象！")
+    return target_obj
+
+
+def build_library(model_path, lod_ratios=LOD_RATIOS):
+    """
+    生成预处理库（需在可导入 bpy 的进程中运行）：
+    导入并合并网格，应用变换后将 XY 中心移到原点、底部对齐 Z=0（与 select_target_to_glb.py 一致），
+    按 lod_ratios 以 Decimate 修改器生成各级 LOD 网格（记录几何误差），打包贴图后写入 .blend 库
+    :param model_path: 目标模型路径
+    :param lod_ratios: 各级 LOD 的面数比例
+    :return: 清单字典
+    """
+    import bpy
+    from mathutils import Matrix, Vector
+
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    obj = import_model(bpy, model_path, "targetModel")
+    if obj.type != 'MESH':
+        raise ValueError("目标模型没有网格对象，无法生成预处理库")
+
+    # 应用变换并归一化原点
+    bpy.ops.object.select_all(action='DESELECT')
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+    bpy.ops.object.transform_apply(location=True, rotation=True, scale=True)
+    corners = [Vector(corner) for corner in obj.bound_box]
+    v_min = Vector((min(c.x for c in corners), min(c.y for c in corners), min(c.z for c in corners)))
+    v_max = Vector((max(c.x for c in corners), max(c.y for c in corners), max(c.z for c in corners)))
+    obj.data.transform(Matrix.Translation((-(v_min.x + v_max.x) / 2, -(v_min.y + v_max.y) / 2, -v_min.z)))
+
+    # 生成各级 LOD 网格并估计几何误差
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    meshes, lods = lod.build_levels(bpy, obj, lod_ratios, stem)
+
+    # 打包贴图，写入库文件（文件名包含内容哈希，模型更新后不会复用已链接的旧库）
+    try:
+        bpy.ops.file.pack_all()
+    except RuntimeError as e:
+        print(f"⚠️ 贴图打包失败: {e}")
+    source_digest = file_digest(model_path)
+    library_name = f"{stem}.{source_digest[:12]}.blend"
+    library_path = os.path.join(os.path.dirname(model_path), library_name)
+    bpy.data.libraries.write(library_path, set(meshes), fake_user=True)
+
+    manifest = {
+        "version": LIBRARY_VERSION,
+        "source_digest": source_digest,
+        "library": library_name,
+        "dimensions": [round(v, 4) for v in v_max - v_min],
+        "lods": lods,
+    }
+    tmp_path = manifest_path(model_path) + ".tmp"
+    with open(tmp_path, 'w', encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(model_path))
+
+    # 删除旧版本的库文件
+    for path in glob.glob(glob.escape(os.path.splitext(model_path)[0]) + ".*.blend"):
+        if os.path.basename(path) != library_name:
+            os.remove(path)
+    print(f"✅ 目标模型预处理完成 {model_path} | LOD 面数：{[level['faces'] for level in lods]}")
+    return manifest
+
+
+def _build_process(builder, args, conn):
+    try:
+        conn.send(("done", builder(*args)))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+def run_builder(builder, *args):
+    """
+    在独立的 Blender 进程中运行库生成函数（调用方进程无需加载 bpy，生成时的场景状态也不影响调用方）
+    :param builder: 模块级生成函数，返回清单字典
+    :return: builder 的返回值
+    """
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_build_process, args=(builder, args, child_conn), daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        status, payload = parent_conn.recv()
+    except EOFError:
+        status, payload = "error", "预处理进程异常退出"
+    process.join()
+    if status != "done":
+        raise RuntimeError(payload)
+    return payload
+
+
+def preprocess(model_path, lod_ratios=LOD_RATIOS, force=False):
+    """
+    在独立的 Blender 进程中生成预处理库
+    :param model_path: 目标模型路径
+    :param lod_ratios: 各级 LOD 的面数比例
+    :param force: 库已是最新时是否重新生成
+    :return: 清单字典
+    """
+    if not force:
+        manifest = load_manifest(model_path)
+        if manifest is not None and [level["ratio"] for level in manifest["lods"]] == list(lod_ratios):
+            return manifest
+    return run_builder(build_library, model_path, list(lod_ratios))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# @Time : 2026/10/18 上午10:20
+# @Author : CharlesWYQ
+# @Email : charleswyq@foxmail.com
+# @File : visibility.py
+# @Project : RealEarthStudio
+# @Details : 批量几何提取与相机投影（NumPy）
+
+
+import numpy as np
+
+GEOMETRY_TYPES = {'MESH', 'CURVE', 'SURFACE', 'META', 'FONT'}
+
+
+def matrix_to_numpy(matrix):
+    """mathutils.Matrix 转 4x4 numpy 数组"""
+    return np.array([list(row) for row in matrix], dtype=np.float64)
+
+
+def transform_points(points, matrix):
+    """
+    对点集应用 4x4 变换矩阵
+    :param points: (N, 3) 数组
+    :param matrix: mathutils.Matrix 或 (4, 4) 数组
+    """
+    m = matrix if isinstance(matrix, np.ndarray) else matrix_to_numpy(matrix)
+    return points @ m[:3, :3].T + m[:3, 3]
+
+
+def _geometry_objects(obj):
+    """返回对象自身及其子对象中的可渲染几何体"""
+    objects = [obj] + list(obj.children_recursive)
+    return [o for o in objects if o.type in GEOMETRY_TYPES]
+
+
+def _read_mesh(obj, deps_graph, with_triangles=False):
+    """读取求值后网格的局部顶点（及三角形索引）"""
+    eval_obj = obj.evaluated_get(deps_graph)
+    mesh = eval_obj.to_mesh()
+    try:
+        if mesh is None:
+            return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 3), dtype=np.int32)
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        tri = np.zeros(0, dtype=np.int32)
+        if with_triangles:
+            tri = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+            mesh.loop_triangles.foreach_get("vertices", tri)
+    finally:
+        eval_obj.to_mesh_clear()
+    return co.reshape(-1, 3), tri.reshape(-1, 3)
+
+
+def object_world_vertices(obj, deps_graph):
+    """
+    读取对象（含子对象）的世界坐标顶点
+    :return: (N, 3) float32 数组
+    """
+    chunks = []
+    for o in _geometry_objects(obj):
+        co, _ = _read_mesh(o, deps_graph)
+        chunks.append(transform_points(co, o.matrix_world))
+    if not chunks:
+        return np.zeros((0, 3), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(chunks), dtype=np.float32)
+
+
+def objects_world_triangles(objects, deps_graph):
+    """
+    读取多个对象的世界坐标三角形
+    :return: (M, 3, 3) float32 数组
+    """
+    chunks = []
+    for o in objects:
+        if o.type not in GEOMETRY_TYPES:
+            continue
+        co, tri = _read_mesh(o, deps_graph, with_triangles=True)
+        if len(tri):
+            chunks.append(transform_points(co, o.matrix_world).astype(np.float32)[tri])
+    if not chunks:
+        return np.zeros((0, 3, 3), dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+def camera_frame_tangents(scene, camera_obj):
+    """
+    读取相机视锥在单位深度处的范围（与 world_to_camera_view 一致）
+    :return: (x_min, x_max, y_min, y_max, is_ortho)
+    """
+    camera = camera_obj.data
+    frame = [v for v in camera.view_frame(scene=scene)[:3]]
+    is_ortho = camera.type == 'ORTHO'
+    scale = 1.0 if is_ortho else -1.0 / frame[0].z
+    return (frame[2].x * scale, frame[1].x * scale,
+            frame[1].y * scale, frame[0].y * scale, is_ortho)
+
+
+def world_to_ndc(points, scene, camera_obj):
+    """
+    批量将世界坐标投影到相机归一化坐标（等价于逐点调用 world_to_camera_view）
+    :param points: (N, 3) 世界坐标
+    :return: (N, 3) 数组，x/y 为画面坐标(0-1)，z 为视线方向深度
+    """
+    view = matrix_to_numpy(camera_obj.matrix_world.normalized().inverted())
+    return camera_to_ndc(transform_points(np.asarray(points, dtype=np.float64), view),
+                         camera_frame_tangents(scene, camera_obj))
+
+
+def camera_to_ndc(local, tangents):
+    """
+    将相机局部坐标转换为归一化坐标
+    :param local: (..., 3) 相机局部坐标
+    :param tangents: camera_frame_tangents 的返回值
+    """
+    x_min, x_max, y_min, y_max, is_ortho = tangents
+    z = -local[..., 2]
+    if is_ortho:
+        depth = np.ones_like(z)
+    else:
+        depth = np.where(z == 0, 1.0, z)
+    x = (local[..., 0] / depth - x_min) / (x_max - x_min)
+    y = (local[..., 1] / depth - y_min) / (y_max - y_min)
+    if not is_ortho:
+        x = np.where(z == 0, 0.5, x)
+        y = np.where(z == 0, 0.5, y)
+    return np.stack([x, y, z], axis=-1)
+
+
+def ndc_bbox(points_2d):
+    """
+    由可见点的归一化坐标计算标注框
+    :return: (cx, cy, w, h)，图像坐标系（y 向下）；无点时返回 None
+    """
+    if len(points_2d) == 0:
+        return None
+    x_min, y_min = points_2d.min(axis=0)
+    x_max, y_max = points_2d.max(axis=0)
+    cx = (x_min + x_max) / 2
+    cy = 1 - (y_min + y_max) / 2
+    return float(cx), float(cy), float(x_max - x_min), float(y_max - y_min)